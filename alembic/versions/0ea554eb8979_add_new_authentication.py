@@ -38,14 +38,13 @@ def upgrade() -> None:
     op.create_index(
         op.f("ix_password_resets_id"), "password_resets", ["id"], unique=False
     )
-    op.add_column("users", sa.Column("is_active", sa.Boolean(), nullable=False))
+    # users.is_active is added by 549fdd022bf3.
     # ### end Alembic commands ###
 
 
 def downgrade() -> None:
     """Downgrade schema."""
     # ### commands auto generated by Alembic - please adjust! ###
-    op.drop_column("users", "is_active")
     op.drop_index(op.f("ix_password_resets_id"), table_name="password_resets")
     op.drop_table("password_resets")
     # ### end Alembic commands ###
@@ -0,0 +1,46 @@
+"""Add watch events table
+
+Revision ID: 5b2e8f0d7c13
+Revises: e7a3b91c5d20
+Create Date: 2026-10-19 15:03:41.662190
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5b2e8f0d7c13"
+down_revision: Union[str, Sequence[str], None] = "e7a3b91c5d20"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "watch_events",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("film_id", sa.Integer(), nullable=False),
+        sa.Column("position_seconds", sa.Integer(), nullable=False),
+        sa.Column("watched_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["film_id"], ["films.id"]),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_watch_events_user_id_watched_at",
+        "watch_events",
+        ["user_id", "watched_at"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_watch_events_user_id_watched_at", table_name="watch_events")
+    op.drop_table("watch_events")
@@ -0,0 +1,32 @@
+"""Add outbox claims
+
+Revision ID: 7c2e9b5d4a18
+Revises: d6b4f1a8c395
+Create Date: 2026-10-19 19:41:08.227615
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "7c2e9b5d4a18"
+down_revision: Union[str, Sequence[str], None] = "d6b4f1a8c395"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "outbox_events", sa.Column("claimed_until", sa.DateTime(), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("outbox_events") as batch_op:
+        batch_op.drop_column("claimed_until")
@@ -0,0 +1,39 @@
+"""Add film stats table
+
+Revision ID: 9d4c6a1e8f52
+Revises: 5b2e8f0d7c13
+Create Date: 2026-10-19 16:21:55.187342
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9d4c6a1e8f52"
+down_revision: Union[str, Sequence[str], None] = "5b2e8f0d7c13"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "film_stats",
+        sa.Column("film_id", sa.Integer(), nullable=False),
+        sa.Column("view_count", sa.Integer(), nullable=False),
+        sa.Column("purchase_count", sa.Integer(), nullable=False),
+        sa.Column("score", sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(["film_id"], ["films.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("film_id"),
+    )
+    op.create_index(op.f("ix_film_stats_score"), "film_stats", ["score"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_film_stats_score"), table_name="film_stats")
+    op.drop_table("film_stats")
@@ -0,0 +1,33 @@
+"""Drop duplicate users email constraint
+
+Revision ID: a1c5e9f3d7b2
+Revises: f3a7c2d9b614
+Create Date: 2026-10-19 17:48:12.316904
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a1c5e9f3d7b2"
+down_revision: Union[str, Sequence[str], None] = "f3a7c2d9b614"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The unique index ix_users_email already enforces uniqueness; on
+    # PostgreSQL the column-level constraint kept a second index to maintain
+    # on every insert. SQLite keeps it: the constraint is unnamed there.
+    if op.get_bind().dialect.name == "postgresql":
+        op.drop_constraint("users_email_key", "users", type_="unique")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == "postgresql":
+        op.create_unique_constraint("users_email_key", "users", ["email"])
@@ -0,0 +1,36 @@
+"""Add composite indexes for user listing
+
+Revision ID: b818fd8ee478
+Revises: 2faad28f05ea
+Create Date: 2026-10-19 10:03:27.118402
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b818fd8ee478"
+down_revision: Union[str, Sequence[str], None] = "2faad28f05ea"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_users_role_is_active_id",
+        "users",
+        ["role", "is_active", "id"],
+        unique=False,
+    )
+    op.create_index("ix_users_is_active_id", "users", ["is_active", "id"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_users_is_active_id", table_name="users")
+    op.drop_index("ix_users_role_is_active_id", table_name="users")
@@ -0,0 +1,35 @@
+"""Add film stats epoch
+
+Revision ID: d6b4f1a8c395
+Revises: a1c5e9f3d7b2
+Create Date: 2026-10-19 19:02:37.514028
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d6b4f1a8c395"
+down_revision: Union[str, Sequence[str], None] = "a1c5e9f3d7b2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing scores are relative to popularity.SCORE_EPOCH, the start of
+    # epoch 0.
+    op.add_column(
+        "film_stats",
+        sa.Column("epoch", sa.Integer(), server_default="0", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("film_stats") as batch_op:
+        batch_op.drop_column("epoch")
@@ -0,0 +1,45 @@
+"""Store film and order prices as integer cents
+
+Revision ID: e7a3b91c5d20
+Revises: c41d7e9a2b6f
+Create Date: 2026-10-19 13:52:07.408161
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e7a3b91c5d20"
+down_revision: Union[str, Sequence[str], None] = "c41d7e9a2b6f"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MONEY_COLUMNS = [
+    ("films", "price", "price_cents"),
+    ("order_items", "price", "price_cents"),
+    ("orders", "total", "total_cents"),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table, old, new in MONEY_COLUMNS:
+        op.add_column(table, sa.Column(new, sa.Integer(), nullable=True))
+        op.execute(f"UPDATE {table} SET {new} = CAST(ROUND({old} * 100) AS INTEGER)")
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column(new, existing_type=sa.Integer(), nullable=False)
+            batch_op.drop_column(old)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, old, new in MONEY_COLUMNS:
+        op.add_column(table, sa.Column(old, sa.Float(), nullable=True))
+        op.execute(f"UPDATE {table} SET {old} = {new} / 100.0")
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column(old, existing_type=sa.Float(), nullable=False)
+            batch_op.drop_column(new)
@@ -0,0 +1,71 @@
+"""Add tags tables
+
+Revision ID: f3a7c2d9b614
+Revises: 9d4c6a1e8f52
+Create Date: 2026-10-19 17:02:41.508213
+
+"""
+
+import re
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f3a7c2d9b614"
+down_revision: Union[str, Sequence[str], None] = "9d4c6a1e8f52"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    tags = op.create_table(
+        "tags",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(length=50), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("name"),
+    )
+    film_tags = op.create_table(
+        "film_tags",
+        sa.Column("film_id", sa.Integer(), nullable=False),
+        sa.Column("tag_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["film_id"], ["films.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["tag_id"], ["tags.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("film_id", "tag_id"),
+    )
+    op.create_index(
+        "ix_film_tags_tag_id_film_id",
+        "film_tags",
+        ["tag_id", "film_id"],
+        unique=False,
+    )
+
+    # Seed tags from the existing genres; "Action/Comedy" becomes two tags.
+    bind = op.get_bind()
+    films = sa.table("films", sa.column("id"), sa.column("genre"))
+    film_genres = bind.execute(sa.select(films.c.id, films.c.genre)).all()
+    links = {
+        (film_id, name)
+        for film_id, genre in film_genres
+        for name in (part.strip().lower()[:50] for part in re.split(r"[/,]", genre))
+        if name
+    }
+    names = sorted({name for _, name in links})
+    if names:
+        op.bulk_insert(tags, [{"name": name} for name in names])
+        tag_ids = dict(bind.execute(sa.select(tags.c.name, tags.c.id)).all())
+        op.bulk_insert(
+            film_tags,
+            [{"film_id": film_id, "tag_id": tag_ids[name]} for film_id, name in links],
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_film_tags_tag_id_film_id", table_name="film_tags")
+    op.drop_table("film_tags")
+    op.drop_table("tags")
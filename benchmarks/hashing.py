@@ -0,0 +1,105 @@
+"""
+Password hashing cost calibration.
+
+Measures how long one hash takes on the current host for increasing cost
+parameters and recommends the cheapest setting that reaches a target latency.
+
+Usage:
+    python -m benchmarks.hashing --scheme bcrypt --target-ms 250
+    python -m benchmarks.hashing --scheme argon2 --target-ms 250 --memory-cost 65536
+"""
+
+import argparse
+import time
+
+from utils import build_pwd_context
+
+SAMPLE_PASSWORD = "correct horse battery staple"
+
+
+def measure_ms(context, samples: int) -> float:
+    """
+    Return the median time in milliseconds to hash one password.
+    """
+    context.hash(SAMPLE_PASSWORD)
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        context.hash(SAMPLE_PASSWORD)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2]
+
+
+def calibrate_bcrypt(target_ms: float, samples: int):
+    """
+    Find the lowest bcrypt rounds whose hash time reaches ``target_ms``.
+    Returns the chosen rounds and the measured (rounds, ms) pairs.
+    """
+    results = []
+    for rounds in range(4, 20):
+        elapsed = measure_ms(
+            build_pwd_context(["bcrypt"], bcrypt_rounds=rounds), samples
+        )
+        results.append((rounds, elapsed))
+        if elapsed >= target_ms:
+            return rounds, results
+    return results[-1][0], results
+
+
+def calibrate_argon2(
+    target_ms: float, samples: int, memory_cost: int, parallelism: int
+):
+    """
+    Find the lowest argon2id time cost whose hash time reaches ``target_ms``
+    for a fixed memory cost. Returns the chosen cost and the measured pairs.
+    """
+    results = []
+    for time_cost in range(1, 33):
+        context = build_pwd_context(
+            ["argon2"],
+            argon2_time_cost=time_cost,
+            argon2_memory_cost=memory_cost,
+            argon2_parallelism=parallelism,
+        )
+        elapsed = measure_ms(context, samples)
+        results.append((time_cost, elapsed))
+        if elapsed >= target_ms:
+            return time_cost, results
+    return results[-1][0], results
+
+
+def main():
+    """
+    Run the calibration and print the recommended settings.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scheme", choices=["bcrypt", "argon2"], default="bcrypt")
+    parser.add_argument("--target-ms", type=float, default=250.0)
+    parser.add_argument("--samples", type=int, default=3)
+    parser.add_argument("--memory-cost", type=int, default=65536)
+    parser.add_argument("--parallelism", type=int, default=4)
+    args = parser.parse_args()
+
+    if args.scheme == "bcrypt":
+        chosen, results = calibrate_bcrypt(args.target_ms, args.samples)
+        setting = f"BCRYPT_ROUNDS={chosen}"
+    else:
+        chosen, results = calibrate_argon2(
+            args.target_ms, args.samples, args.memory_cost, args.parallelism
+        )
+        setting = (
+            f"ARGON2_TIME_COST={chosen}\n"
+            f"ARGON2_MEMORY_COST={args.memory_cost}\n"
+            f"ARGON2_PARALLELISM={args.parallelism}"
+        )
+
+    for cost, elapsed in results:
+        print(f"{args.scheme} cost={cost:>2}  {elapsed:8.1f} ms")
+    print(f"\nRecommended for a {args.target_ms:.0f} ms target:")
+    print(f"PASSWORD_SCHEMES={args.scheme}")
+    print(setting)
+
+
+if __name__ == "__main__":
+    main()
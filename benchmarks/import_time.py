@@ -0,0 +1,60 @@
+"""
+Cold-start import time benchmark.
+
+Imports a module in a fresh interpreter with ``python -X importtime`` and
+reports the total cumulative time plus the slowest modules, so regressions
+from new top-level imports (e.g. an SDK built at import) are easy to spot.
+The best of several runs is reported to smooth out disk cache effects.
+
+Usage:
+    python -m benchmarks.import_time --module main --top 15 --repeat 5
+"""
+
+import argparse
+import subprocess
+import sys
+
+
+def import_times(module: str) -> dict[str, int]:
+    """
+    Import ``module`` in a new interpreter and return cumulative import
+    times in microseconds, keyed by module name.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        if not cumulative.strip().isdigit():
+            continue  # Header line.
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    runs = [import_times(args.module) for _ in range(args.repeat)]
+    best = min(runs, key=lambda times: times.get(args.module, 0))
+    total = best.get(args.module, 0)
+
+    print(f"import {args.module}: {total / 1000:.1f} ms (best of {args.repeat})")
+    print(f"{'module':<50} {'cumulative ms':>14}")
+    for name, cumulative in sorted(best.items(), key=lambda item: -item[1])[
+        1 : args.top + 1
+    ]:
+        print(f"{name:<50} {cumulative / 1000:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Watch event ingestion benchmark.
+
+Compares inserting playback events one ``add`` + ``commit`` at a time with
+the write-behind WatchEventBuffer, which inserts them in executemany batches,
+on a file-backed SQLite database.
+
+Usage:
+    python -m benchmarks.ingest --events 20000 --batch-size 1000
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from ingest import WatchEventBuffer
+from models import Base, WatchEvent
+
+
+def make_events(count: int) -> list[dict]:
+    now = datetime.utcnow()
+    return [
+        {"user_id": 1, "film_id": i % 500, "position_seconds": i, "watched_at": now}
+        for i in range(count)
+    ]
+
+
+async def per_row(session_factory, events: list[dict]) -> float:
+    """
+    Insert events with one transaction each and return events per second.
+    """
+    start = time.perf_counter()
+    async with session_factory() as db:
+        for event in events:
+            db.add(WatchEvent(**event))
+            await db.commit()
+    return len(events) / (time.perf_counter() - start)
+
+
+async def buffered(session_factory, events: list[dict], batch_size: int) -> float:
+    """
+    Push events through the buffer in request-sized chunks and return events
+    per second, including the final flush.
+    """
+    buffer = WatchEventBuffer(
+        session_factory, batch_size=batch_size, capacity=len(events)
+    )
+    buffer.start()
+    start = time.perf_counter()
+    for offset in range(0, len(events), 100):
+        await buffer.offer(events[offset : offset + 100])
+    await buffer.stop()
+    return len(events) / (time.perf_counter() - start)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--per-row-events", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        url = f"sqlite+aiosqlite:///{os.path.join(directory, 'bench.db')}"
+        engine = create_async_engine(url)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+        slow = await per_row(session_factory, make_events(args.per_row_events))
+        fast = await buffered(
+            session_factory, make_events(args.events), args.batch_size
+        )
+        await engine.dispose()
+
+    print(f"{'per-row commit':<30} {slow:>10.0f} events/s")
+    print(f"{'buffered executemany':<30} {fast:>10.0f} events/s")
+    print(f"speedup: {fast / slow:.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
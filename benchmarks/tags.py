@@ -0,0 +1,134 @@
+"""
+Tag query benchmark.
+
+Compares answering "all of two tags, none of a third" plus facet counts with
+SQL over the film_tags table against the in-memory TagIndex, on a
+file-backed SQLite database.
+
+Usage:
+    python -m benchmarks.tags --films 50000 --tags 200 --queries 50
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from models import Base, Film, FilmTag, Tag
+from tags import TagIndex
+
+
+async def seed(session_factory, films: int, tags: int):
+    """
+    Insert films with 2 to 6 tags each, popular tags being more common.
+    """
+    rng = random.Random(1)
+    weights = [1 / (rank + 1) for rank in range(tags)]
+    async with session_factory() as db:
+        await db.execute(
+            insert(Tag), [{"id": i + 1, "name": f"tag{i}"} for i in range(tags)]
+        )
+        await db.execute(
+            insert(Film),
+            [
+                {"id": i, "title": f"Film {i}", "genre": "Drama", "price_cents": 100}
+                for i in range(1, films + 1)
+            ],
+        )
+        links = {
+            (film_id, tag_id)
+            for film_id in range(1, films + 1)
+            for tag_id in rng.choices(range(1, tags + 1), weights, k=rng.randint(2, 6))
+        }
+        await db.execute(
+            insert(FilmTag),
+            [{"film_id": film_id, "tag_id": tag_id} for film_id, tag_id in links],
+        )
+        await db.commit()
+
+
+def tag_ids(names: list[str]):
+    return select(Tag.id).where(Tag.name.in_(names))
+
+
+async def sql_queries(session_factory, queries: list[tuple]) -> float:
+    """
+    Run each query and its facet counts in SQL and return queries per second.
+    """
+    start = time.perf_counter()
+    async with session_factory() as db:
+        for all_of, none_of in queries:
+            matched = (
+                select(FilmTag.film_id)
+                .where(FilmTag.tag_id.in_(tag_ids(all_of)))
+                .group_by(FilmTag.film_id)
+                .having(func.count() == len(all_of))
+                .except_(
+                    select(FilmTag.film_id).where(FilmTag.tag_id.in_(tag_ids(none_of)))
+                )
+                .subquery()
+            )
+            await db.execute(select(matched.c.film_id).order_by(matched.c.film_id))
+            await db.execute(
+                select(Tag.name, func.count())
+                .join(FilmTag, FilmTag.tag_id == Tag.id)
+                .where(FilmTag.film_id.in_(select(matched.c.film_id)))
+                .group_by(Tag.name)
+            )
+    return len(queries) / (time.perf_counter() - start)
+
+
+def index_queries(index: TagIndex, queries: list[tuple]) -> float:
+    """
+    Run each query and its facet counts on the index and return queries per second.
+    """
+    start = time.perf_counter()
+    for all_of, none_of in queries:
+        matched = index.query(all_of=all_of, none_of=none_of)
+        index.facets(matched)
+    return len(queries) / (time.perf_counter() - start)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--films", type=int, default=50000)
+    parser.add_argument("--tags", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = random.Random(2)
+    queries = []
+    for _ in range(args.queries):
+        first, second, third = rng.sample(range(10), 3)
+        queries.append(([f"tag{first}", f"tag{second}"], [f"tag{third}"]))
+
+    with tempfile.TemporaryDirectory() as directory:
+        url = f"sqlite+aiosqlite:///{os.path.join(directory, 'bench.db')}"
+        engine = create_async_engine(url)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        await seed(session_factory, args.films, args.tags)
+
+        slow = await sql_queries(session_factory, queries)
+        async with session_factory() as db:
+            pairs = await db.execute(
+                select(FilmTag.film_id, Tag.name).join(Tag, Tag.id == FilmTag.tag_id)
+            )
+            index = TagIndex()
+            index.load(range(1, args.films + 1), pairs.all())
+        fast = index_queries(index, queries)
+        await engine.dispose()
+
+    print(f"{'SQL group by + except':<30} {slow:>10.0f} queries/s")
+    print(f"{'tag index':<30} {fast:>10.0f} queries/s")
+    print(f"speedup: {fast / slow:.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
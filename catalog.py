@@ -0,0 +1,213 @@
+from array import array
+from bisect import bisect_left, bisect_right, insort
+
+from decimal import ROUND_CEILING, ROUND_FLOOR
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from crud import get_film_rows
+from money import to_cents
+
+
+class CatalogSnapshot:
+    """
+    Compact in-process copy of the films table for read-mostly queries.
+    Columns are kept in ID order in typed arrays (IDs, prices in cents,
+    interned genre codes) next to a list of titles. A second pair of
+    arrays keeps IDs sorted by price, and each genre keeps a sorted ID
+    array, so filters and price ranges are answered with bisect instead of
+    scanning or querying SQLite.
+    Attributes:
+        loaded (bool): Whether the snapshot has been filled from the database.
+    """
+
+    def __init__(self):
+        self.loaded = False
+        self.clear()
+
+    def clear(self):
+        """
+        Drop all rows.
+        """
+        self._ids = array("q")
+        self._prices = array("q")
+        self._genres = array("H")
+        self._titles: list[str] = []
+        self._genre_names: list[str] = []
+        self._genre_codes: dict[str, int] = {}
+        self._genre_ids: list[array] = []
+        self._price_keys = array("q")
+        self._price_ids = array("q")
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def load(self, rows: list[dict]):
+        """
+        Replace the snapshot contents with the given film rows.
+        """
+        self.clear()
+        rows = sorted(rows, key=lambda row: row["id"])
+        for row in rows:
+            self._ids.append(row["id"])
+            self._prices.append(to_cents(row["price"]))
+            self._genres.append(self._genre_code(row["genre"]))
+            self._titles.append(row["title"])
+        for row in rows:
+            self._genre_ids[self._genre_codes[row["genre"]]].append(row["id"])
+        for price, film_id in sorted(zip(self._prices, self._ids)):
+            self._price_keys.append(price)
+            self._price_ids.append(film_id)
+        self.loaded = True
+
+    def upsert(self, film_id: int, title: str, genre: str, price):
+        """
+        Insert a film or replace the stored values of an existing one.
+        """
+        price = to_cents(price)
+        position = self._position(film_id)
+        if position is not None:
+            self._unindex(position)
+            self._titles[position] = title
+            self._prices[position] = price
+            self._genres[position] = self._genre_code(genre)
+        else:
+            position = bisect_left(self._ids, film_id)
+            self._ids.insert(position, film_id)
+            self._titles.insert(position, title)
+            self._prices.insert(position, price)
+            self._genres.insert(position, self._genre_code(genre))
+        self._index(position)
+
+    def remove(self, film_id: int):
+        """
+        Remove a film if it is present.
+        """
+        position = self._position(film_id)
+        if position is None:
+            return
+        self._unindex(position)
+        del self._ids[position]
+        del self._titles[position]
+        del self._prices[position]
+        del self._genres[position]
+
+    def apply(self, action: str, film):
+        """
+        Film change listener: mirror a committed create, update or delete.
+        """
+        if action == "delete":
+            self.remove(film.id)
+        else:
+            self.upsert(film.id, film.title, film.genre, film.price)
+
+    def query(
+        self,
+        genre: str | None = None,
+        min_price: float | None = None,
+        max_price: float | None = None,
+        sort: str | None = None,
+    ) -> list[dict]:
+        """
+        Return films matching the filters as ``{"id", "title", "genre", "price"}``
+        dicts, ordered by ID unless ``sort`` is ``price`` or ``-price``.
+        """
+        if genre is not None and genre not in self._genre_codes:
+            return []
+        genre_ids = (
+            self._genre_ids[self._genre_codes[genre]] if genre is not None else None
+        )
+
+        if min_price is None and max_price is None and sort is None:
+            ids = genre_ids if genre_ids is not None else self._ids
+        else:
+            low = (
+                0
+                if min_price is None
+                else bisect_left(
+                    self._price_keys, to_cents(min_price, rounding=ROUND_CEILING)
+                )
+            )
+            high = (
+                len(self._price_keys)
+                if max_price is None
+                else bisect_right(
+                    self._price_keys, to_cents(max_price, rounding=ROUND_FLOOR)
+                )
+            )
+            ids = self._price_ids[low:high]
+            if genre_ids is not None:
+                members = set(genre_ids)
+                ids = [film_id for film_id in ids if film_id in members]
+            if sort is None:
+                ids = sorted(ids)
+            elif sort == "-price":
+                ids = ids[::-1]
+        return [self._row(film_id) for film_id in ids]
+
+    def get(self, film_id: int) -> dict | None:
+        """
+        Return one film as a dict, or None if it is not in the snapshot.
+        """
+        if self._position(film_id) is None:
+            return None
+        return self._row(film_id)
+
+    def _row(self, film_id: int) -> dict:
+        position = bisect_left(self._ids, film_id)
+        return {
+            "id": film_id,
+            "title": self._titles[position],
+            "genre": self._genre_names[self._genres[position]],
+            "price": self._prices[position] / 100,
+        }
+
+    def _position(self, film_id: int) -> int | None:
+        position = bisect_left(self._ids, film_id)
+        if position < len(self._ids) and self._ids[position] == film_id:
+            return position
+        return None
+
+    def _genre_code(self, genre: str) -> int:
+        code = self._genre_codes.get(genre)
+        if code is None:
+            code = len(self._genre_names)
+            self._genre_names.append(genre)
+            self._genre_codes[genre] = code
+            self._genre_ids.append(array("q"))
+        return code
+
+    def _index(self, position: int):
+        film_id = self._ids[position]
+        insort(self._genre_ids[self._genres[position]], film_id)
+        price = self._prices[position]
+        # Equal prices stay in ID order, matching ORDER BY price, id.
+        low = bisect_left(self._price_keys, price)
+        high = bisect_right(self._price_keys, price)
+        slot = low + bisect_left(self._price_ids[low:high], film_id)
+        self._price_keys.insert(slot, price)
+        self._price_ids.insert(slot, film_id)
+
+    def _unindex(self, position: int):
+        film_id = self._ids[position]
+        genre_ids = self._genre_ids[self._genres[position]]
+        del genre_ids[bisect_left(genre_ids, film_id)]
+        price = self._prices[position]
+        low = bisect_left(self._price_keys, price)
+        high = bisect_right(self._price_keys, price)
+        slot = low + self._price_ids[low:high].index(film_id)
+        del self._price_keys[slot]
+        del self._price_ids[slot]
+
+
+snapshot = CatalogSnapshot()
+"""
+The process-wide catalog snapshot, filled on startup when enabled.
+"""
+
+
+async def load_catalog(db: AsyncSession):
+    """
+    Fill the catalog snapshot from the films table.
+    """
+    snapshot.load(await get_film_rows(db))
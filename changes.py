@@ -0,0 +1,280 @@
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from datetime import datetime
+from typing import Callable
+
+from sqlalchemy import func, select
+
+from models import Film, OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+FILM_EVENT_ACTIONS = {
+    "film.created": "create",
+    "film.updated": "update",
+    "film.deleted": "delete",
+}
+
+
+class ChangeFeedGap(Exception):
+    """
+    Raised when a client resumes from a sequence number the feed no longer holds.
+    """
+
+
+class ChangeFeed:
+    """
+    In-memory, sequence-numbered log of catalog changes.
+    Every committed film write is appended with a sequence number; fed by
+    ``OutboxTail``, that is the ID of its outbox event, so positions mean the
+    same in every worker process. Sequence numbers increase but need not be
+    contiguous. The most recent ``capacity`` events are retained so clients
+    can resume from the last sequence they saw; older positions raise
+    ChangeFeedGap and the client must reload the catalog.
+    Attributes:
+        capacity (int): Number of events retained.
+        last_seq (int): Position of the feed, at least the sequence number
+            of the newest event; 0 if none.
+    """
+
+    def __init__(self, capacity: int = 10000):
+        self.capacity = capacity
+        self.last_seq = 0
+        self._floor = 0
+        self._events: deque[dict] = deque(maxlen=capacity)
+        self._waiters: set[asyncio.Future] = set()
+
+    def restart(self, seq: int):
+        """
+        Drop all events and continue from position ``seq``; earlier
+        positions can no longer be resumed.
+        """
+        self._events.clear()
+        self.last_seq = self._floor = seq
+
+    def advance(self, seq: int):
+        """
+        Move the position past a sequence number that is not a film change.
+        """
+        self.last_seq = max(self.last_seq, seq)
+
+    def publish(self, action: str, film, seq: int | None = None):
+        """
+        Film change listener: append a compact event and wake waiting readers.
+        The event gets ``seq``, or the next number after ``last_seq``.
+        """
+        if len(self._events) == self.capacity:
+            self._floor = self._events[0]["seq"]
+        self.last_seq = self.last_seq + 1 if seq is None else seq
+        self._events.append(
+            {
+                "seq": self.last_seq,
+                "action": action,
+                "film_id": film.id,
+                "film": (
+                    None
+                    if action == "delete"
+                    else {
+                        "id": film.id,
+                        "title": film.title,
+                        "genre": film.genre,
+                        "price": float(film.price),
+                    }
+                ),
+                "at": datetime.utcnow().isoformat(),
+            }
+        )
+        for waiter in self._waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+        self._waiters.clear()
+
+    def since(self, seq: int) -> list[dict]:
+        """
+        Return the events after ``seq``.
+        Raises ChangeFeedGap if events after ``seq`` were already discarded
+        or ``seq`` is ahead of the feed (e.g. after a server restart).
+        """
+        if seq > self.last_seq or seq < self._floor:
+            raise ChangeFeedGap(seq)
+        events = []
+        for event in reversed(self._events):
+            if event["seq"] <= seq:
+                break
+            events.append(event)
+        return events[::-1]
+
+    async def wait(self, seq: int, timeout: float) -> list[dict]:
+        """
+        Return the events after ``seq``, waiting up to ``timeout`` seconds
+        for one to arrive. Returns an empty list on timeout.
+        """
+        events = self.since(seq)
+        if events:
+            return events
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.add(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            return []
+        finally:
+            self._waiters.discard(waiter)
+        return self.since(seq)
+
+
+def format_sse(event: dict) -> str:
+    """
+    Encode a change event as a Server-Sent Events message.
+    """
+    return (
+        f"id: {event['seq']}\n"
+        f"event: film.{event['action']}\n"
+        f"data: {json.dumps(event, separators=(',', ':'))}\n\n"
+    )
+
+
+class OutboxTail:
+    """
+    Follows the outbox table, so every worker process sees every committed
+    film change whichever process wrote it. Each poll reads the events after
+    the feed position in ID order, appends film changes to the feed with
+    their event ID as sequence number, and passes them to ``listeners``
+    (the in-process indexes, which apply repeated changes idempotently).
+    An ID can become visible after a higher one when transactions commit
+    out of order, so the tail stops at a missing ID and only skips it, as
+    rolled back, after ``gap_timeout`` seconds.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        feed: ChangeFeed,
+        listeners: list[Callable[[str, Film], None]],
+        interval: float = 1.0,
+        gap_timeout: float = 5.0,
+        batch_size: int = 500,
+    ):
+        self.session_factory = session_factory
+        self.feed = feed
+        self.listeners = listeners
+        self.interval = interval
+        self.gap_timeout = gap_timeout
+        self.batch_size = batch_size
+        self._gap_at: int | None = None
+        self._gap_since = 0.0
+        self._task: asyncio.Task | None = None
+
+    async def load(self):
+        """
+        Position the feed at the newest outbox event and fill it with the
+        latest film changes, so clients can resume on any worker.
+        """
+        async with self.session_factory() as db:
+            head = await db.scalar(select(func.max(OutboxEvent.id)))
+            result = await db.execute(
+                select(OutboxEvent.id, OutboxEvent.event_type, OutboxEvent.payload)
+                .where(OutboxEvent.event_type.in_(FILM_EVENT_ACTIONS))
+                .order_by(OutboxEvent.id.desc())
+                .limit(self.feed.capacity)
+            )
+            rows = result.all()[::-1]
+        self.feed.restart(rows[0][0] - 1 if rows else head or 0)
+        for id_, event_type, payload in rows:
+            action = FILM_EVENT_ACTIONS[event_type]
+            self.feed.publish(action, _film(action, payload), seq=id_)
+        self.feed.advance(head or 0)
+
+    async def poll_once(self) -> int:
+        """
+        Read new outbox events and return how many film changes were applied.
+        """
+        async with self.session_factory() as db:
+            result = await db.execute(
+                select(OutboxEvent.id, OutboxEvent.event_type, OutboxEvent.payload)
+                .where(OutboxEvent.id > self.feed.last_seq)
+                .order_by(OutboxEvent.id)
+                .limit(self.batch_size)
+            )
+            rows = result.all()
+        applied = 0
+        for id_, event_type, payload in rows:
+            if id_ > self.feed.last_seq + 1 and not self._gap_expired():
+                break
+            self._gap_at = None
+            action = FILM_EVENT_ACTIONS.get(event_type)
+            if action is None:
+                self.feed.advance(id_)
+                continue
+            film = _film(action, payload)
+            self.feed.publish(action, film, seq=id_)
+            for listener in self.listeners:
+                try:
+                    listener(action, film)
+                except Exception:
+                    logger.exception("Film change listener failed")
+            applied += 1
+        return applied
+
+    def _gap_expired(self) -> bool:
+        now = time.monotonic()
+        if self._gap_at != self.feed.last_seq:
+            self._gap_at = self.feed.last_seq
+            self._gap_since = now
+        return now - self._gap_since >= self.gap_timeout
+
+    async def run(self):
+        """
+        Poll every ``interval`` seconds.
+        """
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.poll_once()
+            except Exception:
+                logger.exception("Outbox tail poll failed")
+
+    async def start(self):
+        """
+        Load the feed and start polling in a background task.
+        """
+        await self.load()
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        """
+        Stop polling.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+def _film(action: str, payload: str) -> Film:
+    """
+    Rebuild a transient Film from an outbox event payload.
+    """
+    data = json.loads(payload)
+    if action == "delete":
+        return Film(id=data["id"])
+    return Film(
+        id=data["id"], title=data["title"], genre=data["genre"], price=data["price"]
+    )
+
+
+feed = ChangeFeed()
+"""
+The process-wide catalog change feed.
+"""
+
+tail: OutboxTail | None = None
+"""
+The outbox tail feeding ``feed``, started on startup.
+"""
@@ -0,0 +1,209 @@
+import gzip
+import hashlib
+from collections import OrderedDict
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is an optional encoder
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstandard is an optional encoder
+    zstandard = None
+
+
+def available_encodings() -> list[str]:
+    """
+    Return the content encodings supported by the installed libraries.
+    """
+    encodings = ["gzip"]
+    if brotli is not None:
+        encodings.append("br")
+    if zstandard is not None:
+        encodings.append("zstd")
+    return encodings
+
+
+def choose_encoding(accept_encoding: str, preferred: list[str]) -> str | None:
+    """
+    Pick the encoding to use from an Accept-Encoding header.
+    The client's highest q-value wins; ties go to the server's preference order.
+    param accept_encoding: The raw Accept-Encoding header value.
+    param preferred: Supported encodings, most preferred first.
+    return: The chosen encoding, or None to send the body uncompressed.
+    """
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name] = weight
+
+    best, best_weight = None, 0.0
+    for encoding in preferred:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware that negotiates gzip, brotli or zstd response compression.
+    Bodies smaller than ``minimum_size`` are sent as-is. Streaming responses
+    (``text/event-stream``) and responses that are already encoded pass through.
+    For GET requests under one of ``cache_paths`` a weak ETag is computed
+    from the body, ``If-None-Match`` is answered with 304, and compressed
+    bodies are kept in an LRU cache keyed by (ETag, encoding), so a hot
+    response is compressed once and served many times.
+    """
+
+    def __init__(
+        self,
+        app,
+        minimum_size: int = 1024,
+        encodings: list[str] | None = None,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        zstd_level: int = 3,
+        cache_paths: tuple[str, ...] = (),
+        cache_size: int = 64,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        supported = available_encodings()
+        self.encodings = [
+            encoding for encoding in encodings or supported if encoding in supported
+        ]
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.zstd_level = zstd_level
+        self.cache_paths = cache_paths
+        self.cache_size = cache_size
+        self.cache: OrderedDict[tuple[str, str], bytes] = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        encoding = choose_encoding(
+            request_headers.get("accept-encoding", ""), self.encodings
+        )
+        cacheable = scope["method"] == "GET" and scope["path"].startswith(
+            self.cache_paths
+        )
+        if encoding is None and not cacheable:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        body_parts = []
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                headers = Headers(raw=message["headers"])
+                passthrough = "content-encoding" in headers or headers.get(
+                    "content-type", ""
+                ).startswith("text/event-stream")
+                if passthrough:
+                    await send(message)
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+            body_parts.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            await self.send_response(
+                start_message,
+                b"".join(body_parts),
+                encoding,
+                cacheable,
+                request_headers,
+                send,
+            )
+
+        await self.app(scope, receive, send_wrapper)
+
+    async def send_response(
+        self, start_message, body, encoding, cacheable, request_headers, send
+    ):
+        """
+        Apply ETag handling and compression to a fully buffered response.
+        """
+        status = start_message["status"]
+        headers = MutableHeaders(raw=list(start_message["headers"]))
+        etag = None
+
+        if cacheable and status == 200:
+            # Weak, because every encoding of the same body shares the tag.
+            etag = 'W/"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+            headers["ETag"] = etag
+            if_none_match = request_headers.get("if-none-match", "")
+            if etag in [tag.strip() for tag in if_none_match.split(",")]:
+                del headers["content-length"]
+                await send(
+                    {
+                        "type": "http.response.start",
+                        "status": 304,
+                        "headers": headers.raw,
+                    }
+                )
+                await send({"type": "http.response.body", "body": b""})
+                return
+
+        if encoding is not None and len(body) >= self.minimum_size:
+            body = self.compress(body, encoding, etag)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+
+        await send({**start_message, "headers": headers.raw})
+        await send({"type": "http.response.body", "body": body})
+
+    def compress(self, body: bytes, encoding: str, etag: str | None) -> bytes:
+        """
+        Compress a body, reusing the cached result when the ETag is known.
+        """
+        if etag is None:
+            return self.encode(body, encoding)
+        key = (etag, encoding)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.cache.move_to_end(key)
+            self.cache_hits += 1
+            return cached
+        self.cache_misses += 1
+        compressed = self.encode(body, encoding)
+        self.cache[key] = compressed
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return compressed
+
+    def encode(self, body: bytes, encoding: str) -> bytes:
+        """
+        Compress a body with the given encoding and configured level.
+        """
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        if encoding == "zstd":
+            return zstandard.ZstdCompressor(level=self.zstd_level).compress(body)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
@@ -1,14 +1,134 @@
+import json
+import re
+
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from models import Film, User, PasswordResetToken
-from schemas import FilmCreate, FilmUpdate, UserCreate
-from utils import hash_password
+from sqlalchemy import case, delete, select, update, insert
+from sqlalchemy.exc import IntegrityError
+from models import (
+    Film,
+    User,
+    PasswordResetToken,
+    UserSession,
+    OutboxEvent,
+    Order,
+    OrderItem,
+    UserFilm,
+    Tag,
+    FilmTag,
+    WatchEvent,
+)
+from schemas import FilmCreate, FilmUpdate, UserCreate, UserImport
+from utils import hash_password, hash_passwords, is_password_hash
+from database import dialect_insert
+from money import from_cents, to_cents
 from datetime import datetime, timedelta
+from decimal import ROUND_CEILING, ROUND_FLOOR, Decimal
+from typing import Callable
+
+ACTIVATION_CHUNK_SIZE = 500
+IMPORT_BATCH_SIZE = 500
+
+
+class FilmsNotFound(Exception):
+    """
+    Raised when a checkout references films that do not exist.
+    """
+
+    def __init__(self, film_ids: list[int]):
+        super().__init__(film_ids)
+        self.film_ids = film_ids
+
+
+class FilmsAlreadyOwned(Exception):
+    """
+    Raised when a checkout includes films the user already owns.
+    """
+
+    def __init__(self, film_ids: list[int]):
+        super().__init__(film_ids)
+        self.film_ids = film_ids
+
+
+film_listeners: list[Callable[[str, Film], None]] = []
+"""
+Callbacks run after a film is committed, with the action
+("create", "update" or "delete") and the Film object.
+"""
+
+
+def _notify_film_listeners(action: str, film: Film):
+    """
+    Pass a committed film change to every registered listener.
+    """
+    for listener in film_listeners:
+        listener(action, film)
+
+
+def _film_payload(film: Film) -> dict:
+    """
+    Describe a film for outbox events and change listeners.
+    """
+    return {
+        "id": film.id,
+        "title": film.title,
+        "genre": film.genre,
+        "price": film.price_cents / 100,
+    }
+
+
+def _outbox_row(event_type: str, aggregate_id: int | None, payload: dict) -> dict:
+    """
+    Build the column values of one outbox event.
+    """
+    return {
+        "event_type": event_type,
+        "aggregate_id": aggregate_id,
+        "payload": json.dumps(payload, separators=(",", ":")),
+        "created_at": datetime.utcnow(),
+    }
+
+
+def _add_outbox_event(
+    db: AsyncSession, event_type: str, aggregate_id: int | None, payload: dict
+):
+    """
+    Stage an outbox event in the current transaction, so it is committed
+    together with the mutation it describes.
+    """
+    db.add(OutboxEvent(**_outbox_row(event_type, aggregate_id, payload)))
+
+
+def _filter_films(
+    query,
+    genre: str | None = None,
+    min_price: float | None = None,
+    max_price: float | None = None,
+    sort: str | None = None,
+):
+    """
+    Apply the catalog filters and ordering shared by the film list queries.
+    """
+    if genre is not None:
+        query = query.where(Film.genre == genre)
+    if min_price is not None:
+        query = query.where(
+            Film.price_cents >= to_cents(min_price, rounding=ROUND_CEILING)
+        )
+    if max_price is not None:
+        query = query.where(
+            Film.price_cents <= to_cents(max_price, rounding=ROUND_FLOOR)
+        )
+    if sort == "price":
+        return query.order_by(Film.price_cents, Film.id)
+    if sort == "-price":
+        return query.order_by(Film.price_cents.desc(), Film.id.desc())
+    return query.order_by(Film.id)
 
 
 async def create_film(db: AsyncSession, film: FilmCreate):
     """
-    Create a new film record in the database.
+    Create a new film record in the database, tagged with the components
+    of its genre.
     Args:
         db (AsyncSession): The database session.
         film (FilmCreate): The film data to create.
@@ -17,8 +137,12 @@ async def create_film(db: AsyncSession, film: FilmCreate):
     """
     new_film = Film(**film.model_dump())
     db.add(new_film)
+    await db.flush()
+    _add_outbox_event(db, "film.created", new_film.id, _film_payload(new_film))
+    await _replace_film_tags(db, new_film.id, genre_tags(new_film.genre))
     await db.commit()
     await db.refresh(new_film)
+    _notify_film_listeners("create", new_film)
     return new_film
 
 
@@ -36,22 +160,80 @@ async def get_film(db: AsyncSession, film_id: int):
     return film
 
 
-async def get_films(db: AsyncSession):
+async def get_films(
+    db: AsyncSession,
+    genre: str | None = None,
+    min_price: float | None = None,
+    max_price: float | None = None,
+    sort: str | None = None,
+):
     """
-    Retrieve all films from the database.
+    Retrieve films from the database, optionally filtered and sorted.
     Args:
         db (AsyncSession): The database session.
+        genre (str | None): Only return films of this genre.
+        min_price (float | None): Only return films costing at least this much.
+        max_price (float | None): Only return films costing at most this much.
+        sort (str | None): ``price`` or ``-price``; ordered by ID otherwise.
     Returns:
-        list[Film]: List of all Film objects.
+        list[Film]: List of matching Film objects.
     """
-    result = await db.execute(select(Film))
+    result = await db.execute(
+        _filter_films(select(Film), genre, min_price, max_price, sort)
+    )
     films = result.scalars().all()
     return films
 
 
+async def get_film_rows(
+    db: AsyncSession,
+    ids: list[int] | None = None,
+    fields: tuple[str, ...] | None = None,
+    genre: str | None = None,
+    min_price: float | None = None,
+    max_price: float | None = None,
+    sort: str | None = None,
+):
+    """
+    Retrieve films as plain dicts, selecting columns instead of entities.
+    Skips ORM object construction and identity-map bookkeeping, which
+    dominates the cost of large list responses.
+    Args:
+        db (AsyncSession): The database session.
+        ids (list[int] | None): Only return films with these IDs, in one
+            ``WHERE id IN (...)`` query. All films are returned if omitted.
+        fields (tuple[str, ...] | None): Film columns to select. All columns
+            are selected if omitted.
+        genre, min_price, max_price, sort: Filters and ordering as in
+            ``get_films``.
+    Returns:
+        list[dict]: One dict per film, keyed by the selected column names.
+        Prices are floats in currency units, ready for JSON encoding.
+    """
+    fields = fields or ("id", "title", "genre", "price")
+    query = select(
+        *(
+            Film.price_cents.label("price") if name == "price" else getattr(Film, name)
+            for name in fields
+        )
+    )
+    if ids is not None:
+        query = query.where(Film.id.in_(ids))
+    query = _filter_films(query, genre, min_price, max_price, sort)
+    result = await db.execute(query)
+    keys = tuple(result.keys())
+    rows = [dict(zip(keys, row)) for row in result.all()]
+    if "price" in keys:
+        for row in rows:
+            row["price"] = row["price"] / 100
+    return rows
+
+
 async def update_film(db: AsyncSession, film_id: int, film: FilmUpdate):
     """
-    Update an existing film record by its ID.
+    Update an existing film record by its ID. When the genre changes, the
+    tags derived from the old genre are replaced by those of the new one;
+    other tags are kept.
     Args:
         db (AsyncSession): The database session.
         film_id (int): The ID of the film to update.
@@ -64,17 +246,26 @@ async def update_film(db: AsyncSession, film_id: int, film: FilmUpdate):
     if not db_film:
         return None
 
+    if film.genre != db_film.genre:
+        names = set(await _get_film_tag_names(db, film_id))
+        names -= set(genre_tags(db_film.genre))
+        names |= set(genre_tags(film.genre))
+        await _replace_film_tags(db, film_id, sorted(names))
     db_film.title = film.title
     db_film.genre = film.genre
     db_film.price = film.price
+    _add_outbox_event(db, "film.updated", db_film.id, _film_payload(db_film))
     await db.commit()
     await db.refresh(db_film)
+    _notify_film_listeners("update", db_film)
     return db_film
 
 
 async def delete_film(db: AsyncSession, film_id: int):
     """
-    Delete a film record by its ID.
+    Delete a film record by its ID, with its tag links and watch events.
+    Films that were ordered are kept: the delete fails with an
+    IntegrityError.
     Args:
         db (AsyncSession): The database session.
         film_id (int): The ID of the film to delete.
@@ -85,11 +276,159 @@ async def delete_film(db: AsyncSession, film_id: int):
     db_film = result.scalar_one_or_none()
     if not db_film:
         return None
+    await db.execute(delete(FilmTag).where(FilmTag.film_id == film_id))
+    await db.execute(delete(WatchEvent).where(WatchEvent.film_id == film_id))
     await db.delete(db_film)
+    _add_outbox_event(db, "film.deleted", db_film.id, {"id": db_film.id})
     await db.commit()
+    _notify_film_listeners("delete", db_film)
     return db_film
 
 
+async def reprice_films(
+    db: AsyncSession,
+    percent: Decimal | None = None,
+    amount: Decimal | None = None,
+    genre: str | None = None,
+    ids: list[int] | None = None,
+):
+    """
+    Change the price of many films with one set-based UPDATE.
+    Prices are computed in the database in integer cents: a percentage change
+    rounds half up to the cent, and no price drops below zero. Every changed
+    film gets a ``film.updated`` outbox event and is passed to film listeners.
+    Args:
+        db (AsyncSession): The database session.
+        percent (Decimal | None): Relative change, e.g. -10 for 10% off.
+        amount (Decimal | None): Absolute change in currency units.
+        genre (str | None): Only reprice films of this genre.
+        ids (list[int] | None): Only reprice films with these IDs.
+    Returns:
+        int: Number of films repriced.
+    """
+    if percent is not None:
+        # Basis points keep the arithmetic in integers; adding half the
+        # divisor before the floor division rounds half up.
+        factor = 10000 + int(Decimal(percent) * 100)
+        new_price = (Film.price_cents * factor + 5000) // 10000
+    else:
+        new_price = Film.price_cents + to_cents(amount)
+        new_price = case((new_price < 0, 0), else_=new_price)
+
+    stmt = update(Film).values(price_cents=new_price)
+    if genre is not None:
+        stmt = stmt.where(Film.genre == genre)
+    if ids is not None:
+        stmt = stmt.where(Film.id.in_(ids))
+    result = await db.execute(
+        stmt.returning(Film.id, Film.title, Film.genre, Film.price_cents)
+    )
+    films = [
+        Film(id=id_, title=title, genre=genre_, price_cents=price_cents)
+        for id_, title, genre_, price_cents in result.all()
+    ]
+    if films:
+        await db.execute(
+            insert(OutboxEvent),
+            [
+                _outbox_row("film.updated", film.id, _film_payload(film))
+                for film in films
+            ],
+        )
+    await db.commit()
+    for film in films:
+        _notify_film_listeners("update", film)
+    return len(films)
+
+
+async def set_film_tags(db: AsyncSession, film_id: int, names: list[str]):
+    """
+    Replace the tags of a film, creating tags that do not exist yet.
+    Args:
+        db (AsyncSession): The database session.
+        film_id (int): The ID of the film.
+        names (list[str]): Normalized tag names.
+    Returns:
+        list[str] | None: The film's sorted tag names, or None if the film
+        does not exist.
+    """
+    result = await db.execute(select(Film.id).where(Film.id == film_id))
+    if result.scalar_one_or_none() is None:
+        return None
+    names = sorted(set(names))
+    await _replace_film_tags(db, film_id, names)
+    _add_outbox_event(db, "film.tagged", film_id, {"id": film_id, "tags": names})
+    await db.commit()
+    return names
+
+
+def genre_tags(genre: str) -> list[str]:
+    """
+    Derive tags from a genre: "Action/Comedy" or "Action, Comedy" gives
+    ``["action", "comedy"]``.
+    Args:
+        genre (str): The film's genre.
+    Returns:
+        list[str]: Sorted, normalized tag names.
+    """
+    return sorted(
+        {
+            name
+            for name in (part.strip().lower()[:50] for part in re.split(r"[/,]", genre))
+            if name
+        }
+    )
+
+
+async def _get_film_tag_names(db: AsyncSession, film_id: int) -> list[str]:
+    """
+    Retrieve the tag names of one film.
+    """
+    result = await db.execute(
+        select(Tag.name)
+        .join(FilmTag, FilmTag.tag_id == Tag.id)
+        .where(FilmTag.film_id == film_id)
+    )
+    return list(result.scalars().all())
+
+
+async def _replace_film_tags(db: AsyncSession, film_id: int, names: list[str]):
+    """
+    Replace the tag links of a film without committing, creating tags that
+    do not exist yet. Tags derived from the genre get no ``film.tagged``
+    event, since consumers can derive them from the film events.
+    """
+    tag_ids = []
+    if names:
+        await db.execute(
+            dialect_insert(db, Tag)
+            .values([{"name": name} for name in names])
+            .on_conflict_do_nothing(index_elements=["name"])
+        )
+        result = await db.execute(select(Tag.id).where(Tag.name.in_(names)))
+        tag_ids = result.scalars().all()
+    await db.execute(delete(FilmTag).where(FilmTag.film_id == film_id))
+    if tag_ids:
+        await db.execute(
+            insert(FilmTag),
+            [{"film_id": film_id, "tag_id": tag_id} for tag_id in tag_ids],
+        )
+
+
+async def get_film_tag_pairs(db: AsyncSession):
+    """
+    Retrieve every film-tag link with the tag name, for building the tag index.
+    Args:
+        db (AsyncSession): The database session.
+    Returns:
+        list[tuple[int, str]]: (film ID, tag name) pairs.
+    """
+    result = await db.execute(
+        select(FilmTag.film_id, Tag.name).join(Tag, Tag.id == FilmTag.tag_id)
+    )
+    return [tuple(row) for row in result.all()]
+
+
 async def create_user(db: AsyncSession, user: UserCreate):
     """
      Create a new user with hashed password.
@@ -102,11 +441,122 @@ async def create_user(db: AsyncSession, user: UserCreate):
     hashed = hash_password(user.password)
     db_user = User(email=user.email, hashed_password=hashed, role=user.role)
     db.add(db_user)
+    await db.flush()
+    _add_outbox_event(
+        db,
+        "user.created",
+        db_user.id,
+        {"id": db_user.id, "email": db_user.email, "role": db_user.role},
+    )
     await db.commit()
     await db.refresh(db_user)
     return db_user
 
 
+async def bulk_create_users(db: AsyncSession, users: list[UserImport]):
+    """
+    Create many users at once, hashing passwords across a process pool.
+    Rows are inserted in batches with ``ON CONFLICT DO NOTHING`` on email, so
+    existing accounts are skipped without a lookup per row. Rows carrying a
+    ``hashed_password`` in a supported scheme are stored verbatim.
+    Args:
+        db (AsyncSession): The database session.
+        users (list[UserImport]): The users to create.
+    Returns:
+        list[dict]: One ``{"email", "status", "detail"}`` outcome per input row,
+        where status is ``created``, ``exists``, ``duplicate`` or ``invalid``.
+    """
+    outcomes = [{"email": user.email, "status": None, "detail": None} for user in users]
+    pending = []
+    seen = set()
+    for index, user in enumerate(users):
+        outcome = outcomes[index]
+        if user.email in seen:
+            outcome["status"] = "duplicate"
+            outcome["detail"] = "Email repeated in this batch"
+        elif (user.password is None) == (user.hashed_password is None):
+            outcome["status"] = "invalid"
+            outcome["detail"] = "Provide exactly one of password or hashed_password"
+        elif user.hashed_password is not None and not is_password_hash(
+            user.hashed_password
+        ):
+            outcome["status"] = "invalid"
+            outcome["detail"] = "Unsupported password hash format"
+        else:
+            seen.add(user.email)
+            pending.append(index)
+
+    to_hash = [index for index in pending if users[index].password is not None]
+    hashed = dict(
+        zip(to_hash, await hash_passwords([users[i].password for i in to_hash]))
+    )
+
+    rows = [
+        {
+            "email": users[index].email,
+            "hashed_password": hashed.get(index, users[index].hashed_password),
+            "role": users[index].role,
+            "is_active": users[index].is_active,
+        }
+        for index in pending
+    ]
+    created = set()
+    stmt = (
+        dialect_insert(db, User)
+        .on_conflict_do_nothing(index_elements=["email"])
+        .returning(User.id, User.email, User.role)
+    )
+    for start in range(0, len(rows), IMPORT_BATCH_SIZE):
+        result = await db.execute(stmt, rows[start : start + IMPORT_BATCH_SIZE])
+        inserted = result.all()
+        if inserted:
+            await db.execute(
+                insert(OutboxEvent),
+                [
+                    _outbox_row(
+                        "user.created", id_, {"id": id_, "email": email, "role": role}
+                    )
+                    for id_, email, role in inserted
+                ],
+            )
+        created.update(email for _, email, _ in inserted)
+        await db.commit()
+
+    for index in pending:
+        outcomes[index]["status"] = (
+            "created" if users[index].email in created else "exists"
+        )
+    return outcomes
+
+
+async def activate_users(db: AsyncSession, emails: list[str]):
+    """
+    Activate all users with the given emails using set-based UPDATE statements.
+    Emails are sent in chunks to stay below the database bind-parameter limit.
+    Args:
+        db (AsyncSession): The database session.
+        emails (list[str]): Email addresses of the users to activate.
+    Returns:
+        int: Number of users matched by the emails.
+    """
+    unique_emails = list(dict.fromkeys(emails))
+    activated = 0
+    for start in range(0, len(unique_emails), ACTIVATION_CHUNK_SIZE):
+        chunk = unique_emails[start : start + ACTIVATION_CHUNK_SIZE]
+        result = await db.execute(
+            update(User)
+            .where(User.email.in_(chunk))
+            .values(is_active=True)
+            .returning(User.id)
+        )
+        user_ids = result.scalars().all()
+        if user_ids:
+            _add_outbox_event(db, "users.activated", None, {"user_ids": user_ids})
+        activated += len(user_ids)
+    await db.commit()
+    return activated
+
+
 async def get_user_by_email(db: AsyncSession, email: str):
     """
     Retrieve a user by email.
@@ -120,6 +570,42 @@ async def get_user_by_email(db: AsyncSession, email: str):
     return result.scalar_one_or_none()
 
 
+async def list_users(
+    db: AsyncSession,
+    after_id: int | None = None,
+    limit: int = 100,
+    role: str | None = None,
+    is_active: bool | None = None,
+    email_prefix: str | None = None,
+):
+    """
+    Retrieve one page of users using keyset pagination on ``id``.
+    Only public columns are selected, so password hashes are never loaded.
+    Args:
+        db (AsyncSession): The database session.
+        after_id (int | None): Return users with an ID greater than this one.
+        limit (int): Maximum number of users to return.
+        role (str | None): Only return users with this role.
+        is_active (bool | None): Only return users in this activation state.
+        email_prefix (str | None): Only return users whose email starts with it.
+    Returns:
+        list[RowMapping]: Rows with ``id``, ``email``, ``role`` and ``is_active``.
+    """
+    query = select(User.id, User.email, User.role, User.is_active)
+    if after_id is not None:
+        query = query.where(User.id > after_id)
+    if role is not None:
+        query = query.where(User.role == role)
+    if is_active is not None:
+        query = query.where(User.is_active == is_active)
+    if email_prefix:
+        # A half-open range keeps the lookup on the email index, unlike LIKE.
+        upper = email_prefix[:-1] + chr(ord(email_prefix[-1]) + 1)
+        query = query.where(User.email >= email_prefix, User.email < upper)
+    result = await db.execute(query.order_by(User.id).limit(limit))
+    return result.mappings().all()
+
+
 async def save_reset_token(db: AsyncSession, user_id: int, token: str):
     """
     Save a password reset token for a user.
@@ -156,3 +642,312 @@ async def get_user_by_reset_token(db: AsyncSession, token: str):
     )
     token_obj = result.scalar_one_or_none()
     return token_obj.user_id if token_obj else None
+
+
+async def create_session(
+    db: AsyncSession, user_id: int, token_id: str, expires_at: datetime
+):
+    """
+    Create a server-side session for a newly issued refresh token.
+    Args:
+        db (AsyncSession): The database session.
+        user_id (int): The ID of the user logging in.
+        token_id (str): The ``jti`` of the refresh token.
+        expires_at (datetime): Expiry of the refresh token.
+    Returns:
+        UserSession: The created UserSession object.
+    """
+    session = UserSession(user_id=user_id, token_id=token_id, expires_at=expires_at)
+    db.add(session)
+    await db.commit()
+    await db.refresh(session)
+    return session
+
+
+async def get_active_session(db: AsyncSession, token_id: str):
+    """
+    Retrieve a non-revoked, non-expired session by its refresh token ID.
+    Args:
+        db (AsyncSession): The database session.
+        token_id (str): The ``jti`` of the refresh token.
+    Returns:
+        UserSession | None: The session if it is still usable, else None.
+    """
+    result = await db.execute(
+        select(UserSession).where(
+            UserSession.token_id == token_id,
+            UserSession.revoked_at.is_(None),
+            UserSession.expires_at > datetime.utcnow(),
+        )
+    )
+    return result.scalar_one_or_none()
+
+
+async def rotate_session_token(
+    db: AsyncSession,
+    session_id: int,
+    old_token_id: str,
+    token_id: str,
+    expires_at: datetime,
+):
+    """
+    Replace the refresh token of a session, invalidating the previous one.
+    The update only applies while the session is unrevoked and still holds
+    ``old_token_id``, so of two concurrent refreshes with the same token
+    only one succeeds.
+    Args:
+        db (AsyncSession): The database session.
+        session_id (int): The ID of the session being refreshed.
+        old_token_id (str): The ``jti`` of the refresh token presented.
+        token_id (str): The ``jti`` of the new refresh token.
+        expires_at (datetime): Expiry of the new refresh token.
+    Returns:
+        bool: True if the token was rotated, False if it was no longer current.
+    """
+    result = await db.execute(
+        update(UserSession)
+        .where(
+            UserSession.id == session_id,
+            UserSession.token_id == old_token_id,
+            UserSession.revoked_at.is_(None),
+        )
+        .values(token_id=token_id, expires_at=expires_at)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount == 1
+
+
+async def revoke_session(db: AsyncSession, session_id: int):
+    """
+    Mark a session as revoked so its tokens are no longer accepted.
+    Args:
+        db (AsyncSession): The database session.
+        session_id (int): The ID of the session to revoke.
+    """
+    await db.execute(
+        update(UserSession)
+        .where(UserSession.id == session_id, UserSession.revoked_at.is_(None))
+        .values(revoked_at=datetime.utcnow())
+    )
+    await db.commit()
+
+
+async def get_revoked_session_ids(db: AsyncSession):
+    """
+    Retrieve IDs of revoked sessions whose tokens have not yet expired.
+    Args:
+        db (AsyncSession): The database session.
+    Returns:
+        list[int]: IDs of sessions that must still be rejected.
+    """
+    result = await db.execute(
+        select(UserSession.id).where(
+            UserSession.revoked_at.is_not(None),
+            UserSession.expires_at > datetime.utcnow(),
+        )
+    )
+    return result.scalars().all()
+
+
+async def get_order(db: AsyncSession, order_id: int, user_id: int):
+    """
+    Retrieve one of a user's orders with its items.
+    Args:
+        db (AsyncSession): The database session.
+        order_id (int): The ID of the order.
+        user_id (int): The ID of the buyer; other users' orders are not found.
+    Returns:
+        dict | None: The order with an ``items`` list, or None if not found.
+    """
+    result = await db.execute(
+        select(Order).where(Order.id == order_id, Order.user_id == user_id)
+    )
+    order = result.scalar_one_or_none()
+    return await _order_with_items(db, order) if order else None
+
+
+async def _order_with_items(db: AsyncSession, order: Order) -> dict:
+    """
+    Load the items of an order and describe both as a dict.
+    """
+    result = await db.execute(
+        select(OrderItem.film_id, OrderItem.price_cents)
+        .where(OrderItem.order_id == order.id)
+        .order_by(OrderItem.id)
+    )
+    return {
+        "id": order.id,
+        "status": order.status,
+        "total": order.total,
+        "created_at": order.created_at,
+        "items": [
+            {"film_id": film_id, "price": from_cents(price_cents)}
+            for film_id, price_cents in result.all()
+        ],
+    }
+
+
+async def _get_order_by_idempotency_key(db: AsyncSession, user_id: int, key: str):
+    """
+    Retrieve the order a user already placed with an idempotency key.
+    """
+    result = await db.execute(
+        select(Order).where(Order.user_id == user_id, Order.idempotency_key == key)
+    )
+    order = result.scalar_one_or_none()
+    return await _order_with_items(db, order) if order else None
+
+
+async def checkout(
+    db: AsyncSession,
+    user_id: int,
+    film_ids: list[int],
+    idempotency_key: str | None = None,
+):
+    """
+    Buy films for a user in a single transaction.
+    The order, its items, the ownership rows and the outbox event are written
+    with four statements regardless of the number of films. A retry with the
+    same idempotency key returns the original order without charging again,
+    including when two retries race (the unique key rejects the second).
+    Args:
+        db (AsyncSession): The database session.
+        user_id (int): The ID of the buyer.
+        film_ids (list[int]): The films to buy; duplicates are ignored.
+        idempotency_key (str | None): Client-supplied key identifying the attempt.
+    Returns:
+        tuple[dict, bool]: The order with its items, and whether it was created
+        now (False when an earlier order with the same key was returned).
+    Raises:
+        FilmsNotFound: Some films do not exist.
+        FilmsAlreadyOwned: The user already owns some of the films.
+    """
+    film_ids = list(dict.fromkeys(film_ids))
+    if idempotency_key is not None:
+        existing = await _get_order_by_idempotency_key(db, user_id, idempotency_key)
+        if existing is not None:
+            return existing, False
+
+    result = await db.execute(
+        select(Film.id, Film.price_cents).where(Film.id.in_(film_ids))
+    )
+    prices = dict(result.all())
+    missing = [film_id for film_id in film_ids if film_id not in prices]
+    if missing:
+        raise FilmsNotFound(missing)
+    result = await db.execute(
+        select(UserFilm.film_id).where(
+            UserFilm.user_id == user_id, UserFilm.film_id.in_(film_ids)
+        )
+    )
+    owned = result.scalars().all()
+    if owned:
+        raise FilmsAlreadyOwned(sorted(owned))
+
+    now = datetime.utcnow()
+    total_cents = sum(prices[film_id] for film_id in film_ids)
+    try:
+        result = await db.execute(
+            insert(Order)
+            .values(
+                user_id=user_id,
+                idempotency_key=idempotency_key,
+                status="paid",
+                total_cents=total_cents,
+                created_at=now,
+            )
+            .returning(Order.id)
+        )
+        order_id = result.scalar_one()
+        await db.execute(
+            insert(OrderItem),
+            [
+                {
+                    "order_id": order_id,
+                    "film_id": film_id,
+                    "price_cents": prices[film_id],
+                }
+                for film_id in film_ids
+            ],
+        )
+        await db.execute(
+            insert(UserFilm),
+            [
+                {
+                    "user_id": user_id,
+                    "film_id": film_id,
+                    "order_id": order_id,
+                    "purchased_at": now,
+                }
+                for film_id in film_ids
+            ],
+        )
+        _add_outbox_event(
+            db,
+            "order.created",
+            order_id,
+            {
+                "id": order_id,
+                "user_id": user_id,
+                "items": [
+                    {"film_id": film_id, "price": prices[film_id] / 100}
+                    for film_id in film_ids
+                ],
+                "total": total_cents / 100,
+            },
+        )
+        await db.commit()
+    except IntegrityError:
+        # A concurrent checkout won: either the same retry or the same films.
+        await db.rollback()
+        if idempotency_key is not None:
+            existing = await _get_order_by_idempotency_key(db, user_id, idempotency_key)
+            if existing is not None:
+                return existing, False
+        raise FilmsAlreadyOwned(film_ids)
+
+    order = {
+        "id": order_id,
+        "status": "paid",
+        "total": from_cents(total_cents),
+        "created_at": now,
+        "items": [
+            {"film_id": film_id, "price": from_cents(prices[film_id])}
+            for film_id in film_ids
+        ],
+    }
+    return order, True
+
+
+async def get_owned_film_ids(db: AsyncSession, user_id: int):
+    """
+    Retrieve the IDs of all films a user owns.
+    Args:
+        db (AsyncSession): The database session.
+        user_id (int): The ID of the user.
+    Returns:
+        list[int]: Owned film IDs.
+    """
+    result = await db.execute(
+        select(UserFilm.film_id).where(UserFilm.user_id == user_id)
+    )
+    return result.scalars().all()
+
+
+async def owns_film(db: AsyncSession, user_id: int, film_id: int):
+    """
+    Check whether a user owns a film with a primary key lookup.
+    Args:
+        db (AsyncSession): The database session.
+        user_id (int): The ID of the user.
+        film_id (int): The ID of the film.
+    Returns:
+        bool: True if the user owns the film.
+    """
+    result = await db.execute(
+        select(UserFilm.film_id).where(
+            UserFilm.user_id == user_id, UserFilm.film_id == film_id
+        )
+    )
+    return result.scalar_one_or_none() is not None
@@ -1,13 +1,105 @@
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import sessionmaker
-from settings import settings
+from settings import get_settings
+import timing
+
+SQLALCHEMY_DATABASE_URL = get_settings().DATABASE_URL
 
-SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
 
-engine = create_async_engine(SQLALCHEMY_DATABASE_URL, echo=True, future=True)
+def engine_options(url: str) -> dict:
+    """
+    Build the ``create_async_engine`` keyword arguments for a database URL.
+    SQLite keeps SQLAlchemy's defaults. Server databases get a bounded,
+    pre-pinged connection pool, and asyncpg additionally a prepared
+    statement cache, unless the URL sets one itself.
+    Args:
+        url (str): The async database URL.
+    Returns:
+        dict: Engine keyword arguments.
+    """
+    settings = get_settings()
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite":
+        return {}
+    options = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    if url.get_driver_name() == "asyncpg":
+        connect_args = {
+            "server_settings": {
+                "application_name": settings.DB_APPLICATION_NAME,
+                # JIT compilation costs more than it saves on short OLTP queries.
+                "jit": "off",
+            }
+        }
+        if "prepared_statement_cache_size" not in url.query:
+            connect_args["prepared_statement_cache_size"] = (
+                settings.DB_STATEMENT_CACHE_SIZE
+            )
+        options["connect_args"] = connect_args
+    return options
+
+
+engine = create_async_engine(
+    SQLALCHEMY_DATABASE_URL,
+    future=True,
+    **engine_options(SQLALCHEMY_DATABASE_URL),
+)
 """
-Async SQLAlchemy engine instance connected to the SQLite database at './online_cinema.db'.
+Async SQLAlchemy engine for the ``DATABASE_URL`` setting: SQLite by default,
+PostgreSQL (asyncpg) in production.
 """
+
+
+def enable_sqlite_foreign_keys(async_engine):
+    """
+    Make SQLite enforce foreign keys and ``ON DELETE CASCADE`` like
+    PostgreSQL does; SQLite ignores them unless enabled per connection.
+    Args:
+        async_engine (AsyncEngine): A SQLite engine.
+    """
+
+    @event.listens_for(async_engine.sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+
+if engine.dialect.name == "sqlite":
+    enable_sqlite_foreign_keys(engine)
+
+
+def time_queries(async_engine):
+    """
+    Report the duration of every statement to the request timing
+    collector as the ``db`` phase.
+    Args:
+        async_engine (AsyncEngine): The engine to instrument.
+    """
+
+    @event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info["query_start"] = time.perf_counter()
+
+    @event.listens_for(async_engine.sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        timing.record("db", (time.perf_counter() - conn.info["query_start"]) * 1000)
+
+
+if get_settings().TIMING_ENABLED:
+    time_queries(engine)
+
+
 SessionLocal = sessionmaker(
     engine, class_=AsyncSession, expire_on_commit=False, future=True
 )
@@ -29,3 +121,17 @@ async def get_db():
     """
     async with SessionLocal() as session:
         yield session
+
+
+def dialect_insert(db: AsyncSession, model):
+    """
+    Build an INSERT for the session's backend that supports ``ON CONFLICT``.
+    Args:
+        db (AsyncSession): The database session whose dialect is used.
+        model: The ORM model or table to insert into.
+    Returns:
+        Insert: A PostgreSQL or SQLite specific INSERT construct.
+    """
+    if db.bind.dialect.name == "postgresql":
+        return postgresql.insert(model)
+    return sqlite.insert(model)
@@ -0,0 +1,373 @@
+import asyncio
+import glob
+import json
+import logging
+import os
+from datetime import datetime
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+
+from models import Film, User, WatchEvent
+
+logger = logging.getLogger(__name__)
+
+
+class BufferFull(Exception):
+    """
+    Raised when the ingestion buffer is full and no spill file is configured.
+    """
+
+
+class WatchEventBuffer:
+    """
+    Write-behind buffer for playback events.
+    Requests enqueue events and return immediately; a background task drains
+    the queue and inserts events with one executemany per transaction once
+    ``batch_size`` events are waiting or ``flush_interval`` seconds have
+    passed since the first one. When the queue is full, events are appended
+    to a JSON Lines spill file (one per process, fsynced) and replayed once
+    the queue has drained; without a spill file the caller gets BufferFull
+    and should ask the client to retry later. Batches that fail to insert are
+    spilled too. Without a spill file they are retried from memory up to
+    ``max_attempts`` times, then dropped and logged, so one batch the
+    database keeps rejecting cannot stall ingestion.
+    Attributes:
+        accepted (int): Events enqueued in memory.
+        spilled (int): Events written to the spill file.
+        flushed (int): Events inserted into the database.
+        dropped (int): Events discarded because their film or user is gone.
+        failed (int): Events discarded after ``max_attempts`` failed inserts.
+        batches (int): Insert transactions committed.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        batch_size: int = 1000,
+        flush_interval: float = 0.5,
+        capacity: int = 50000,
+        spill_path: str | None = None,
+        max_attempts: int = 5,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spill_path = spill_path
+        self.max_attempts = max_attempts
+        self.queue: asyncio.Queue[dict] = asyncio.Queue(maxsize=capacity)
+        self.accepted = 0
+        self.spilled = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+        self._needs_replay = spill_path is not None
+        self._spill_lock = asyncio.Lock()
+        self._retry: list[dict] = []
+        self._attempts = 0
+        self._task: asyncio.Task | None = None
+
+    async def offer(self, events: list[dict]) -> tuple[int, int]:
+        """
+        Enqueue events, spilling whatever does not fit.
+        Returns (events queued in memory, events spilled to disk).
+        Raises BufferFull, without queueing anything, if the events do not
+        all fit and there is no spill file, so the client can retry safely.
+        """
+        free = self.queue.maxsize - self.queue.qsize()
+        if self.spill_path is None and len(events) > free:
+            raise BufferFull(len(events))
+        queued = 0
+        for event in events:
+            try:
+                self.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                break
+            queued += 1
+        self.accepted += queued
+        overflow = events[queued:]
+        if overflow:
+            await self.spill(overflow)
+        return queued, len(overflow)
+
+    async def spill(self, events: list[dict]):
+        """
+        Durably append events to this process's spill file.
+        """
+        lines = "".join(json.dumps(event, default=str) + "\n" for event in events)
+        async with self._spill_lock:
+            await asyncio.to_thread(_append_synced, self._own_spill_file(), lines)
+        self.spilled += len(events)
+        self._needs_replay = True
+
+    async def flush(self, events: list[dict]):
+        """
+        Insert one batch of events in a single transaction.
+        If the batch violates a foreign key, events for films or users that
+        no longer exist are dropped and the rest inserted, so one stale event
+        cannot block its batch forever.
+        """
+        rows = [_row(event) for event in events]
+        async with self.session_factory() as db:
+            try:
+                await db.execute(insert(WatchEvent), rows)
+                await db.commit()
+            except IntegrityError:
+                await db.rollback()
+                rows = await _existing_references(db, rows)
+                self.dropped += len(events) - len(rows)
+                logger.warning(
+                    "Dropped %d watch events for missing films or users",
+                    len(events) - len(rows),
+                )
+                if rows:
+                    await db.execute(insert(WatchEvent), rows)
+                    await db.commit()
+        self.flushed += len(rows)
+        self.batches += 1
+
+    async def next_batch(self) -> list[dict]:
+        """
+        Wait for the first event, then collect more until the batch is full
+        or the flush interval has passed. While spilled events are waiting
+        to be replayed, returns an empty batch after one idle interval.
+        """
+        if self._needs_replay:
+            try:
+                first = await asyncio.wait_for(self.queue.get(), self.flush_interval)
+            except asyncio.TimeoutError:
+                return []
+        else:
+            first = await self.queue.get()
+        batch = [first]
+        deadline = asyncio.get_running_loop().time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def replay_spill(self) -> int:
+        """
+        Insert events from spill files this process may claim: its own, and
+        those left behind by processes that are no longer running.
+        Returns the number of events replayed.
+        """
+        if self.spill_path is None:
+            return 0
+        replayed = 0
+        self._needs_replay = False
+        for claimed in await self._claim_spill_files():
+            events = await asyncio.to_thread(_read_lines, claimed)
+            start = 0
+            try:
+                for start in range(0, len(events), self.batch_size):
+                    await self.flush(events[start : start + self.batch_size])
+            except Exception:
+                # Keep the events that were not inserted for a later replay.
+                lines = "".join(
+                    json.dumps(event, default=str) + "\n" for event in events[start:]
+                )
+                async with self._spill_lock:
+                    await asyncio.to_thread(
+                        _append_synced, self._own_spill_file(), lines
+                    )
+                os.remove(claimed)
+                self._needs_replay = True
+                raise
+            os.remove(claimed)
+            replayed += len(events)
+        return replayed
+
+    async def _claim_spill_files(self) -> list[str]:
+        """
+        Rename claimable spill files to ``<file>.<pid>.replaying``, naming
+        this process as the one replaying them. Files claimed by a process
+        that died during its replay are claimed again.
+        Returns the claimed paths.
+        """
+        suffix = f".{os.getpid()}.replaying"
+        candidates = []
+        for path in glob.glob(f"{self.spill_path}.*.jsonl"):
+            pid = path[len(self.spill_path) + 1 : -len(".jsonl")]
+            if pid.isdigit() and (int(pid) == os.getpid() or not _pid_alive(int(pid))):
+                candidates.append((path, path + suffix))
+        for path in glob.glob(f"{self.spill_path}.*.jsonl.*.replaying"):
+            spill_file, _, pid = path[: -len(".replaying")].rpartition(".")
+            if pid.isdigit() and int(pid) != os.getpid() and not _pid_alive(int(pid)):
+                candidates.append((path, spill_file + suffix))
+        claimed = []
+        async with self._spill_lock:
+            for path, target in candidates:
+                try:
+                    os.replace(path, target)
+                except FileNotFoundError:
+                    continue  # Claimed by another process.
+                claimed.append(target)
+        return claimed
+
+    async def run(self):
+        """
+        Flush batches until cancelled, replaying spilled events when idle.
+        """
+        while True:
+            if self._needs_replay and self.queue.empty():
+                try:
+                    await self.replay_spill()
+                except Exception:
+                    logger.exception("Watch event spill replay failed")
+            batch = self._retry or await self.next_batch()
+            self._retry = []
+            if not batch:
+                continue
+            try:
+                await self.flush(batch)
+                self._attempts = 0
+            except asyncio.CancelledError:
+                await self._set_aside(batch)
+                raise
+            except Exception:
+                logger.exception("Watch event flush failed")
+                await self._set_aside(batch)
+                await asyncio.sleep(self.flush_interval)
+
+    async def _set_aside(self, batch: list[dict]):
+        # Spill a failed batch, or keep it for the next attempt without a
+        # spill file until it has failed max_attempts times.
+        if self.spill_path is not None:
+            await self.spill(batch)
+            return
+        self._attempts += 1
+        if self._attempts < self.max_attempts:
+            self._retry = batch
+            return
+        self._attempts = 0
+        self.failed += len(batch)
+        logger.error(
+            "Dropped %d watch events after %d failed inserts",
+            len(batch),
+            self.max_attempts,
+            extra={"watch_events": batch},
+        )
+
+    def start(self):
+        """
+        Run the flusher as a background task.
+        """
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        """
+        Stop the flusher and write out everything still queued.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        pending = self._retry
+        self._retry = []
+        while not self.queue.empty():
+            pending.append(self.queue.get_nowait())
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start : start + self.batch_size]
+            try:
+                await self.flush(batch)
+            except Exception:
+                if self.spill_path is None:
+                    raise
+                logger.exception("Watch event flush failed, spilling batch")
+                await self.spill(batch)
+
+    def stats(self) -> dict:
+        """
+        Return counters and the current queue depth.
+        """
+        return {
+            "queued": self.queue.qsize(),
+            "accepted": self.accepted,
+            "spilled": self.spilled,
+            "flushed": self.flushed,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "batches": self.batches,
+        }
+
+    def _own_spill_file(self) -> str:
+        return f"{self.spill_path}.{os.getpid()}.jsonl"
+
+
+def _row(event: dict) -> dict:
+    """
+    Turn a queued or spilled event into WatchEvent column values.
+    """
+    watched_at = event["watched_at"]
+    if isinstance(watched_at, str):
+        watched_at = datetime.fromisoformat(watched_at)
+    return {
+        "user_id": event["user_id"],
+        "film_id": event["film_id"],
+        "position_seconds": event["position_seconds"],
+        "watched_at": watched_at,
+    }
+
+
+async def _existing_references(db, rows: list[dict]) -> list[dict]:
+    """
+    Keep the rows whose film and user still exist.
+    """
+    film_ids = {row["film_id"] for row in rows}
+    user_ids = {row["user_id"] for row in rows}
+    films = set(
+        (await db.execute(select(Film.id).where(Film.id.in_(film_ids)))).scalars()
+    )
+    users = set(
+        (await db.execute(select(User.id).where(User.id.in_(user_ids)))).scalars()
+    )
+    return [row for row in rows if row["film_id"] in films and row["user_id"] in users]
+
+
+def _append_synced(path: str, lines: str):
+    with open(path, "a", encoding="utf-8") as handle:
+        handle.write(lines)
+        handle.flush()
+        os.fsync(handle.fileno())
+
+
+def _read_lines(path: str) -> list[dict]:
+    with open(path, encoding="utf-8") as handle:
+        return [json.loads(line) for line in handle if line.strip()]
+
+
+def _pid_alive(pid: int) -> bool:
+    """
+    Return whether a process exists. Always True on Windows, where probing
+    with signal 0 would terminate the process.
+    """
+    if os.name == "nt":
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+buffer: WatchEventBuffer | None = None
+"""
+The process-wide watch event buffer, created on startup.
+"""
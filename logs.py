@@ -0,0 +1,183 @@
+import copy
+import json
+import logging
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+# Attributes every LogRecord has; anything else on a record came from ``extra``.
+RECORD_ATTRIBUTES = frozenset(
+    vars(logging.LogRecord("", logging.INFO, "", 0, "", None, None))
+) | {"message", "asctime", "taskName"}
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Format records as one JSON object per line. Fields passed with
+    ``extra`` are included as top-level keys; values JSON cannot encode
+    are written as strings.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        """
+        Render a record as a JSON line.
+        param record: The log record.
+        return: The JSON document.
+        """
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DebugSampler(logging.Filter):
+    """
+    Keep only a random fraction of DEBUG records; higher levels always pass.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """
+        Decide whether a record is kept.
+        param record: The log record.
+        return: False if the record is dropped.
+        """
+        return record.levelno > logging.DEBUG or random.random() < self.rate
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Queue handler that never waits: when the queue is full the record is
+    dropped and counted instead of blocking the caller.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Merge the arguments into the message and render the traceback now,
+        while they still hold the values at the time of the call; the
+        formatter runs later on the listener thread.
+        param record: The log record.
+        return: A copy that is safe to hand to another thread.
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        """
+        Put a record on the queue, or drop it if the queue is full.
+        param record: The prepared log record.
+        """
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def parse_levels(levels: str) -> dict[str, str]:
+    """
+    Parse per-logger levels written as ``name=LEVEL`` pairs.
+    param levels: Comma-separated pairs, e.g. "sqlalchemy.engine=INFO,tags=DEBUG".
+    return: Mapping of logger name to upper-case level name.
+    """
+    parsed = {}
+    for pair in levels.split(","):
+        if not pair.strip():
+            continue
+        name, _, level = pair.partition("=")
+        parsed[name.strip()] = level.strip().upper()
+    return parsed
+
+
+class LogPipeline:
+    """
+    Asynchronous logging: the root logger only puts records on a bounded
+    queue, and a ``QueueListener`` thread formats them and writes them to
+    the stream, so no log I/O happens on the event loop. Started per
+    process, since threads do not survive a fork.
+    """
+
+    def __init__(
+        self,
+        level: str = "INFO",
+        levels: dict[str, str] | None = None,
+        json_format: bool = True,
+        debug_sample_rate: float = 1.0,
+        queue_size: int = 10000,
+        stream=None,
+    ):
+        self.level = level
+        self.levels = levels or {}
+        self.queue_handler = NonBlockingQueueHandler(queue.Queue(queue_size))
+        self.queue_handler.addFilter(DebugSampler(debug_sample_rate))
+        self.stream_handler = logging.StreamHandler(stream or sys.stderr)
+        self.stream_handler.setFormatter(
+            JSONFormatter()
+            if json_format
+            else logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s")
+        )
+        self.listener = QueueListener(
+            self.queue_handler.queue, self.stream_handler, respect_handler_level=True
+        )
+        self._previous_levels: dict[str, int] = {}
+
+    def start(self):
+        """
+        Install the queue handler on the root logger, apply the levels and
+        start the writer thread.
+        """
+        for name, level in {"": self.level, **self.levels}.items():
+            logger = logging.getLogger(name)
+            self._previous_levels[name] = logger.level
+            logger.setLevel(level)
+        logging.getLogger().addHandler(self.queue_handler)
+        self.listener.start()
+
+    def stop(self):
+        """
+        Remove the queue handler, restore the levels and write out the
+        records still queued.
+        """
+        logging.getLogger().removeHandler(self.queue_handler)
+        for name, level in self._previous_levels.items():
+            logging.getLogger(name).setLevel(level)
+        self._previous_levels.clear()
+        self.listener.stop()
+
+    def stats(self) -> dict:
+        """
+        Return the number of queued and dropped records.
+        """
+        return {
+            "queued": self.queue_handler.queue.qsize(),
+            "dropped": self.queue_handler.dropped,
+        }
+
+
+pipeline: LogPipeline | None = None
+"""
+The process's logging pipeline, set on startup.
+"""
@@ -1,7 +1,10 @@
+import logging
 import smtplib
 
 from email.mime.text import MIMEText
-from settings import settings
+from settings import get_settings
+
+logger = logging.getLogger(__name__)
 
 
 def send_email(to_email: str, subject: str, body: str):
@@ -11,6 +14,11 @@ def send_email(to_email: str, subject: str, body: str):
     param subject: Subject of the email.
     param body: Body content of the email.
     """
+    settings = get_settings()
+    if not settings.EMAIL_HOST:
+        logger.info("Email not configured, skipping", extra={"subject": subject})
+        return
+
     msg = MIMEText(body)
     msg["Subject"] = subject
     msg["From"] = settings.EMAIL_FROM
@@ -21,9 +29,9 @@ def send_email(to_email: str, subject: str, body: str):
             server.starttls()
             server.login(settings.EMAIL_USER, settings.EMAIL_PASS)
             server.send_message(msg)
-        print("Email sent")
-    except Exception as e:
-        print(f"Failed to send email: {e}")
+        logger.info("Email sent", extra={"subject": subject})
+    except Exception:
+        logger.exception("Failed to send email", extra={"subject": subject})
 
 
 def send_activation_email(user_email: str, token: str):
@@ -1,24 +1,186 @@
+from datetime import timedelta
+
 from fastapi import FastAPI
-from routers import users, movies, auth
-from database import engine
+from routers import users, movies, auth, admin, orders, watch
+from database import engine, SessionLocal
 from models import Base
+from security import (
+    get_secret_key,
+    load_revoked_sessions,
+    start_revocation_refresh,
+    stop_revocation_refresh,
+)
+from crud import film_listeners
+import catalog
+import changes
+import ingest
+import logs
+import popularity
+import profiling
+import similarity
+import tags
+from outbox import InProcessSink, JsonlFileSink, OutboxRelay
+from utils import shutdown_hash_pool
+from serialization import FastJSONResponse, TimedJSONResponse
+from compression import CompressionMiddleware
+from profiling import ProfileStore, ProfilingMiddleware
+from timing import TimingMiddleware
+from settings import get_settings
 
 
-app = FastAPI()
+app = FastAPI(
+    default_response_class=(
+        FastJSONResponse if get_settings().FAST_JSON else TimedJSONResponse
+    )
+)
 """
 FastAPI application instance.
 """
 
+outbox_relay: OutboxRelay | None = None
+"""
+Background outbox relay, started on startup when enabled.
+"""
+
+if get_settings().COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=get_settings().COMPRESSION_MINIMUM_SIZE,
+        encodings=[
+            encoding.strip()
+            for encoding in get_settings().COMPRESSION_ENCODINGS.split(",")
+            if encoding.strip()
+        ],
+        gzip_level=get_settings().COMPRESSION_GZIP_LEVEL,
+        brotli_quality=get_settings().COMPRESSION_BROTLI_QUALITY,
+        zstd_level=get_settings().COMPRESSION_ZSTD_LEVEL,
+        cache_paths=("/movies",),
+        cache_size=get_settings().COMPRESSION_CACHE_SIZE,
+    )
+
+if get_settings().PROFILING_ENABLED:
+    profiling.store = ProfileStore(
+        get_settings().PROFILING_DIR, get_settings().PROFILING_CAPACITY
+    )
+    app.add_middleware(
+        ProfilingMiddleware,
+        store=profiling.store,
+        sample_rate=get_settings().PROFILING_SAMPLE_RATE,
+        token=get_settings().PROFILING_TOKEN,
+        min_duration_ms=get_settings().PROFILING_MIN_DURATION_MS,
+    )
+
+if get_settings().TIMING_ENABLED:
+    # Added last so it is outermost and its total covers the other middleware.
+    app.add_middleware(TimingMiddleware, header=get_settings().SERVER_TIMING_HEADER)
+
 
 @app.on_event("startup")
 async def on_startup():
     """
-    Create all database tables on application startup.
+    Check that SECRET_KEY is set, start the logging pipeline, create
+    missing tables if enabled, load revoked sessions, the catalog snapshot
+    and similar films (if enabled) and the tag index, start the tag index
+    and revocation refreshes, the watch event buffer, the popularity
+    counters and the outbox tail feeding the change feed, and start the
+    outbox relay if enabled on application startup.
+    """
+    settings = get_settings()
+    get_secret_key()
+    levels = logs.parse_levels(settings.LOG_LEVELS)
+    if settings.DB_ECHO:
+        levels.setdefault("sqlalchemy.engine", "INFO")
+    logs.pipeline = logs.LogPipeline(
+        level=settings.LOG_LEVEL,
+        levels=levels,
+        json_format=settings.LOG_FORMAT == "json",
+        debug_sample_rate=settings.LOG_DEBUG_SAMPLE_RATE,
+        queue_size=settings.LOG_QUEUE_SIZE,
+    )
+    logs.pipeline.start()
+
+    if settings.AUTO_CREATE_TABLES:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    async with SessionLocal() as db:
+        await load_revoked_sessions(db)
+        if settings.CATALOG_SNAPSHOT:
+            await catalog.load_catalog(db)
+            film_listeners.append(catalog.snapshot.apply)
+        if settings.SIMILAR_FILMS:
+            index = await similarity.load_similarity(db, settings.SIMILAR_FILMS_K)
+            film_listeners.append(index.apply)
+        await tags.load_tags(db)
+    film_listeners.append(tags.index.apply)
+    tags.start_refresh(SessionLocal, settings.TAG_INDEX_REFRESH_SECONDS)
+    start_revocation_refresh(SessionLocal, settings.REVOCATION_REFRESH_SECONDS)
+
+    ingest.buffer = ingest.WatchEventBuffer(
+        SessionLocal,
+        batch_size=settings.WATCH_BATCH_SIZE,
+        flush_interval=settings.WATCH_FLUSH_INTERVAL,
+        capacity=settings.WATCH_BUFFER_CAPACITY,
+        spill_path=settings.WATCH_SPILL_PATH,
+        max_attempts=settings.WATCH_MAX_ATTEMPTS,
+    )
+    ingest.buffer.start()
+    popularity.counters = popularity.PopularityCounters(
+        SessionLocal,
+        half_life=timedelta(hours=settings.POPULARITY_HALF_LIFE_HOURS),
+        flush_interval=settings.POPULARITY_FLUSH_INTERVAL,
+        top_k=settings.TRENDING_SIZE,
+    )
+    await popularity.counters.start()
+    film_listeners.append(popularity.counters.apply)
+    changes.tail = changes.OutboxTail(
+        SessionLocal,
+        changes.feed,
+        film_listeners,
+        interval=settings.CHANGE_FEED_POLL_INTERVAL,
+    )
+    await changes.tail.start()
+
+    if settings.OUTBOX_RELAY_ENABLED:
+        global outbox_relay
+        sinks = [InProcessSink()]
+        if settings.OUTBOX_FILE_PATH:
+            sinks.append(JsonlFileSink(settings.OUTBOX_FILE_PATH))
+        outbox_relay = OutboxRelay(
+            SessionLocal,
+            sinks,
+            batch_size=settings.OUTBOX_BATCH_SIZE,
+            poll_interval=settings.OUTBOX_POLL_INTERVAL,
+        )
+        outbox_relay.start()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    """
+    Flush buffered watch events and popularity counts, stop the outbox relay,
+    outbox tail, tag index and revocation refreshes and background worker
+    processes, close database connections and write out queued log
+    records on application shutdown.
     """
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    if ingest.buffer is not None:
+        await ingest.buffer.stop()
+    if popularity.counters is not None:
+        await popularity.counters.stop()
+    if outbox_relay is not None:
+        await outbox_relay.stop()
+    if changes.tail is not None:
+        await changes.tail.stop()
+    await tags.stop_refresh()
+    await stop_revocation_refresh()
+    shutdown_hash_pool()
+    await engine.dispose()
+    if logs.pipeline is not None:
+        logs.pipeline.stop()
 
 
 app.include_router(users.router)
 app.include_router(movies.router)
 app.include_router(auth.router)
+app.include_router(admin.router)
+app.include_router(orders.router)
+app.include_router(watch.router)
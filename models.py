@@ -1,6 +1,20 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, DateTime
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    Float,
+    Boolean,
+    ForeignKey,
+    DateTime,
+    Index,
+    Text,
+    UniqueConstraint,
+)
 from sqlalchemy.orm import declarative_base
 from datetime import datetime
+from decimal import Decimal
+
+from money import from_cents, to_cents
 
 
 Base = declarative_base()
@@ -14,16 +28,23 @@ class User(Base):
     Represents a user in the system.
     Attributes:
         id (int): Primary key.
-        email (str): User's email, unique.
+        email (str): User's email, unique through the ix_users_email index.
         hashed_password (str): Hashed user password.
         role (str): User role (default 'user').
         is_active (bool): Indicates if user is active.
+    The composite indexes serve the keyset-paginated admin listing, which
+    filters by role and/or activation state and orders by id.
     """
 
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_email", "email", unique=True),
+        Index("ix_users_role_is_active_id", "role", "is_active", "id"),
+        Index("ix_users_is_active_id", "is_active", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    email = Column(String, unique=True, index=True, nullable=False)
+    email = Column(String, unique=False, nullable=False)
     hashed_password = Column(String, nullable=False)
     role = Column(String, nullable=False, default="user")
     is_active = Column(Boolean, nullable=False, default=False)
@@ -36,7 +57,8 @@ class Film(Base):
         id (int): Primary key.
         title (str): Title of the film.
         genre (str): Genre of the film.
-        price (float): Price of the film.
+        price_cents (int): Price of the film in cents.
+        price (Decimal): Price in currency units, converted to and from cents.
     """
 
     __tablename__ = "films"
@@ -44,7 +66,21 @@ class Film(Base):
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, index=True, nullable=False)
     genre = Column(String, index=True, nullable=False)
-    price = Column(Float, nullable=False)
+    price_cents = Column(Integer, nullable=False)
+
+    @property
+    def price(self) -> Decimal:
+        """
+        Price in currency units.
+        """
+        return from_cents(self.price_cents)
+
+    @price.setter
+    def price(self, value):
+        """
+        Set the price from an amount in currency units.
+        """
+        self.price_cents = to_cents(value)
 
 
 class PasswordResetToken(Base):
@@ -63,3 +99,211 @@ class PasswordResetToken(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     token = Column(String, unique=True, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class UserSession(Base):
+    """
+    Server-side login session backing a refresh token.
+    Attributes:
+        id (int): Primary key, embedded in tokens as ``sid``.
+        user_id (int): Foreign key to the user.
+        token_id (str): Identifier (``jti``) of the current refresh token.
+        created_at (datetime): Session creation timestamp.
+        expires_at (datetime): When the refresh token stops being accepted.
+        revoked_at (datetime | None): Set when the session is logged out.
+    """
+
+    __tablename__ = "sessions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    token_id = Column(String, unique=True, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False)
+    revoked_at = Column(DateTime, nullable=True)
+
+
+class OutboxEvent(Base):
+    """
+    Event written in the same transaction as the mutation it describes,
+    later delivered to other systems by the outbox relay.
+    Attributes:
+        id (int): Primary key, also the delivery order.
+        event_type (str): Event name, e.g. 'film.created'.
+        aggregate_id (int | None): ID of the affected film or user.
+        payload (str): JSON-encoded event body.
+        created_at (datetime): When the mutation was committed.
+        processed_at (datetime | None): When the relay delivered the event.
+        claimed_until (datetime | None): End of the lease of the relay
+            delivering the event; other relays skip it until then.
+    """
+
+    __tablename__ = "outbox_events"
+    __table_args__ = (Index("ix_outbox_events_processed_at_id", "processed_at", "id"),)
+
+    id = Column(Integer, primary_key=True)
+    event_type = Column(String, nullable=False)
+    aggregate_id = Column(Integer, nullable=True)
+    payload = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    processed_at = Column(DateTime, nullable=True)
+    claimed_until = Column(DateTime, nullable=True)
+
+
+class Order(Base):
+    """
+    A completed purchase of one or more films.
+    Attributes:
+        id (int): Primary key.
+        user_id (int): Foreign key to the buyer.
+        idempotency_key (str | None): Client-supplied key; a retried checkout
+            with the same key returns this order instead of charging again.
+        status (str): Order status (default 'paid').
+        total_cents (int): Sum of the item prices in cents.
+        created_at (datetime): Checkout timestamp.
+    """
+
+    __tablename__ = "orders"
+    __table_args__ = (
+        UniqueConstraint(
+            "user_id", "idempotency_key", name="uq_orders_user_id_idempotency_key"
+        ),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    idempotency_key = Column(String, nullable=True)
+    status = Column(String, nullable=False, default="paid")
+    total_cents = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    @property
+    def total(self) -> Decimal:
+        """
+        Order total in currency units.
+        """
+        return from_cents(self.total_cents)
+
+
+class OrderItem(Base):
+    """
+    One film in an order, with the price paid at checkout.
+    Attributes:
+        id (int): Primary key.
+        order_id (int): Foreign key to the order.
+        film_id (int): Foreign key to the film.
+        price_cents (int): Film price in cents at the time of purchase.
+    """
+
+    __tablename__ = "order_items"
+
+    id = Column(Integer, primary_key=True)
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False, index=True)
+    film_id = Column(Integer, ForeignKey("films.id"), nullable=False)
+    price_cents = Column(Integer, nullable=False)
+
+    @property
+    def price(self) -> Decimal:
+        """
+        Price paid in currency units.
+        """
+        return from_cents(self.price_cents)
+
+
+class UserFilm(Base):
+    """
+    A film owned by a user. The composite primary key makes the ownership
+    check a single index lookup and prevents buying the same film twice.
+    Attributes:
+        user_id (int): Foreign key to the owner.
+        film_id (int): Foreign key to the film.
+        order_id (int): Foreign key to the order that granted ownership.
+        purchased_at (datetime): Purchase timestamp.
+    """
+
+    __tablename__ = "user_films"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    film_id = Column(Integer, ForeignKey("films.id"), primary_key=True)
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False)
+    purchased_at = Column(DateTime, default=datetime.utcnow)
+
+
+class WatchEvent(Base):
+    """
+    A playback progress report, written in batches by the ingestion buffer.
+    Attributes:
+        id (int): Primary key.
+        user_id (int): Foreign key to the viewer.
+        film_id (int): Foreign key to the film.
+        position_seconds (int): Playback position when the event was sent.
+        watched_at (datetime): When the client recorded the event.
+    """
+
+    __tablename__ = "watch_events"
+    __table_args__ = (
+        Index("ix_watch_events_user_id_watched_at", "user_id", "watched_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    film_id = Column(Integer, ForeignKey("films.id"), nullable=False)
+    position_seconds = Column(Integer, nullable=False)
+    watched_at = Column(DateTime, nullable=False)
+
+
+class FilmStats(Base):
+    """
+    Aggregated popularity counters of a film, written by periodic flushes.
+    Attributes:
+        film_id (int): Primary key and foreign key to the film.
+        view_count (int): Total views.
+        purchase_count (int): Total purchases.
+        score (float): Decayed popularity score relative to the start of
+            ``epoch``; only its order is meaningful.
+        epoch (int): Score epoch, see ``popularity.EPOCH_HALF_LIVES``.
+    """
+
+    __tablename__ = "film_stats"
+
+    film_id = Column(
+        Integer, ForeignKey("films.id", ondelete="CASCADE"), primary_key=True
+    )
+    view_count = Column(Integer, nullable=False, default=0)
+    purchase_count = Column(Integer, nullable=False, default=0)
+    score = Column(Float, nullable=False, default=0.0, index=True)
+    epoch = Column(Integer, nullable=False, default=0, server_default="0")
+
+
+class Tag(Base):
+    """
+    A genre or free-form tag that films can carry.
+    Attributes:
+        id (int): Primary key.
+        name (str): Normalized tag name (trimmed, lowercase), unique.
+    """
+
+    __tablename__ = "tags"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(50), unique=True, nullable=False)
+
+
+class FilmTag(Base):
+    """
+    Links a film to one of its tags.
+    Attributes:
+        film_id (int): Foreign key to the film, part of the primary key.
+        tag_id (int): Foreign key to the tag, part of the primary key.
+    The index on tag_id serves lookups of the films carrying a tag.
+    """
+
+    __tablename__ = "film_tags"
+    __table_args__ = (Index("ix_film_tags_tag_id_film_id", "tag_id", "film_id"),)
+
+    film_id = Column(
+        Integer, ForeignKey("films.id", ondelete="CASCADE"), primary_key=True
+    )
+    tag_id = Column(
+        Integer, ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True
+    )
@@ -0,0 +1,26 @@
+from decimal import ROUND_HALF_UP, Decimal
+
+CENT = Decimal("0.01")
+
+
+def to_cents(value, rounding: str = ROUND_HALF_UP) -> int:
+    """
+    Convert an amount in currency units to integer cents.
+    Floats are converted through their shortest repr, so 9.99 becomes 999
+    rather than 998.
+    param value: The amount as a Decimal, int, float or numeric string.
+    param rounding: Decimal rounding mode for fractions of a cent.
+    return: The amount in cents.
+    """
+    if isinstance(value, float):
+        value = repr(value)
+    return int((Decimal(value) / CENT).to_integral_value(rounding=rounding))
+
+
+def from_cents(cents: int) -> Decimal:
+    """
+    Convert integer cents to an exact Decimal amount with two places.
+    param cents: The amount in cents.
+    return: The amount in currency units.
+    """
+    return Decimal(cents).scaleb(-2)
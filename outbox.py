@@ -0,0 +1,219 @@
+import asyncio
+import inspect
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Callable
+
+from sqlalchemy import and_, delete, func, or_, select, update
+
+from models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+subscribers: list[Callable[[list[dict]], object]] = []
+"""
+In-process consumers of outbox events. Each is called with a batch of
+events and may be a plain function or a coroutine function.
+"""
+
+
+class InProcessSink:
+    """
+    Delivers event batches to the in-process ``subscribers``.
+    """
+
+    async def send(self, events: list[dict]):
+        """
+        Call every subscriber with the batch.
+        """
+        for subscriber in subscribers:
+            result = subscriber(events)
+            if inspect.isawaitable(result):
+                await result
+
+
+class JsonlFileSink:
+    """
+    Appends events to a JSON Lines file, standing in for a message queue.
+    Each batch is written with a single ``O_APPEND`` write, so batches from
+    relays in several worker processes do not interleave.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    async def send(self, events: list[dict]):
+        """
+        Append the batch to the file without blocking the event loop.
+        """
+        lines = "".join(json.dumps(event, default=str) + "\n" for event in events)
+        await asyncio.to_thread(self._append, lines)
+
+    def _append(self, lines: str):
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, lines.encode("utf-8"))
+        finally:
+            os.close(fd)
+
+
+class OutboxRelay:
+    """
+    Background worker that drains committed outbox events to sinks in batches.
+    A batch is first claimed by setting ``claimed_until`` to the end of a
+    lease, with ``FOR UPDATE SKIP LOCKED`` on PostgreSQL and SQLite's
+    serialized writes elsewhere, so relays in several worker processes
+    deliver different batches. Events are marked processed only after every
+    sink accepted the batch; a failed batch is released at once and a
+    crashed relay's batch when its lease ends, so delivery is at-least-once
+    and consumers should deduplicate on ``id``. Batches are delivered in ID
+    order by each relay, but concurrent relays may interleave. Processed
+    events older than ``retention`` are purged periodically.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        sinks: list,
+        batch_size: int = 500,
+        poll_interval: float = 1.0,
+        retention: timedelta = timedelta(hours=24),
+        lease: timedelta = timedelta(seconds=60),
+    ):
+        self.session_factory = session_factory
+        self.sinks = sinks
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.lease = lease
+        self.delivered = 0
+        self._task: asyncio.Task | None = None
+        self._last_purge = datetime.utcnow()
+
+    async def drain_once(self) -> int:
+        """
+        Deliver one batch of pending events and return how many were sent.
+        """
+        rows = await self._claim()
+        if not rows:
+            return 0
+        ids = [row.id for row in rows]
+        events = [
+            {
+                "id": row.id,
+                "type": row.event_type,
+                "aggregate_id": row.aggregate_id,
+                "payload": json.loads(row.payload),
+                "created_at": row.created_at.isoformat(),
+            }
+            for row in rows
+        ]
+        try:
+            for sink in self.sinks:
+                await sink.send(events)
+        except Exception:
+            await self._mark(ids, claimed_until=None)
+            raise
+        await self._mark(ids, processed_at=datetime.utcnow())
+        self.delivered += len(events)
+        return len(events)
+
+    async def _claim(self) -> list:
+        """
+        Lease the oldest unclaimed pending events to this relay.
+        """
+        now = datetime.utcnow()
+        claimable = and_(
+            OutboxEvent.processed_at.is_(None),
+            or_(OutboxEvent.claimed_until.is_(None), OutboxEvent.claimed_until < now),
+        )
+        async with self.session_factory() as db:
+            result = await db.execute(
+                select(OutboxEvent.id)
+                .where(claimable)
+                .order_by(OutboxEvent.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            ids = result.scalars().all()
+            if not ids:
+                return []
+            # Re-checking the condition keeps a row another relay claimed
+            # in the meantime from being leased twice.
+            result = await db.execute(
+                update(OutboxEvent)
+                .where(OutboxEvent.id.in_(ids), claimable)
+                .values(claimed_until=now + self.lease)
+                .returning(
+                    OutboxEvent.id,
+                    OutboxEvent.event_type,
+                    OutboxEvent.aggregate_id,
+                    OutboxEvent.payload,
+                    OutboxEvent.created_at,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            rows = sorted(result.all(), key=lambda row: row.id)
+            await db.commit()
+        return rows
+
+    async def _mark(self, ids: list[int], **values):
+        async with self.session_factory() as db:
+            await db.execute(
+                update(OutboxEvent).where(OutboxEvent.id.in_(ids)).values(**values)
+            )
+            await db.commit()
+
+    async def purge(self):
+        """
+        Delete processed events older than the retention period. The newest
+        event is always kept, so SQLite never reuses an ID that worker
+        processes following the outbox have already passed.
+        """
+        async with self.session_factory() as db:
+            await db.execute(
+                delete(OutboxEvent).where(
+                    OutboxEvent.processed_at < datetime.utcnow() - self.retention,
+                    OutboxEvent.id < select(func.max(OutboxEvent.id)).scalar_subquery(),
+                )
+            )
+            await db.commit()
+        self._last_purge = datetime.utcnow()
+
+    async def run(self):
+        """
+        Drain continuously, sleeping between polls when there is no backlog.
+        """
+        while True:
+            try:
+                sent = await self.drain_once()
+                if datetime.utcnow() - self._last_purge > timedelta(minutes=10):
+                    await self.purge()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # A failing sink must not kill the relay; retry after a pause.
+                logger.exception("Outbox delivery failed")
+                sent = 0
+            if sent < self.batch_size:
+                await asyncio.sleep(self.poll_interval)
+
+    def start(self):
+        """
+        Run the relay as a background task.
+        """
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        """
+        Cancel the background task and wait for it to finish.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
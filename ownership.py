@@ -0,0 +1,83 @@
+from collections import OrderedDict
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from crud import get_owned_film_ids, owns_film
+
+
+class OwnershipCache:
+    """
+    LRU cache of per-user sets of owned film IDs for playback checks.
+    A cached "yes" is a single hash lookup, and each set takes memory in
+    proportion to the films the user owns, whatever their IDs. Ownership
+    only grows, so a cached film is never stale; a missing one may be
+    (another worker may have sold the film since the set was built) and is
+    confirmed with a primary key lookup, adding the film when it turns out
+    to be owned.
+    Attributes:
+        hits (int): Checks answered from a cached set.
+        misses (int): Checks that needed the database.
+    """
+
+    def __init__(self, capacity: int = 10000):
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._owned: OrderedDict[int, set[int]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._owned)
+
+    def load(self, user_id: int, film_ids: list[int]):
+        """
+        Store the full set of films a user owns, evicting the oldest user if full.
+        """
+        self._owned[user_id] = set(film_ids)
+        self._owned.move_to_end(user_id)
+        if len(self._owned) > self.capacity:
+            self._owned.popitem(last=False)
+
+    def add(self, user_id: int, film_ids: list[int]):
+        """
+        Record new purchases for a user whose films are cached.
+        """
+        owned = self._owned.get(user_id)
+        if owned is not None:
+            owned.update(film_ids)
+
+    def discard(self, user_id: int):
+        """
+        Forget a user's cached films.
+        """
+        self._owned.pop(user_id, None)
+
+    def clear(self):
+        """
+        Forget all cached films.
+        """
+        self._owned.clear()
+
+    async def owns(self, db: AsyncSession, user_id: int, film_id: int) -> bool:
+        """
+        Return whether a user owns a film, loading their films on first use.
+        """
+        owned = self._owned.get(user_id)
+        if owned is None:
+            self.misses += 1
+            self.load(user_id, await get_owned_film_ids(db, user_id))
+            return film_id in self._owned[user_id]
+        self._owned.move_to_end(user_id)
+        if film_id in owned:
+            self.hits += 1
+            return True
+        self.misses += 1
+        if await owns_film(db, user_id, film_id):
+            owned.add(film_id)
+            return True
+        return False
+
+
+cache = OwnershipCache()
+"""
+The process-wide film ownership cache.
+"""
@@ -0,0 +1,312 @@
+import asyncio
+import heapq
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, select, update
+from sqlalchemy.exc import IntegrityError
+
+from database import dialect_insert
+from models import Film, FilmStats
+
+logger = logging.getLogger(__name__)
+
+VIEW_WEIGHT = 1.0
+PURCHASE_WEIGHT = 10.0
+
+SCORE_EPOCH = datetime(2026, 1, 1)
+"""
+Start of epoch 0 of the stored scores.
+"""
+
+EPOCH_HALF_LIVES = 64
+"""
+Length of a score epoch in half-lives. A hit at time t in epoch k adds
+``weight * 2 ** ((t - start of epoch k) / half_life)`` to a score stored
+with ``epoch = k``, so ordering by the stored score is ordering by the
+exponentially decayed score, and flushing is a plain addition with no
+read-modify-write. Within an epoch the factor stays below 2 ** 64; when a
+new epoch starts, older scores are scaled down by 2 ** -64 per epoch, so
+stored values never leave float range however long the service runs.
+"""
+
+EPOCH_DECAY = 2.0**-EPOCH_HALF_LIVES
+
+
+class PopularityCounters:
+    """
+    Write-behind view and purchase counters with a decayed popularity score.
+    Each process counts hits in memory, so recording a hit never touches
+    the database; every ``flush_interval`` seconds the aggregated deltas are
+    added to ``film_stats`` with one upsert statement. The upsert returns
+    the updated totals, which keep an in-memory candidate set current; the
+    trending list is precomputed from it with a top-K heap after each flush,
+    so reads never sort the table. Candidates are reloaded from the score
+    index periodically to pick up films promoted by other processes.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        half_life: timedelta = timedelta(days=1),
+        flush_interval: float = 5.0,
+        top_k: int = 100,
+        refresh_every: int = 12,
+    ):
+        self.session_factory = session_factory
+        self.half_life = half_life
+        self.flush_interval = flush_interval
+        self.top_k = top_k
+        self.refresh_every = refresh_every
+        self._views: Counter[int] = Counter()
+        self._purchases: Counter[int] = Counter()
+        self._scores: dict[int, float] = {}
+        self._trending: list[tuple[float, int]] = []
+        self._flushes = 0
+        self.dropped = 0
+        self._epoch: int | None = None
+        self._task: asyncio.Task | None = None
+
+    def record_view(self, film_id: int):
+        """
+        Count one view of a film.
+        """
+        self._views[film_id] += 1
+
+    def record_purchase(self, film_ids: list[int]):
+        """
+        Count one purchase of each film.
+        """
+        self._purchases.update(film_ids)
+
+    def epoch_of(self, at: datetime) -> int:
+        """
+        Return the score epoch that ``at`` falls in.
+        """
+        return (at - SCORE_EPOCH) // (self.half_life * EPOCH_HALF_LIVES)
+
+    def growth(self, at: datetime | None = None, epoch: int | None = None) -> float:
+        """
+        Return the factor applied to hits at ``at`` (default now), relative
+        to the start of ``epoch`` (default the epoch of ``at``).
+        """
+        at = at or datetime.utcnow()
+        if epoch is None:
+            epoch = self.epoch_of(at)
+        start = SCORE_EPOCH + self.half_life * EPOCH_HALF_LIVES * epoch
+        return 2.0 ** ((at - start) / self.half_life)
+
+    def trending(self, limit: int) -> list[tuple[int, float]]:
+        """
+        Return up to ``limit`` ``(film_id, score)`` pairs, most popular first,
+        with scores decayed to the current time.
+        """
+        growth = self.growth(epoch=self._epoch)
+        return [(film_id, score / growth) for score, film_id in self._trending[:limit]]
+
+    async def flush(self) -> int:
+        """
+        Add the counted hits to ``film_stats`` and rebuild the trending list.
+        Returns the number of films updated.
+        """
+        views, purchases = self._views, self._purchases
+        self._views, self._purchases = Counter(), Counter()
+        film_ids = views.keys() | purchases.keys()
+        if not film_ids:
+            return 0
+        now = datetime.utcnow()
+        epoch = self.epoch_of(now)
+        growth = self.growth(now, epoch)
+        rows = [
+            {
+                "film_id": film_id,
+                "epoch": epoch,
+                "view_count": views[film_id],
+                "purchase_count": purchases[film_id],
+                "score": (
+                    views[film_id] * VIEW_WEIGHT + purchases[film_id] * PURCHASE_WEIGHT
+                )
+                * growth,
+            }
+            for film_id in sorted(film_ids)
+        ]
+        try:
+            async with self.session_factory() as db:
+                try:
+                    totals = await self._write(db, rows, epoch)
+                except IntegrityError:
+                    # Films deleted since their hits were counted; the
+                    # rollback also undid the rescale, so _write redoes it.
+                    await db.rollback()
+                    kept = await _existing_films(db, rows)
+                    self.dropped += len(rows) - len(kept)
+                    logger.warning(
+                        "Dropped popularity counts for %d deleted films",
+                        len(rows) - len(kept),
+                    )
+                    totals = await self._write(db, kept, epoch)
+        except Exception:
+            # Put the deltas back so they are retried with the next flush.
+            self._views.update(views)
+            self._purchases.update(purchases)
+            raise
+        self._enter_epoch(epoch)
+        self._scores.update(totals)
+        self._rebuild()
+        return len(totals)
+
+    async def _write(self, db, rows: list[dict], epoch: int) -> list:
+        """
+        Upsert the rows and commit; returns the new ``(film_id, score)`` totals.
+        """
+        if epoch != self._epoch:
+            await self._rescale(db, epoch)
+        stmt = dialect_insert(db, FilmStats)
+        # A row can only be in another epoch if a process with a skewed
+        # clock wrote it around an epoch change.
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["film_id"],
+            set_={
+                "view_count": FilmStats.view_count + stmt.excluded.view_count,
+                "purchase_count": FilmStats.purchase_count
+                + stmt.excluded.purchase_count,
+                "score": case(
+                    (
+                        FilmStats.epoch == stmt.excluded.epoch,
+                        FilmStats.score + stmt.excluded.score,
+                    ),
+                    (
+                        FilmStats.epoch < stmt.excluded.epoch,
+                        FilmStats.score * EPOCH_DECAY + stmt.excluded.score,
+                    ),
+                    else_=FilmStats.score + stmt.excluded.score * EPOCH_DECAY,
+                ),
+                "epoch": case(
+                    (FilmStats.epoch > stmt.excluded.epoch, FilmStats.epoch),
+                    else_=stmt.excluded.epoch,
+                ),
+            },
+        ).returning(FilmStats.film_id, FilmStats.score)
+        totals = (await db.execute(stmt, rows)).all() if rows else []
+        await db.commit()
+        return totals
+
+    async def refresh(self):
+        """
+        Reload the candidate set from the highest stored scores.
+        """
+        async with self.session_factory() as db:
+            epoch = self.epoch_of(datetime.utcnow())
+            if epoch != self._epoch:
+                await self._rescale(db, epoch)
+                await db.commit()
+                self._enter_epoch(epoch)
+            result = await db.execute(
+                select(FilmStats.film_id, FilmStats.score)
+                .order_by(FilmStats.score.desc())
+                .limit(self.top_k * 2)
+            )
+            self._scores = dict(result.all())
+        self._rebuild()
+
+    async def _rescale(self, db, epoch: int):
+        """
+        Move the stored scores of earlier epochs to ``epoch``. Idempotent,
+        so every process can run it when it first sees a new epoch.
+        """
+        result = await db.execute(
+            select(FilmStats.epoch).where(FilmStats.epoch < epoch).distinct()
+        )
+        for old in result.scalars().all():
+            await db.execute(
+                update(FilmStats)
+                .where(FilmStats.epoch == old)
+                .values(
+                    score=FilmStats.score * EPOCH_DECAY ** (epoch - old), epoch=epoch
+                )
+            )
+
+    def _enter_epoch(self, epoch: int):
+        if self._epoch is not None and epoch != self._epoch:
+            factor = EPOCH_DECAY ** (epoch - self._epoch)
+            self._scores = {
+                film_id: score * factor for film_id, score in self._scores.items()
+            }
+        self._epoch = epoch
+
+    def forget(self, film_id: int):
+        """
+        Drop a film from the trending list, e.g. after it was deleted.
+        """
+        if self._scores.pop(film_id, None) is not None:
+            self._rebuild()
+
+    def _rebuild(self):
+        self._trending = heapq.nlargest(
+            self.top_k, ((score, film_id) for film_id, score in self._scores.items())
+        )
+        # Keep candidates bounded; films that fall out return via refresh.
+        if len(self._scores) > self.top_k * 4:
+            self._scores = {film_id: score for score, film_id in self._trending}
+
+    async def run(self):
+        """
+        Flush periodically and refresh candidates every ``refresh_every`` flushes.
+        """
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+                self._flushes += 1
+                if self._flushes % self.refresh_every == 0:
+                    await self.refresh()
+            except Exception:
+                logger.exception("Popularity flush failed")
+
+    async def start(self):
+        """
+        Load the trending list and run the flusher as a background task.
+        """
+        await self.refresh()
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        """
+        Stop the flusher and write out the remaining counts.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def apply(self, action: str, film):
+        """
+        Film change listener: drop deleted films from the trending list and
+        discard their unflushed hits.
+        """
+        if action == "delete":
+            self._views.pop(film.id, None)
+            self._purchases.pop(film.id, None)
+            self.forget(film.id)
+
+
+async def _existing_films(db, rows: list[dict]) -> list[dict]:
+    """
+    Keep the rows whose film still exists.
+    """
+    film_ids = {row["film_id"] for row in rows}
+    films = set(
+        (await db.execute(select(Film.id).where(Film.id.in_(film_ids)))).scalars()
+    )
+    return [row for row in rows if row["film_id"] in films]
+
+
+counters: PopularityCounters | None = None
+"""
+The process-wide popularity counters, created on startup.
+"""
@@ -0,0 +1,178 @@
+import asyncio
+import cProfile
+import glob
+import hmac
+import io
+import json
+import os
+import pstats
+import random
+import re
+import time
+from datetime import datetime
+
+from starlette.datastructures import Headers, MutableHeaders
+
+PROFILE_HEADER = "x-profile"
+PROFILE_ID_PATTERN = re.compile(r"^\d+-\d+$")
+
+
+class ProfileStore:
+    """
+    Bounded ring buffer of request profiles in a local directory.
+    Each profile is a ``<id>.prof`` file in the binary format written by
+    ``cProfile`` (readable with ``pstats`` or snakeviz) next to a ``<id>.json``
+    metadata file. IDs start with a nanosecond timestamp, so they sort by
+    age, and end with the process ID, so worker processes sharing the
+    directory do not collide. Only the newest ``capacity`` profiles are kept.
+    """
+
+    def __init__(self, directory: str, capacity: int = 100):
+        self.directory = directory
+        self.capacity = capacity
+        os.makedirs(directory, exist_ok=True)
+
+    def new_id(self) -> str:
+        """
+        Return an ID for a profile about to be taken.
+        """
+        return f"{time.time_ns()}-{os.getpid()}"
+
+    def save(self, profile_id: str, profiler: cProfile.Profile, metadata: dict):
+        """
+        Write a finished profile and drop the oldest beyond the capacity.
+        """
+        profiler.dump_stats(self._path(profile_id, "prof"))
+        with open(self._path(profile_id, "json"), "w", encoding="utf-8") as handle:
+            json.dump({"id": profile_id, **metadata}, handle)
+        for stale in self._ids()[: -self.capacity]:
+            for extension in ("json", "prof"):
+                try:
+                    os.remove(self._path(stale, extension))
+                except FileNotFoundError:
+                    pass  # Pruned by another worker.
+
+    def entries(self) -> list[dict]:
+        """
+        Return the metadata of the stored profiles, newest first.
+        """
+        profiles = []
+        for profile_id in reversed(self._ids()):
+            try:
+                with open(self._path(profile_id, "json"), encoding="utf-8") as handle:
+                    profiles.append(json.load(handle))
+            except FileNotFoundError:
+                continue
+        return profiles
+
+    def path(self, profile_id: str) -> str | None:
+        """
+        Return the ``.prof`` file of a profile, or None if it does not exist.
+        """
+        if not PROFILE_ID_PATTERN.match(profile_id):
+            return None
+        path = self._path(profile_id, "prof")
+        return path if os.path.exists(path) else None
+
+    def summary(self, profile_id: str, limit: int = 50) -> str | None:
+        """
+        Render a profile as a pstats table sorted by cumulative time.
+        """
+        path = self.path(profile_id)
+        if path is None:
+            return None
+        stream = io.StringIO()
+        pstats.Stats(path, stream=stream).sort_stats("cumulative").print_stats(limit)
+        return stream.getvalue()
+
+    def _ids(self) -> list[str]:
+        names = glob.glob(os.path.join(self.directory, "*.json"))
+        ids = [os.path.basename(name)[: -len(".json")] for name in names]
+        return sorted(ids, key=lambda profile_id: int(profile_id.split("-")[0]))
+
+    def _path(self, profile_id: str, extension: str) -> str:
+        return os.path.join(self.directory, f"{profile_id}.{extension}")
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that runs ``cProfile`` around sampled requests.
+    A request is profiled when it sends ``X-Profile: <token>`` matching
+    ``token``, or at random with probability ``sample_rate``. Profiles of
+    requests faster than ``min_duration_ms`` are discarded; the rest go to
+    the store, and header-triggered responses carry the ID in
+    ``X-Profile-Id``. cProfile measures the whole thread, so one request
+    per process is profiled at a time and its profile also contains other
+    requests interleaved on the event loop. Only added to the app when
+    profiling is enabled, so it costs nothing otherwise.
+    """
+
+    def __init__(
+        self,
+        app,
+        store: ProfileStore,
+        sample_rate: float = 0.0,
+        token: str | None = None,
+        min_duration_ms: float = 0.0,
+    ):
+        self.app = app
+        self.store = store
+        self.sample_rate = sample_rate
+        self.token = token
+        self.min_duration_ms = min_duration_ms
+        self._active = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self._active:
+            await self.app(scope, receive, send)
+            return
+        requested = self._requested(scope)
+        if not requested and random.random() >= self.sample_rate:
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = self.store.new_id()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if requested:
+                    MutableHeaders(scope=message)["X-Profile-Id"] = profile_id
+            await send(message)
+
+        self._active = True
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.disable()
+            self._active = False
+            duration_ms = (time.perf_counter() - start) * 1000
+            if requested or duration_ms >= self.min_duration_ms:
+                metadata = {
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status,
+                    "duration_ms": round(duration_ms, 3),
+                    "trigger": "header" if requested else "sample",
+                    "created_at": datetime.utcnow().isoformat(),
+                }
+                await asyncio.to_thread(self.store.save, profile_id, profiler, metadata)
+
+    def _requested(self, scope) -> bool:
+        if self.token is None:
+            return False
+        value = Headers(scope=scope).get(PROFILE_HEADER)
+        return value is not None and hmac.compare_digest(
+            value.encode(), self.token.encode()
+        )
+
+
+store: ProfileStore | None = None
+"""
+The profile store, set when profiling is enabled.
+"""
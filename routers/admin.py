@@ -0,0 +1,123 @@
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse, PlainTextResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from crud import activate_users, bulk_create_users, reprice_films
+from database import get_db
+from schemas import (
+    BatchActivationRequest,
+    RepriceRequest,
+    UserBulkCreateRequest,
+    UserBulkCreateResponse,
+)
+from security import require_admin
+from singleflight import groups
+import logs
+import profiling
+
+
+router = APIRouter()
+
+
+@router.post("/admin/users/activate")
+async def batch_activate_users(
+    body: BatchActivationRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user=Depends(require_admin),
+):
+    """
+    Activate many pre-provisioned accounts at once (admin only).
+    """
+    activated = await activate_users(db, body.emails)
+    return {"requested": len(set(body.emails)), "activated": activated}
+
+
+@router.post("/admin/users/bulk", response_model=UserBulkCreateResponse)
+async def bulk_create(
+    body: UserBulkCreateRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user=Depends(require_admin),
+):
+    """
+    Provision many users at once, reporting an outcome per row (admin only).
+    """
+    results = await bulk_create_users(db, body.users)
+    created = sum(1 for result in results if result["status"] == "created")
+    return {"created": created, "results": results}
+
+
+@router.post("/admin/films/reprice")
+async def reprice(
+    body: RepriceRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user=Depends(require_admin),
+):
+    """
+    Change prices by a percentage or a fixed amount for a genre and/or a set
+    of film IDs in one UPDATE (admin only).
+    """
+    repriced = await reprice_films(
+        db, body.percent, body.amount, genre=body.genre, ids=body.ids
+    )
+    return {"repriced": repriced}
+
+
+@router.get("/admin/metrics/singleflight")
+async def singleflight_metrics(current_user=Depends(require_admin)):
+    """
+    Report how many concurrent reads were coalesced per group (admin only).
+    """
+    return {name: group.stats() for name, group in groups.items()}
+
+
+@router.get("/admin/metrics/logging")
+async def logging_metrics(current_user=Depends(require_admin)):
+    """
+    Report queued and dropped log records (admin only).
+    """
+    if logs.pipeline is None:
+        raise HTTPException(status_code=503, detail="Logging pipeline not running")
+    return logs.pipeline.stats()
+
+
+def _profile_store():
+    """
+    Return the profile store, or fail with 503 when profiling is disabled.
+    """
+    if profiling.store is None:
+        raise HTTPException(status_code=503, detail="Profiling is not enabled")
+    return profiling.store
+
+
+@router.get("/admin/profiles")
+async def list_profiles(current_user=Depends(require_admin)):
+    """
+    List stored request profiles, newest first (admin only).
+    """
+    return _profile_store().entries()
+
+
+@router.get("/admin/profiles/{profile_id}")
+async def download_profile(
+    profile_id: str,
+    format: Literal["prof", "text"] = "prof",
+    current_user=Depends(require_admin),
+):
+    """
+    Download a profile as a cProfile ``.prof`` file, or as a pstats table
+    sorted by cumulative time with ``format=text`` (admin only).
+    """
+    store = _profile_store()
+    if format == "text":
+        summary = store.summary(profile_id)
+        if summary is None:
+            raise HTTPException(status_code=404, detail="Profile not found")
+        return PlainTextResponse(summary)
+    path = store.path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(
+        path, media_type="application/octet-stream", filename=f"{profile_id}.prof"
+    )
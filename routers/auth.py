@@ -1,17 +1,16 @@
 import secrets
-import os
-import boto3
 
 from fastapi import APIRouter, Depends, HTTPException, File, UploadFile
 from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from datetime import timedelta
 from fastapi.security import OAuth2PasswordBearer
 
 from models import User
-from schemas import UserCreate, UserRead, Token
+from schemas import UserCreate, UserRead, Token, RefreshRequest
 from crud import (
     create_user,
+    activate_users,
     get_user_by_email,
     save_reset_token,
     get_user_by_reset_token,
@@ -19,44 +18,38 @@ from crud import (
 
 from mail_service.email_service import send_activation_email, send_password_reset_email
 from security import (
-    create_access_token,
     create_activation_token,
     decode_token,
-    ACCESS_TOKEN_EXPIRE_MINUTES,
     get_current_user,
+    issue_session_tokens,
+    refresh_session_tokens,
+    revoke_refresh_token,
 )
 from utils import (
-    verify_password,
+    verify_and_update_password,
     hash_password,
 )
 from database import get_db
+from settings import get_settings
+from storage import get_s3_client
 
 
 router = APIRouter()
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
-s3 = boto3.client(
-    "s3",
-    aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
-    aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
-    region_name=os.getenv("AWS_REGION"),
-)
-
-BUCKET_NAME = os.getenv("AWS_BUCKET_NAME")
-
 
 @router.post("/register", response_model=UserRead)
 async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
     """
     Register a new user and send activation email.
     """
-    db_user = await get_user_by_email(db, user.email)
-    if db_user:
+    try:
+        created_user = await create_user(db, user)
+    except IntegrityError:
+        await db.rollback()
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    created_user = await create_user(db, user)
-
     token = create_activation_token(created_user.email)
     send_activation_email(created_user.email, token)
 
@@ -66,20 +59,45 @@ async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
 @router.post("/login", response_model=Token)
 async def login(email: str, password: str, db: AsyncSession = Depends(get_db)):
     """
-    Authenticate user and return JWT access token.
+    Authenticate user and return JWT access and refresh tokens.
     """
     db_user = await get_user_by_email(db, email)
-    if not db_user or not verify_password(password, db_user.hashed_password):
+    if not db_user:
+        raise HTTPException(status_code=401, detail="Invalid email or password")
+
+    valid, new_hash = verify_and_update_password(password, db_user.hashed_password)
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid email or password")
 
     if not db_user.is_active:
         raise HTTPException(status_code=403, detail="Account not activated")
 
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": db_user.email}, expires_delta=access_token_expires
-    )
-    return {"access_token": access_token, "token_type": "bearer"}
+    if new_hash:
+        db_user.hashed_password = new_hash
+        await db.commit()
+
+    return await issue_session_tokens(db, db_user.id, db_user.email)
+
+
+@router.post("/token/refresh", response_model=Token)
+async def refresh_token(body: RefreshRequest, db: AsyncSession = Depends(get_db)):
+    """
+    Exchange a refresh token for a new access token without re-entering the password.
+    """
+    tokens = await refresh_session_tokens(db, body.refresh_token)
+    if tokens is None:
+        raise HTTPException(status_code=401, detail="Invalid or expired refresh token")
+    return tokens
+
+
+@router.post("/logout")
+async def logout(body: RefreshRequest, db: AsyncSession = Depends(get_db)):
+    """
+    Revoke the session behind a refresh token, invalidating its access tokens.
+    """
+    if not await revoke_refresh_token(db, body.refresh_token):
+        raise HTTPException(status_code=401, detail="Invalid or expired refresh token")
+    return {"detail": "Logged out successfully"}
 
 
 @router.get("/activate")
@@ -92,12 +110,8 @@ async def activate_account(token: str, db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=400, detail="Invalid or expired token")
 
     email = payload.get("sub")
-    db_user = await get_user_by_email(db, email)
-    if not db_user:
+    if not await activate_users(db, [email]):
         raise HTTPException(status_code=404, detail="User not found")
-
-    db_user.is_active = True
-    await db.commit()
     return {"detail": "Account activated successfully"}
 
 
@@ -150,6 +164,7 @@ async def upload_avatar(
     file: UploadFile = File(...),
     db: AsyncSession = Depends(get_db),
     current_user: UserRead = Depends(get_current_user),
+    s3=Depends(get_s3_client),
 ):
     """
     Upload an avatar image to S3 and update user profile.
@@ -161,7 +176,10 @@ async def upload_avatar(
     contents = await file.read()
 
     s3.put_object(
-        Bucket=BUCKET_NAME, Key=filename, Body=contents, ContentType=file.content_type
+        Bucket=get_settings().AWS_BUCKET_NAME,
+        Key=filename,
+        Body=contents,
+        ContentType=file.content_type,
     )
 
     result = await db.execute(select(User).where(User.id == current_user.id))
@@ -177,6 +195,7 @@ async def upload_avatar(
 async def get_my_avatar_url(
     db: AsyncSession = Depends(get_db),
     current_user: UserRead = Depends(get_current_user),
+    s3=Depends(get_s3_client),
 ):
     """
     Get a temporary URL to download the user's avatar from S3.
@@ -188,7 +207,7 @@ async def get_my_avatar_url(
 
     presigned_url = s3.generate_presigned_url(
         "get_object",
-        Params={"Bucket": BUCKET_NAME, "Key": user.avatar_url},
+        Params={"Bucket": get_settings().AWS_BUCKET_NAME, "Key": user.avatar_url},
         ExpiresIn=3600,
     )
     return {"avatar_url": presigned_url}
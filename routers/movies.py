@@ -1,16 +1,87 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 
 from security import require_admin
-from schemas import FilmCreate, FilmRead, FilmUpdate
+from schemas import (
+    FilmBatch,
+    FilmCreate,
+    FilmRead,
+    FilmTags,
+    FilmTagsRead,
+    FilmUpdate,
+    RowId,
+    SimilarFilm,
+    TagFacets,
+    TaggedFilmPage,
+    TrendingFilm,
+    film_projection,
+)
 from database import get_db
-from crud import create_film, get_film, get_films, update_film, delete_film
+from crud import (
+    create_film,
+    get_film,
+    get_films,
+    get_film_rows,
+    update_film,
+    delete_film,
+    set_film_tags,
+)
 from models import User
+from serialization import FastJSONResponse
+from settings import get_settings
+from singleflight import SingleFlight
+import catalog
+import changes
+import popularity
+import similarity
+import tags
+from changes import ChangeFeedGap, format_sse
 
 
 router = APIRouter()
 
+MAX_BATCH_IDS = 500
+SSE_KEEPALIVE_SECONDS = 15
+FILM_FIELDS = FilmRead.model_fields
+
+film_reads = SingleFlight("films")
+"""
+Coalesces concurrent identical film reads into one query.
+"""
+
+
+def parse_film_fields(fields: str | None):
+    """
+    Turn a ``fields=title,price`` parameter into a column tuple.
+    The ID is always included; fields keep the FilmRead declaration order.
+    """
+    if fields is None:
+        return None
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested - FILM_FIELDS.keys()
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown film fields: {', '.join(sorted(unknown))}",
+        )
+    requested.add("id")
+    return tuple(name for name in FILM_FIELDS if name in requested)
+
+
+def project_films(rows: list[dict], projection: tuple[str, ...]):
+    """
+    Validate and serialize projected rows through the trimmed film schema.
+    """
+    if get_settings().FAST_JSON:
+        return rows
+    adapter = film_projection(projection)
+    return adapter.dump_python(adapter.validate_python(rows), mode="json")
+
 
 @router.post("/movies/", response_model=FilmRead)
 async def add_film(film: FilmCreate, db: AsyncSession = Depends(get_db)):
@@ -22,25 +93,285 @@ async def add_film(film: FilmCreate, db: AsyncSession = Depends(get_db)):
 
 
 @router.get("/movies/", response_model=list[FilmRead])
-async def list_films(db: AsyncSession = Depends(get_db)):
+async def list_films(
+    fields: str | None = Query(
+        None, description="Comma-separated film fields to return, e.g. title,price"
+    ),
+    genre: str | None = None,
+    min_price: float | None = None,
+    max_price: float | None = None,
+    sort: Literal["price", "-price"] | None = None,
+    db: AsyncSession = Depends(get_db),
+):
     """
-    Get a list of all films.
+    Get a list of films, optionally filtered, sorted and limited to some fields.
+    Served from the in-memory catalog snapshot when it is enabled.
     """
-    films = await get_films(db)
+    projection = parse_film_fields(fields)
+    filters = {
+        "genre": genre,
+        "min_price": min_price,
+        "max_price": max_price,
+        "sort": sort,
+    }
+    if catalog.snapshot.loaded:
+        rows = catalog.snapshot.query(**filters)
+        if projection is not None:
+            rows = [{name: row[name] for name in projection} for row in rows]
+            return FastJSONResponse(project_films(rows, projection))
+        return FastJSONResponse(rows) if get_settings().FAST_JSON else rows
+
+    key = (projection, genre, min_price, max_price, sort)
+    if projection is not None:
+        rows = await film_reads.do(
+            ("rows", *key),
+            lambda: get_film_rows(db, fields=projection, **filters),
+        )
+        return FastJSONResponse(project_films(rows, projection))
+    if get_settings().FAST_JSON:
+        rows = await film_reads.do(("rows", *key), lambda: get_film_rows(db, **filters))
+        return FastJSONResponse(rows)
+    films = await film_reads.do(("films", *key), lambda: get_films(db, **filters))
     return films
 
 
+@router.get("/movies/batch", response_model=FilmBatch)
+async def read_films_batch(
+    ids: list[RowId] = Query(..., min_length=1, max_length=MAX_BATCH_IDS),
+    fields: str | None = Query(
+        None, description="Comma-separated film fields to return, e.g. title,price"
+    ),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Get several films by ID in one query, preserving the requested order.
+    IDs that do not exist are listed in ``missing``.
+    """
+    projection = parse_film_fields(fields)
+    requested = list(dict.fromkeys(ids))
+    if catalog.snapshot.loaded:
+        rows = [catalog.snapshot.get(film_id) for film_id in requested]
+        rows = [row for row in rows if row is not None]
+        if projection is not None:
+            rows = [{name: row[name] for name in projection} for row in rows]
+    else:
+        rows = await get_film_rows(db, ids=requested, fields=projection)
+    by_id = {row["id"]: row for row in rows}
+    batch = {
+        "films": [by_id[film_id] for film_id in requested if film_id in by_id],
+        "missing": [film_id for film_id in requested if film_id not in by_id],
+    }
+    if projection is not None:
+        batch["films"] = project_films(batch["films"], projection)
+        return FastJSONResponse(batch)
+    if get_settings().FAST_JSON:
+        return FastJSONResponse(batch)
+    return batch
+
+
+async def stream_changes(request: Request, since: int):
+    """
+    Yield change events after ``since`` as Server-Sent Events until the
+    client disconnects, with periodic keep-alive comments.
+    """
+    while not await request.is_disconnected():
+        try:
+            events = await changes.feed.wait(since, SSE_KEEPALIVE_SECONDS)
+        except ChangeFeedGap:
+            yield "event: reset\ndata: {}\n\n"
+            return
+        if not events:
+            yield ": keep-alive\n\n"
+            continue
+        for event in events:
+            yield format_sse(event)
+        since = events[-1]["seq"]
+
+
+@router.get("/movies/changes")
+async def film_changes(
+    request: Request,
+    since: int | None = Query(None, ge=0),
+    timeout: float = Query(25, ge=0, le=60),
+    last_event_id: str | None = Header(None),
+):
+    """
+    Get catalog changes after a sequence number.
+    With ``Accept: text/event-stream`` changes are pushed as Server-Sent Events;
+    otherwise the request waits up to ``timeout`` seconds and returns the new
+    events as JSON. Resume from the last ``seq`` seen with ``since`` or the
+    ``Last-Event-ID`` header. A 410 means that position is gone and the
+    catalog must be reloaded.
+    """
+    if since is None:
+        if last_event_id and last_event_id.isdigit():
+            since = int(last_event_id)
+        else:
+            since = changes.feed.last_seq
+    try:
+        changes.feed.since(since)
+    except ChangeFeedGap:
+        raise HTTPException(
+            status_code=410,
+            detail="Change feed position expired, reload the catalog",
+            headers={"X-Last-Seq": str(changes.feed.last_seq)},
+        )
+
+    if "text/event-stream" in request.headers.get("accept", ""):
+        return StreamingResponse(
+            stream_changes(request, since),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache"},
+        )
+    events = await changes.feed.wait(since, timeout)
+    return {"events": events, "last_seq": changes.feed.last_seq}
+
+
+@router.get("/movies/trending", response_model=list[TrendingFilm])
+async def trending_films(
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Get the most popular films by recent views and purchases.
+    Served from a precomputed list that is refreshed every few seconds.
+    """
+    if popularity.counters is None:
+        return []
+    ranked = popularity.counters.trending(limit)
+    ids = [film_id for film_id, _ in ranked]
+    if catalog.snapshot.loaded:
+        rows = [catalog.snapshot.get(film_id) for film_id in ids]
+        by_id = {row["id"]: row for row in rows if row is not None}
+    else:
+        by_id = {row["id"]: row for row in await get_film_rows(db, ids=ids)}
+    return [
+        {**by_id[film_id], "score": score}
+        for film_id, score in ranked
+        if film_id in by_id
+    ]
+
+
+def tag_filters(
+    all_of: list[str] = Query([], alias="all", description="Tags every film has"),
+    any_of: list[str] = Query(
+        [], alias="any", description="Tags of which a film has one"
+    ),
+    none_of: list[str] = Query([], alias="none", description="Tags no film has"),
+):
+    """
+    Collect and normalize the tag query parameters.
+    """
+    return {
+        "all_of": [tags.normalize_tag(tag) for tag in all_of],
+        "any_of": [tags.normalize_tag(tag) for tag in any_of],
+        "none_of": [tags.normalize_tag(tag) for tag in none_of],
+    }
+
+
+@router.get("/movies/tagged", response_model=TaggedFilmPage)
+async def tagged_films(
+    filters: dict = Depends(tag_filters),
+    after_id: int | None = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Get films by tags, e.g. ``?all=action&all=comedy&none=horror``,
+    paginated by film ID. Answered from the in-memory tag index.
+    """
+    await tags.ensure_loaded(db)
+    page = tags.index.query(**filters, after_id=after_id, limit=limit + 1)
+    has_more = len(page) > limit
+    page = page[:limit]
+    if catalog.snapshot.loaded:
+        rows = [catalog.snapshot.get(film_id) for film_id in page]
+        rows = [row for row in rows if row is not None]
+    else:
+        rows = await get_film_rows(db, ids=page) if page else []
+    return {
+        "items": rows,
+        "total": tags.index.count(**filters),
+        "next_after_id": page[-1] if has_more else None,
+    }
+
+
+@router.get("/movies/tags/facets", response_model=TagFacets)
+async def tag_facets(
+    filters: dict = Depends(tag_filters),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Count the films matching a tag query per tag, most common first,
+    for faceted browsing.
+    """
+    await tags.ensure_loaded(db)
+    matched = tags.index.query(**filters)
+    return {"total": len(matched), "tags": tags.index.facets(matched)}
+
+
 @router.get("/movies/{film_id}", response_model=FilmRead)
 async def read_film(film_id: int, db: AsyncSession = Depends(get_db)):
     """
     Get details of a film by its ID.
     """
-    film = await get_film(db, film_id)
+    if catalog.snapshot.loaded:
+        film = catalog.snapshot.get(film_id)
+    else:
+        film = await film_reads.do(("film", film_id), lambda: get_film(db, film_id))
     if not film:
         raise HTTPException(status_code=404, detail="Film not found")
+    if popularity.counters is not None:
+        popularity.counters.record_view(film_id)
     return film
 
 
+@router.get("/movies/{film_id}/similar", response_model=list[SimilarFilm])
+async def similar_films(
+    film_id: int,
+    limit: int = Query(10, ge=1, le=100),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Get films similar to a film by genre, price range and title words.
+    Neighbours are precomputed, so this is a lookup.
+    """
+    if similarity.index is None:
+        raise HTTPException(status_code=503, detail="Similar films are not enabled")
+    ranked = similarity.index.similar(film_id, limit)
+    if ranked is None:
+        raise HTTPException(status_code=404, detail="Film not found")
+    ids = [neighbour for neighbour, _ in ranked]
+    if catalog.snapshot.loaded:
+        rows = [catalog.snapshot.get(neighbour) for neighbour in ids]
+        by_id = {row["id"]: row for row in rows if row is not None}
+    else:
+        by_id = {row["id"]: row for row in await get_film_rows(db, ids=ids)}
+    return [
+        {**by_id[neighbour], "score": score}
+        for neighbour, score in ranked
+        if neighbour in by_id
+    ]
+
+
+@router.put("/movies/{film_id}/tags", response_model=FilmTagsRead)
+async def replace_film_tags(
+    film_id: int,
+    body: FilmTags,
+    db: AsyncSession = Depends(get_db),
+    current_user=Depends(require_admin),
+):
+    """
+    Replace the tags of a film (admin only).
+    """
+    names = await set_film_tags(db, film_id, body.tags)
+    if names is None:
+        raise HTTPException(status_code=404, detail="Film not found")
+    if tags.index.loaded:
+        tags.index.set_film_tags(film_id, names)
+    return {"film_id": film_id, "tags": names}
+
+
 @router.put("/movies/{film_id}", response_model=FilmRead)
 async def edit_film(film_id: int, film: FilmUpdate, db: AsyncSession = Depends(get_db)):
     """
@@ -59,9 +390,13 @@ async def remove_film(
     current_user=Depends(require_admin),
 ):
     """
-    Delete a film (admin only).
+    Delete a film (admin only). Films that were ordered cannot be deleted.
     """
-    deleted_film = await delete_film(db, film_id)
+    try:
+        deleted_film = await delete_film(db, film_id)
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Film is referenced by orders")
     if not deleted_film:
         raise HTTPException(status_code=404, detail="Film not found")
     return deleted_film
@@ -0,0 +1,75 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Path, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from crud import FilmsAlreadyOwned, FilmsNotFound, checkout, get_order
+from database import get_db
+from schemas import MAX_ID, CheckoutRequest, FilmOwnership, OrderRead, UserRead
+from security import get_current_user
+import ownership
+import popularity
+
+
+router = APIRouter()
+
+
+@router.post("/orders/checkout", response_model=OrderRead, status_code=201)
+async def create_order(
+    body: CheckoutRequest,
+    response: Response,
+    idempotency_key: str | None = Header(None, max_length=255),
+    db: AsyncSession = Depends(get_db),
+    current_user: UserRead = Depends(get_current_user),
+):
+    """
+    Buy films. Retrying with the same ``Idempotency-Key`` header returns the
+    original order with status 200 instead of charging again.
+    """
+    try:
+        order, created = await checkout(
+            db, current_user.id, body.film_ids, idempotency_key
+        )
+    except FilmsNotFound as exc:
+        raise HTTPException(
+            status_code=404, detail={"message": "Films not found", "ids": exc.film_ids}
+        )
+    except FilmsAlreadyOwned as exc:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "Films already owned", "ids": exc.film_ids},
+        )
+    if created:
+        film_ids = [item["film_id"] for item in order["items"]]
+        ownership.cache.add(current_user.id, film_ids)
+        if popularity.counters is not None:
+            popularity.counters.record_purchase(film_ids)
+    else:
+        response.status_code = 200
+    return order
+
+
+@router.get("/orders/{order_id}", response_model=OrderRead)
+async def read_order(
+    order_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserRead = Depends(get_current_user),
+):
+    """
+    Get one of the current user's orders.
+    """
+    order = await get_order(db, order_id, current_user.id)
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+    return order
+
+
+@router.get("/users/me/films/{film_id}", response_model=FilmOwnership)
+async def check_ownership(
+    film_id: int = Path(..., gt=0, le=MAX_ID),
+    db: AsyncSession = Depends(get_db),
+    current_user: UserRead = Depends(get_current_user),
+):
+    """
+    Check whether the current user owns a film (playback authorization).
+    """
+    owned = await ownership.cache.owns(db, current_user.id, film_id)
+    return {"film_id": film_id, "owned": owned}
@@ -1,22 +1,41 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from crud import get_user_by_email
+from crud import get_user_by_email, list_users
 from database import get_db
 from routers.auth import get_current_user
-from schemas import UserRead
+from schemas import UserRead, UserPage
+from security import require_admin
 from utils import hash_password
 
 router = APIRouter()
 
 
-@router.get("/users/")
-async def read_users():
+@router.get("/users/", response_model=UserPage)
+async def read_users(
+    after_id: int | None = None,
+    limit: int = Query(100, ge=1, le=1000),
+    role: str | None = None,
+    is_active: bool | None = None,
+    email_prefix: str | None = None,
+    db: AsyncSession = Depends(get_db),
+    current_user=Depends(require_admin),
+):
     """
-    Return a placeholder message for a list of users.
+    List users page by page (admin only).
+    Pass the returned ``next_after_id`` as ``after_id`` to fetch the next page.
     """
-    return {"message": "List of users"}
+    items = await list_users(
+        db,
+        after_id=after_id,
+        limit=limit,
+        role=role,
+        is_active=is_active,
+        email_prefix=email_prefix,
+    )
+    next_after_id = items[-1]["id"] if len(items) == limit else None
+    return {"items": items, "next_after_id": next_after_id}
 
 
 @router.get("/me", response_model=UserRead)
@@ -0,0 +1,61 @@
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, Depends, HTTPException
+
+from schemas import UserRead, WatchEventBatch
+from security import get_current_user, require_admin
+import ingest
+
+
+router = APIRouter()
+
+
+def _naive_utc(value: datetime) -> datetime:
+    """
+    Convert a client timestamp to naive UTC, as stored in the database.
+    """
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+@router.post("/watch/events", status_code=202)
+async def record_watch_events(
+    batch: WatchEventBatch,
+    current_user: UserRead = Depends(get_current_user),
+):
+    """
+    Record playback progress events. Events are buffered and written in
+    batches; a 503 means the buffer is full and the batch should be retried.
+    """
+    if ingest.buffer is None:
+        raise HTTPException(status_code=503, detail="Ingestion is not running")
+    now = datetime.utcnow()
+    events = [
+        {
+            "user_id": current_user.id,
+            "film_id": event.film_id,
+            "position_seconds": event.position_seconds,
+            "watched_at": _naive_utc(event.watched_at) if event.watched_at else now,
+        }
+        for event in batch.events
+    ]
+    try:
+        queued, spilled = await ingest.buffer.offer(events)
+    except ingest.BufferFull:
+        raise HTTPException(
+            status_code=503,
+            detail="Ingestion buffer is full, retry later",
+            headers={"Retry-After": "1"},
+        )
+    return {"accepted": queued + spilled, "spilled": spilled}
+
+
+@router.get("/admin/metrics/watch")
+async def watch_metrics(current_user=Depends(require_admin)):
+    """
+    Report watch event buffer depth and throughput counters (admin only).
+    """
+    if ingest.buffer is None:
+        return {}
+    return ingest.buffer.stats()
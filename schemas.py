@@ -1,4 +1,48 @@
-from pydantic import BaseModel, EmailStr, ConfigDict
+from datetime import datetime
+from decimal import Decimal
+from functools import lru_cache
+from typing import Annotated
+
+from pydantic import (
+    BaseModel,
+    EmailStr,
+    ConfigDict,
+    Field,
+    PlainSerializer,
+    StringConstraints,
+    TypeAdapter,
+    create_model,
+    model_validator,
+)
+
+MAX_ID = 2**31 - 1
+"""
+Largest value of the 32-bit integer ID columns.
+"""
+
+RowId = Annotated[int, Field(gt=0, le=MAX_ID)]
+"""
+ID of a database row, rejected with 422 when it cannot exist.
+"""
+
+Money = Annotated[
+    Decimal,
+    Field(ge=0, max_digits=12, decimal_places=2),
+    PlainSerializer(float, return_type=float, when_used="json"),
+]
+"""
+Amount in currency units, exact to the cent and sent as a JSON number.
+"""
+
+TagName = Annotated[
+    str,
+    StringConstraints(
+        strip_whitespace=True, to_lower=True, min_length=1, max_length=50
+    ),
+]
+"""
+Tag name, normalized to trimmed lowercase.
+"""
 
 
 class FilmBase(BaseModel):
@@ -6,7 +50,7 @@ class FilmBase(BaseModel):
 
     title: str
     genre: str
-    price: float
+    price: Money
 
 
 class FilmCreate(FilmBase):
@@ -30,6 +74,66 @@ class FilmRead(FilmBase):
         from_attributes = True
 
 
+@lru_cache(maxsize=None)
+def film_projection(fields: tuple[str, ...]) -> TypeAdapter:
+    """
+    Build a list adapter for a FilmRead trimmed to the given fields.
+    Results are cached per field tuple, so each projection is built once.
+    """
+    model = create_model(
+        "FilmRead_" + "_".join(fields),
+        **{name: (FilmRead.model_fields[name].annotation, ...) for name in fields},
+    )
+    return TypeAdapter(list[model])
+
+
+class TrendingFilm(FilmRead):
+    """Schema for a trending film with its current popularity score."""
+
+    score: float
+
+
+class SimilarFilm(FilmRead):
+    """Schema for a film similar to another, with its cosine similarity."""
+
+    score: float
+
+
+class FilmBatch(BaseModel):
+    """Schema for a batch film lookup, in the requested order."""
+
+    films: list[FilmRead]
+    missing: list[int]
+
+
+class FilmTags(BaseModel):
+    """Schema for replacing the tags of a film."""
+
+    tags: list[TagName] = Field(..., max_length=50)
+
+
+class FilmTagsRead(BaseModel):
+    """Schema for the tags of a film."""
+
+    film_id: int
+    tags: list[str]
+
+
+class TaggedFilmPage(BaseModel):
+    """Schema for one page of films matching a tag query."""
+
+    items: list[FilmRead]
+    total: int
+    next_after_id: int | None = None
+
+
+class TagFacets(BaseModel):
+    """Schema for per-tag film counts within a tag query's results."""
+
+    total: int
+    tags: dict[str, int]
+
+
 class UserBase(BaseModel):
     """Base schema for a user (email only)."""
 
@@ -43,6 +147,36 @@ class UserCreate(UserBase):
     role: str = "user"
 
 
+class UserImport(UserBase):
+    """Schema for one row of a bulk user import."""
+
+    password: str | None = None
+    hashed_password: str | None = None
+    role: str = "user"
+    is_active: bool = False
+
+
+class UserBulkCreateRequest(BaseModel):
+    """Schema for creating many users in one request."""
+
+    users: list[UserImport] = Field(min_length=1, max_length=10000)
+
+
+class UserImportResult(BaseModel):
+    """Schema for the outcome of one bulk import row."""
+
+    email: EmailStr
+    status: str
+    detail: str | None = None
+
+
+class UserBulkCreateResponse(BaseModel):
+    """Schema for the outcome of a bulk user import."""
+
+    created: int
+    results: list[UserImportResult]
+
+
 class UserRead(UserBase):
     """Schema for reading user data (includes ID and role)."""
 
@@ -52,8 +186,98 @@ class UserRead(UserBase):
     role: str
 
 
+class BatchActivationRequest(BaseModel):
+    """Schema for activating many users in one request."""
+
+    emails: list[EmailStr] = Field(min_length=1, max_length=10000)
+
+
+class UserListItem(UserBase):
+    """Schema for one user in the admin listing."""
+
+    id: int
+    role: str
+    is_active: bool
+
+
+class UserPage(BaseModel):
+    """Schema for one page of the admin user listing."""
+
+    items: list[UserListItem]
+    next_after_id: int | None = None
+
+
 class Token(BaseModel):
     """Schema for returning authentication tokens."""
 
     access_token: str
     token_type: str
+    refresh_token: str | None = None
+
+
+class RefreshRequest(BaseModel):
+    """Schema for exchanging or revoking a refresh token."""
+
+    refresh_token: str
+
+
+class CheckoutRequest(BaseModel):
+    """Schema for buying one or more films."""
+
+    film_ids: list[RowId] = Field(..., min_length=1, max_length=100)
+
+
+class OrderItemRead(BaseModel):
+    """Schema for one purchased film and the price paid."""
+
+    film_id: int
+    price: Money
+
+
+class OrderRead(BaseModel):
+    """Schema for reading an order with its items."""
+
+    id: int
+    status: str
+    total: Money
+    created_at: datetime
+    items: list[OrderItemRead]
+
+
+class FilmOwnership(BaseModel):
+    """Schema for a playback authorization check."""
+
+    film_id: int
+    owned: bool
+
+
+class RepriceRequest(BaseModel):
+    """Schema for a bulk price change by genre and/or film IDs."""
+
+    percent: Decimal | None = Field(None, ge=-100, max_digits=7, decimal_places=2)
+    amount: Decimal | None = Field(None, max_digits=12, decimal_places=2)
+    genre: str | None = None
+    ids: list[int] | None = Field(None, min_length=1, max_length=10000)
+
+    @model_validator(mode="after")
+    def check_change_and_selection(self):
+        """Require exactly one kind of change and at least one filter."""
+        if (self.percent is None) == (self.amount is None):
+            raise ValueError("Provide exactly one of percent or amount")
+        if self.genre is None and self.ids is None:
+            raise ValueError("Provide genre and/or ids")
+        return self
+
+
+class WatchEventIn(BaseModel):
+    """Schema for one playback progress report."""
+
+    film_id: RowId
+    position_seconds: int = Field(..., ge=0, le=MAX_ID)
+    watched_at: datetime | None = None
+
+
+class WatchEventBatch(BaseModel):
+    """Schema for a batch of playback progress reports."""
+
+    events: list[WatchEventIn] = Field(..., min_length=1, max_length=1000)
@@ -1,7 +1,9 @@
+import asyncio
+import logging
 import os
+import uuid
 from dotenv import load_dotenv
 
-from passlib.context import CryptContext
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
 
@@ -9,36 +11,70 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 from database import get_db
-from crud import get_user_by_email
+from crud import (
+    get_user_by_email,
+    create_session,
+    get_active_session,
+    rotate_session_token,
+    revoke_session,
+    get_revoked_session_ids,
+)
 from schemas import UserRead
-from settings import settings
+import timing
+from settings import get_settings
+from singleflight import SingleFlight
 
 
 load_dotenv()
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
-SECRET_KEY = settings.SECRET_KEY
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+REFRESH_TOKEN_EXPIRE_DAYS = 30
 
-if not SECRET_KEY:
-    raise ValueError("SECRET_KEY is not set in the environment variables.")
+logger = logging.getLogger(__name__)
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+user_reads = SingleFlight("users")
+"""
+Coalesces concurrent user lookups made while authenticating requests.
+"""
+
+revoked_sessions: set[int] = set()
+"""
+IDs of logged-out sessions, checked by `get_current_user` so that access
+tokens issued for a revoked session are rejected without a database query.
+Logouts in other worker processes arrive with the periodic reload.
+"""
+
+_refresh_task: asyncio.Task | None = None
+
+
+def get_secret_key() -> str:
+    """
+    Return the key that signs tokens.
+    Read on first use rather than at import, so modules that never issue
+    or check tokens (migrations, benchmarks, workers) do not need it.
+    """
+    secret_key = get_settings().SECRET_KEY
+    if not secret_key:
+        raise ValueError("SECRET_KEY is not set in the environment variables.")
+    return secret_key
 
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
     """
     Generate a JWT access token with optional expiration.
+    Tokens are typed ``access`` unless ``data`` sets another ``type``.
     """
     to_encode = data.copy()
+    to_encode.setdefault("type", "access")
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    encoded_jwt = jwt.encode(to_encode, get_secret_key(), algorithm=ALGORITHM)
     return encoded_jwt
 
 
@@ -47,12 +83,153 @@ def decode_token(token: str):
     Decode a JWT token and return the payload or None if invalid.
     """
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, get_secret_key(), algorithms=[ALGORITHM])
         return payload
     except JWTError:
         return None
 
 
+def create_refresh_token(
+    email: str, session_id: int, token_id: str, expires_at: datetime
+):
+    """
+    Generate a long-lived JWT refresh token bound to a server-side session.
+    """
+    to_encode = {
+        "sub": email,
+        "type": "refresh",
+        "sid": session_id,
+        "jti": token_id,
+        "exp": expires_at,
+    }
+    return jwt.encode(to_encode, get_secret_key(), algorithm=ALGORITHM)
+
+
+def create_session_access_token(email: str, session_id: int):
+    """
+    Generate an access token tied to a session so it can be revoked.
+    """
+    return create_access_token(
+        data={"sub": email, "sid": session_id},
+        expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES),
+    )
+
+
+async def issue_session_tokens(db: AsyncSession, user_id: int, email: str):
+    """
+    Open a new session for the user and return its access and refresh tokens.
+    """
+    token_id = uuid.uuid4().hex
+    expires_at = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    session = await create_session(db, user_id, token_id, expires_at)
+    return {
+        "access_token": create_session_access_token(email, session.id),
+        "refresh_token": create_refresh_token(email, session.id, token_id, expires_at),
+        "token_type": "bearer",
+    }
+
+
+async def refresh_session_tokens(db: AsyncSession, refresh_token: str):
+    """
+    Exchange a refresh token for a new token pair, rotating the refresh token.
+    Returns None if the token is invalid, expired, reused or revoked.
+    A validly signed token that is no longer current has already been
+    rotated, so it may have been stolen: its session is revoked.
+    """
+    payload = decode_token(refresh_token)
+    if payload is None or payload.get("type") != "refresh":
+        return None
+
+    old_token_id = payload.get("jti")
+    session = await get_active_session(db, old_token_id)
+    email = payload.get("sub")
+    token_id = uuid.uuid4().hex
+    expires_at = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    if session is None or not await rotate_session_token(
+        db, session.id, old_token_id, token_id, expires_at
+    ):
+        await _revoke_reused_session(db, payload.get("sid"))
+        return None
+
+    return {
+        "access_token": create_session_access_token(email, session.id),
+        "refresh_token": create_refresh_token(email, session.id, token_id, expires_at),
+        "token_type": "bearer",
+    }
+
+
+async def _revoke_reused_session(db: AsyncSession, session_id: int | None):
+    if session_id is None:
+        return
+    logger.warning(
+        "Rotated refresh token reused, revoking session",
+        extra={"session_id": session_id},
+    )
+    await revoke_session(db, session_id)
+    revoked_sessions.add(session_id)
+
+
+async def revoke_refresh_token(db: AsyncSession, refresh_token: str):
+    """
+    Revoke the session behind a refresh token.
+    Returns True if a session was revoked, False if the token was not usable.
+    """
+    payload = decode_token(refresh_token)
+    if payload is None or payload.get("type") != "refresh":
+        return False
+
+    session = await get_active_session(db, payload.get("jti"))
+    if session is None:
+        return False
+
+    await revoke_session(db, session.id)
+    revoked_sessions.add(session.id)
+    return True
+
+
+async def load_revoked_sessions(db: AsyncSession):
+    """
+    Add the unexpired revoked sessions in the sessions table to the
+    in-memory revocation set.
+    """
+    revoked_sessions.update(await get_revoked_session_ids(db))
+
+
+async def _refresh_revoked_sessions(session_factory, interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with session_factory() as db:
+                await load_revoked_sessions(db)
+        except Exception:
+            logger.exception("Revoked session refresh failed")
+
+
+def start_revocation_refresh(session_factory, interval: float):
+    """
+    Reload revoked sessions every ``interval`` seconds in a background task,
+    so logouts handled by other worker processes take effect here too.
+    """
+    global _refresh_task
+    _refresh_task = asyncio.create_task(
+        _refresh_revoked_sessions(session_factory, interval)
+    )
+
+
+async def stop_revocation_refresh():
+    """
+    Cancel the background reload task.
+    """
+    global _refresh_task
+    if _refresh_task is not None:
+        _refresh_task.cancel()
+        try:
+            await _refresh_task
+        except asyncio.CancelledError:
+            pass
+        _refresh_task = None
+
+
 def create_activation_token(email: str):
     """
     Create a JWT activation token for account activation.
@@ -67,26 +244,36 @@ async def get_current_user(
     Extract and return the currently authenticated user from token.
     Validates token and checks if user is active.
     """
-    payload = decode_token(token)
-    if payload is None or payload.get("type") != "access":
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid token",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    with timing.phase("auth"):
+        payload = decode_token(token)
+        if payload is None or payload.get("type") != "access":
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid token",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
 
-    email = payload.get("sub")
-    if not email:
-        raise HTTPException(status_code=401, detail="Token missing subject")
+        if payload.get("sid") in revoked_sessions:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Session has been revoked",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+
+        email = payload.get("sub")
+        if not email:
+            raise HTTPException(status_code=401, detail="Token missing subject")
 
-    db_user = await get_user_by_email(db, email)
-    if not db_user:
-        raise HTTPException(status_code=404, detail="User not found")
+        db_user = await user_reads.do(
+            ("email", email), lambda: get_user_by_email(db, email)
+        )
+        if not db_user:
+            raise HTTPException(status_code=404, detail="User not found")
 
-    if not db_user.is_active:
-        raise HTTPException(status_code=403, detail="Account is not activated")
+        if not db_user.is_active:
+            raise HTTPException(status_code=403, detail="Account is not activated")
 
-    return UserRead.from_orm(db_user)
+        return UserRead.from_orm(db_user)
 
 
 async def require_admin(current_user: UserRead = Depends(get_current_user)):
@@ -0,0 +1,52 @@
+import json
+
+from fastapi.responses import JSONResponse
+
+import timing
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is an optional speed-up
+    orjson = None
+
+
+def dumps(content) -> bytes:
+    """
+    Serialize plain Python data (dicts, lists, numbers, strings) to JSON bytes.
+    Uses orjson when installed and falls back to the standard library.
+    param content: The data to serialize.
+    return: Compact UTF-8 encoded JSON.
+    """
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson when available.
+    Content must already be plain data; no Pydantic or ORM objects.
+    """
+
+    def render(self, content) -> bytes:
+        """
+        Render the response body.
+        """
+        with timing.phase("serialize"):
+            return dumps(content)
+
+
+class TimedJSONResponse(JSONResponse):
+    """
+    Standard library JSON response whose rendering is reported as the
+    ``serialize`` request phase.
+    """
+
+    def render(self, content) -> bytes:
+        """
+        Render the response body.
+        """
+        with timing.phase("serialize"):
+            return super().render(content)
@@ -0,0 +1,113 @@
+"""
+Production server entry point.
+
+Runs the app under gunicorn with uvicorn workers (uvloop and httptools are
+picked up automatically when installed), one worker per CPU core unless
+WEB_CONCURRENCY is set. The app is imported once in the master process
+before forking, so workers start faster and share read-only memory. When
+gunicorn is unavailable (e.g. on Windows) it falls back to uvicorn's own
+multi-process supervisor.
+
+Database tables are not created by the app; run ``alembic upgrade head``
+before starting the server.
+
+Usage:
+    python server.py
+"""
+
+import os
+
+from settings import get_settings
+
+GRACEFUL_TIMEOUT_SECONDS = 30
+
+
+def worker_count() -> int:
+    """
+    Return the number of worker processes to run.
+    """
+    return get_settings().WEB_CONCURRENCY or os.cpu_count() or 1
+
+
+def post_fork(server, worker):
+    """
+    Drop database connections inherited from the master process, so each
+    worker opens its own.
+    """
+    from database import engine
+
+    engine.sync_engine.dispose(close=False)
+
+
+def run_gunicorn():
+    """
+    Serve the app with gunicorn and uvicorn workers.
+    """
+    from gunicorn.app.base import BaseApplication
+
+    class Application(BaseApplication):
+        """
+        Embedded gunicorn application configured from settings.
+        """
+
+        def load_config(self):
+            settings = get_settings()
+            options = {
+                "bind": f"{settings.SERVER_HOST}:{settings.SERVER_PORT}",
+                "workers": worker_count(),
+                "worker_class": "uvicorn_worker.UvicornWorker",
+                "preload_app": True,
+                "graceful_timeout": GRACEFUL_TIMEOUT_SECONDS,
+                "timeout": 60,
+                "keepalive": 5,
+                "max_requests": 10000,
+                "max_requests_jitter": 1000,
+                "post_fork": post_fork,
+            }
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from main import app
+
+            return app
+
+    Application().run()
+
+
+def run_uvicorn():
+    """
+    Serve the app with uvicorn's multi-process supervisor.
+    """
+    import uvicorn
+
+    settings = get_settings()
+    uvicorn.run(
+        "main:app",
+        host=settings.SERVER_HOST,
+        port=settings.SERVER_PORT,
+        workers=worker_count(),
+        loop="auto",
+        http="auto",
+        proxy_headers=True,
+        # The app logs requests itself (online_cinema.access) when timing is on.
+        access_log=not settings.TIMING_ENABLED,
+        timeout_graceful_shutdown=GRACEFUL_TIMEOUT_SECONDS,
+    )
+
+
+def main():
+    """
+    Start the server with the best available process manager.
+    """
+    try:
+        import gunicorn  # noqa: F401
+        import uvicorn_worker  # noqa: F401
+    except ImportError:
+        run_uvicorn()
+    else:
+        run_gunicorn()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 from pydantic_settings import BaseSettings
 from pydantic import EmailStr
 from dotenv import load_dotenv
@@ -11,33 +13,193 @@ class Settings(BaseSettings):
     """
     Application settings loaded from environment variables or a `.env` file.
     Attributes:
-        SECRET_KEY (str): Secret key used for signing tokens and application security.
-        AWS_ACCESS_KEY_ID (str): AWS access key ID.
-        AWS_SECRET_ACCESS_KEY (str): AWS secret access key.
-        AWS_REGION (str): AWS region, e.g., 'us-east-1'.
-        AWS_BUCKET_NAME (str): Name of the AWS S3 bucket.
-        EMAIL_HOST (str): SMTP server host for sending emails.
+        SECRET_KEY (str | None): Secret key used for signing tokens and application
+            security; required when tokens are issued or checked, and on app startup.
+        AWS_ACCESS_KEY_ID (str | None): AWS access key ID.
+        AWS_SECRET_ACCESS_KEY (str | None): AWS secret access key.
+        AWS_REGION (str | None): AWS region, e.g., 'us-east-1'.
+        AWS_BUCKET_NAME (str | None): Name of the AWS S3 bucket; avatar
+            uploads return 503 when unset.
+        EMAIL_HOST (str | None): SMTP server host for sending emails; emails
+            are skipped when unset.
         EMAIL_PORT (int): SMTP server port, default is 587.
-        EMAIL_USER (str): Username for SMTP authentication.
-        EMAIL_PASS (str): Password for SMTP authentication.
+        EMAIL_USER (str | None): Username for SMTP authentication.
+        EMAIL_PASS (str | None): Password for SMTP authentication.
         EMAIL_FROM (EmailStr): Default sender email address.
+        PASSWORD_SCHEMES (str): Comma-separated hashing schemes; the first one
+            hashes new passwords, the others are only verified and rehashed.
+        BCRYPT_ROUNDS (int): bcrypt cost factor (log2 of iterations).
+        ARGON2_TIME_COST (int): argon2id number of passes.
+        ARGON2_MEMORY_COST (int): argon2id memory usage in KiB.
+        ARGON2_PARALLELISM (int): argon2id number of lanes.
+        FAST_JSON (bool): Serialize responses with orjson and serve film lists
+            from column tuples without per-row Pydantic validation.
+        CATALOG_SNAPSHOT (bool): Serve film list queries from an in-process
+            columnar copy of the films table, kept current by film writes.
+        CHANGE_FEED_POLL_INTERVAL (float): Seconds between reads of new
+            outbox events, which feed the change feed and bring film writes
+            of other workers into the in-process indexes.
+        REVOCATION_REFRESH_SECONDS (float): Seconds between reloads of
+            revoked sessions; bounds how long an access token logged out on
+            another worker is still accepted.
+        AUTO_CREATE_TABLES (bool): Create missing tables on startup; for local
+            development only, production schemas are managed by Alembic.
+        SERVER_HOST (str): Address the production server binds to.
+        SERVER_PORT (int): Port the production server listens on.
+        WEB_CONCURRENCY (int | None): Worker processes; one per CPU core if unset.
+        WATCH_BATCH_SIZE (int): Watch events inserted per transaction.
+        WATCH_FLUSH_INTERVAL (float): Maximum seconds a watch event waits
+            in memory before it is flushed.
+        WATCH_BUFFER_CAPACITY (int): Watch events held in memory per process.
+        WATCH_SPILL_PATH (str | None): Prefix of the per-process files that
+            absorb watch events when the buffer is full; without it, a full
+            buffer rejects requests with 503.
+        WATCH_MAX_ATTEMPTS (int): Inserts tried for a batch of watch events
+            before it is dropped and logged, when there is no spill file.
+        POPULARITY_FLUSH_INTERVAL (float): Seconds between flushes of view and
+            purchase counts to the film_stats table.
+        POPULARITY_HALF_LIFE_HOURS (float): Hours after which a view or
+            purchase counts half as much towards the trending score.
+        TRENDING_SIZE (int): Films kept in the precomputed trending list.
+        SIMILAR_FILMS (bool): Build the in-process similar films index on
+            startup (requires numpy).
+        SIMILAR_FILMS_K (int): Neighbours precomputed per film.
+        TAG_INDEX_REFRESH_SECONDS (float): Seconds between reloads of the
+            in-memory tag index, which pick up tag changes made by other workers.
+        OUTBOX_RELAY_ENABLED (bool): Run the background outbox relay.
+        OUTBOX_FILE_PATH (str | None): Also append relayed events to this
+            JSON Lines file.
+        OUTBOX_BATCH_SIZE (int): Events delivered per relay batch.
+        OUTBOX_POLL_INTERVAL (float): Seconds between polls when idle.
+        COMPRESSION_ENABLED (bool): Compress responses the client accepts.
+        COMPRESSION_ENCODINGS (str): Comma-separated encodings in server
+            preference order; ones whose library is missing are skipped.
+        COMPRESSION_MINIMUM_SIZE (int): Smallest body, in bytes, to compress.
+        COMPRESSION_GZIP_LEVEL (int): gzip level, 1-9.
+        COMPRESSION_BROTLI_QUALITY (int): brotli quality, 0-11.
+        COMPRESSION_ZSTD_LEVEL (int): zstd level, 1-22.
+        COMPRESSION_CACHE_SIZE (int): Number of precompressed catalog
+            responses kept in memory.
+        PROFILING_ENABLED (bool): Install the request profiling middleware.
+        PROFILING_SAMPLE_RATE (float): Fraction of requests profiled at random.
+        PROFILING_TOKEN (str | None): Secret that profiles a request when sent
+            in the ``X-Profile`` header; header triggering is off when unset.
+        PROFILING_MIN_DURATION_MS (float): Sampled profiles of faster requests
+            are discarded.
+        PROFILING_DIR (str): Directory holding the stored profiles.
+        PROFILING_CAPACITY (int): Profiles kept; the oldest are deleted first.
+        TIMING_ENABLED (bool): Time request phases (auth, db, hash, serialize)
+            and log each request with them on ``online_cinema.access``.
+        SERVER_TIMING_HEADER (bool): Send the phase timings to clients in a
+            ``Server-Timing`` response header.
+        DATABASE_URL (str): Async SQLAlchemy URL; SQLite (aiosqlite) by
+            default, ``postgresql+asyncpg://...`` in production.
+        SYNC_DATABASE_URL (str | None): Synchronous URL for Alembic; if unset,
+            migrations run through DATABASE_URL.
+        DB_POOL_SIZE (int): Connections kept open per worker process
+            (PostgreSQL only).
+        DB_MAX_OVERFLOW (int): Extra connections opened under load per worker.
+        DB_POOL_TIMEOUT (float): Seconds to wait for a free connection.
+        DB_POOL_RECYCLE (int): Seconds after which a connection is replaced.
+        DB_POOL_PRE_PING (bool): Check connections before use, so restarts of
+            the database server do not surface as request errors.
+        DB_STATEMENT_CACHE_SIZE (int): Prepared statements cached per asyncpg
+            connection; set 0 behind PgBouncer in transaction pooling mode.
+        DB_APPLICATION_NAME (str): Name shown for the connections in
+            ``pg_stat_activity``.
+        DB_ECHO (bool): Log every SQL statement (the ``sqlalchemy.engine``
+            logger at INFO) through the logging pipeline.
+        LOG_LEVEL (str): Root logger level.
+        LOG_LEVELS (str): Per-logger levels as comma-separated ``name=LEVEL``
+            pairs, e.g. ``online_cinema.access=WARNING,tags=DEBUG``.
+        LOG_FORMAT (str): ``json`` for one JSON object per line, or ``text``.
+        LOG_DEBUG_SAMPLE_RATE (float): Fraction of DEBUG records kept.
+        LOG_QUEUE_SIZE (int): Records buffered for the writer thread; more
+            are dropped rather than blocking the caller.
     """
 
-    SECRET_KEY: str
+    SECRET_KEY: str | None = None
 
-    AWS_ACCESS_KEY_ID: str
-    AWS_SECRET_ACCESS_KEY: str
-    AWS_REGION: str
-    AWS_BUCKET_NAME: str
+    AWS_ACCESS_KEY_ID: str | None = None
+    AWS_SECRET_ACCESS_KEY: str | None = None
+    AWS_REGION: str | None = None
+    AWS_BUCKET_NAME: str | None = None
 
-    EMAIL_HOST: str
+    EMAIL_HOST: str | None = None
     EMAIL_PORT: int = 587
-    EMAIL_USER: str
-    EMAIL_PASS: str
+    EMAIL_USER: str | None = None
+    EMAIL_PASS: str | None = None
     EMAIL_FROM: EmailStr = "noreply@yourapp.com"
 
+    PASSWORD_SCHEMES: str = "bcrypt"
+    BCRYPT_ROUNDS: int = 12
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_COST: int = 65536
+    ARGON2_PARALLELISM: int = 4
+
+    FAST_JSON: bool = False
+    CATALOG_SNAPSHOT: bool = False
+    CHANGE_FEED_POLL_INTERVAL: float = 1.0
+    REVOCATION_REFRESH_SECONDS: float = 5.0
+
+    WATCH_BATCH_SIZE: int = 1000
+    WATCH_FLUSH_INTERVAL: float = 0.5
+    WATCH_BUFFER_CAPACITY: int = 50000
+    WATCH_SPILL_PATH: str | None = None
+    WATCH_MAX_ATTEMPTS: int = 5
+
+    POPULARITY_FLUSH_INTERVAL: float = 5.0
+    POPULARITY_HALF_LIFE_HOURS: float = 24.0
+    TRENDING_SIZE: int = 100
+
+    SIMILAR_FILMS: bool = False
+    SIMILAR_FILMS_K: int = 20
+    TAG_INDEX_REFRESH_SECONDS: float = 60.0
+
+    OUTBOX_RELAY_ENABLED: bool = False
+    OUTBOX_FILE_PATH: str | None = None
+    OUTBOX_BATCH_SIZE: int = 500
+    OUTBOX_POLL_INTERVAL: float = 1.0
+
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_ENCODINGS: str = "zstd,br,gzip"
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    COMPRESSION_ZSTD_LEVEL: int = 3
+    COMPRESSION_CACHE_SIZE: int = 64
+
+    PROFILING_ENABLED: bool = False
+    PROFILING_SAMPLE_RATE: float = 0.0
+    PROFILING_TOKEN: str | None = None
+    PROFILING_MIN_DURATION_MS: float = 0.0
+    PROFILING_DIR: str = "profiles"
+    PROFILING_CAPACITY: int = 100
+
+    TIMING_ENABLED: bool = True
+    SERVER_TIMING_HEADER: bool = True
+
+    AUTO_CREATE_TABLES: bool = False
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    WEB_CONCURRENCY: int | None = None
+
     DATABASE_URL: str = "sqlite+aiosqlite:///./online_cinema.db"
-    SYNC_DATABASE_URL: str = "sqlite:///./online_cinema.db"
+    SYNC_DATABASE_URL: str | None = None
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 500
+    DB_APPLICATION_NAME: str = "online-cinema"
+    DB_ECHO: bool = False
+
+    LOG_LEVEL: str = "INFO"
+    LOG_LEVELS: str = ""
+    LOG_FORMAT: str = "json"
+    LOG_DEBUG_SAMPLE_RATE: float = 1.0
+    LOG_QUEUE_SIZE: int = 10000
 
     class Config:
         """
@@ -48,4 +210,12 @@ class Settings(BaseSettings):
         env_file = ".env"
 
 
-settings = Settings()
+@lru_cache
+def get_settings() -> Settings:
+    """
+    Return the application settings, reading the environment once.
+    Call it where a setting is used rather than at import, so importing a
+    module neither reads the environment nor needs SECRET_KEY.
+    Use as a FastAPI dependency where settings should be overridable in tests.
+    """
+    return Settings()
@@ -0,0 +1,300 @@
+import math
+import re
+import zlib
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from crud import get_film_rows
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is needed only for similar films
+    np = None
+
+TITLE_DIMS = 256
+PRICE_BUCKETS = 10
+TITLE_WEIGHT = 0.8
+PRICE_WEIGHT = 0.5
+GENRE_WEIGHT = 1.0
+STOPWORDS = frozenset({"a", "an", "and", "in", "of", "on", "the", "to"})
+BUILD_CHUNK_ROWS = 1024
+SCORE_DECIMALS = 9
+
+
+def title_tokens(title: str) -> list[str]:
+    """
+    Split a title into lowercase word tokens, dropping stopwords.
+    """
+    return [
+        token
+        for token in re.findall(r"\w+", title.lower())
+        if len(token) > 1 and token not in STOPWORDS
+    ]
+
+
+def price_bucket(price: float) -> int:
+    """
+    Map a price to a logarithmic bucket: 0-1, 1-3, 3-7, 7-15, ...
+    """
+    return min(PRICE_BUCKETS - 1, int(math.log2(1 + max(float(price), 0.0))))
+
+
+class SimilarityIndex:
+    """
+    In-process "similar films" index with precomputed nearest neighbours.
+    Each film is a unit vector made of hashed title tokens, a one-hot price
+    bucket and a one-hot genre, so the dot product of two rows is their
+    cosine similarity. The top ``k`` neighbours of every film are computed
+    once with blocked matrix products and stored, making a request a lookup.
+    Film changes are applied incrementally: the changed film's row is
+    compared against all others with one matrix-vector product, which both
+    gives its own neighbours and shows which other films gain it as a
+    neighbour. Only films that lose a neighbour are recomputed from scratch.
+    Attributes:
+        loaded (bool): Whether the index has been built.
+    """
+
+    def __init__(self, k: int = 20):
+        if np is None:
+            raise RuntimeError("Similar films require numpy (pip install numpy)")
+        self.k = k
+        self.loaded = False
+        self.clear()
+
+    def clear(self):
+        """
+        Drop all films.
+        """
+        self._genres: dict[str, int] = {}
+        self._rows: dict[int, int] = {}
+        self._ids = np.empty(0, dtype=np.int64)
+        self._vectors = np.zeros((0, TITLE_DIMS + PRICE_BUCKETS), dtype=np.float64)
+        self._neighbour_ids = np.empty((0, self.k), dtype=np.int64)
+        self._neighbour_scores = np.empty((0, self.k), dtype=np.float64)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def build(self, rows: list[dict]):
+        """
+        Replace the index with the given film rows and compute all neighbours.
+        """
+        self.clear()
+        for genre in sorted({row["genre"] for row in rows}):
+            self._genre_column(genre)
+        self._reserve(len(rows))
+        for row in rows:
+            self._set_row(self._add_row(row["id"]), row)
+        for start in range(0, self._size, BUILD_CHUNK_ROWS):
+            stop = min(start + BUILD_CHUNK_ROWS, self._size)
+            scores = np.round(
+                self._vectors[start:stop] @ self._vectors[: self._size].T,
+                SCORE_DECIMALS,
+            )
+            scores[np.arange(stop - start), np.arange(start, stop)] = -np.inf
+            for offset in range(stop - start):
+                self._store_top(start + offset, scores[offset])
+        self.loaded = True
+
+    def similar(self, film_id: int, limit: int) -> list[tuple[int, float]] | None:
+        """
+        Return up to ``limit`` ``(film_id, score)`` pairs, most similar first,
+        or None if the film is not indexed.
+        """
+        row = self._rows.get(film_id)
+        if row is None:
+            return None
+        ids = self._neighbour_ids[row, :limit]
+        scores = self._neighbour_scores[row, :limit]
+        return [
+            (int(neighbour), float(score))
+            for neighbour, score in zip(ids, scores)
+            if neighbour >= 0
+        ]
+
+    def apply(self, action: str, film):
+        """
+        Film change listener: update the index for a create, update or delete.
+        """
+        if action == "delete":
+            self.remove(film.id)
+        else:
+            self.upsert(
+                {
+                    "id": film.id,
+                    "title": film.title,
+                    "genre": film.genre,
+                    "price": film.price,
+                }
+            )
+
+    def upsert(self, row: dict):
+        """
+        Add or replace one film and refresh the affected neighbour lists.
+        """
+        self._genre_column(row["genre"])
+        film_id = row["id"]
+        position = self._rows.get(film_id)
+        if position is None:
+            self._reserve(self._size + 1)
+            position = self._add_row(film_id)
+            stale = np.empty(0, dtype=np.int64)
+        else:
+            # Films that listed this one may rank it lower now.
+            stale = self._rows_listing(film_id)
+        self._set_row(position, row)
+
+        scores = self._scores_against(position)
+        self._store_top(position, scores)
+        for other in stale:
+            if other != position:
+                self._recompute(other)
+
+        # Films for which this one now beats their weakest neighbour.
+        weakest_scores = self._neighbour_scores[: self._size, -1]
+        weakest_ids = self._neighbour_ids[: self._size, -1]
+        gains = np.nonzero(
+            (scores > weakest_scores)
+            | ((scores == weakest_scores) & (film_id < weakest_ids))
+        )[0]
+        for other in gains:
+            if other in stale or self._lists(other, film_id):
+                continue
+            self._insert_neighbour(other, film_id, scores[other])
+
+    def remove(self, film_id: int):
+        """
+        Remove one film and recompute the neighbour lists that contained it.
+        """
+        position = self._rows.pop(film_id, None)
+        if position is None:
+            return
+        last = self._size - 1
+        if position != last:
+            # Move the last row into the gap so rows stay contiguous.
+            moved_id = int(self._ids[last])
+            self._ids[position] = moved_id
+            self._vectors[position] = self._vectors[last]
+            self._neighbour_ids[position] = self._neighbour_ids[last]
+            self._neighbour_scores[position] = self._neighbour_scores[last]
+            self._rows[moved_id] = position
+        self._ids[last] = -1
+        self._vectors[last] = 0
+        self._size -= 1
+        for other in self._rows_listing(film_id):
+            self._recompute(other)
+
+    def _genre_column(self, genre: str) -> int:
+        column = self._genres.get(genre)
+        if column is None:
+            column = self._vectors.shape[1]
+            self._genres[genre] = column
+            self._vectors = np.pad(self._vectors, ((0, 0), (0, 1)))
+        return column
+
+    def _reserve(self, size: int):
+        capacity = len(self._ids)
+        if size <= capacity:
+            return
+        extra = max(size, capacity * 2, 16) - capacity
+        self._ids = np.concatenate([self._ids, np.full(extra, -1, dtype=np.int64)])
+        self._vectors = np.pad(self._vectors, ((0, extra), (0, 0)))
+        self._neighbour_ids = np.concatenate(
+            [self._neighbour_ids, np.full((extra, self.k), -1, dtype=np.int64)]
+        )
+        self._neighbour_scores = np.concatenate(
+            [
+                self._neighbour_scores,
+                np.full((extra, self.k), -np.inf, dtype=np.float64),
+            ]
+        )
+
+    def _add_row(self, film_id: int) -> int:
+        position = self._size
+        self._size += 1
+        self._ids[position] = film_id
+        self._rows[film_id] = position
+        return position
+
+    def _set_row(self, position: int, row: dict):
+        vector = self._vectors[position]
+        vector[:] = 0
+        tokens = title_tokens(row["title"])
+        for token in tokens:
+            vector[zlib.crc32(token.encode()) % TITLE_DIMS] += 1.0
+        title_norm = np.linalg.norm(vector[:TITLE_DIMS])
+        if title_norm:
+            vector[:TITLE_DIMS] *= TITLE_WEIGHT / title_norm
+        vector[TITLE_DIMS + price_bucket(row["price"])] = PRICE_WEIGHT
+        vector[self._genres[row["genre"]]] = GENRE_WEIGHT
+        vector /= np.linalg.norm(vector)
+
+    def _store_top(self, position: int, scores):
+        """
+        Store the ``k`` best entries of a similarity row as the neighbours of
+        ``position``; the self-similarity must already be excluded.
+        """
+        count = min(self.k, self._size - 1)
+        ids = np.full(self.k, -1, dtype=np.int64)
+        top_scores = np.full(self.k, -np.inf, dtype=np.float64)
+        if count > 0:
+            top = np.argpartition(-scores, count - 1)[:count]
+            # Break ties at the cut-off by film ID, so the result does not
+            # depend on row order.
+            cutoff = scores[top].min()
+            above = np.nonzero(scores > cutoff)[0]
+            tied = np.nonzero(scores == cutoff)[0]
+            tied = tied[np.argsort(self._ids[tied])[: count - len(above)]]
+            top = np.concatenate([above, tied])
+            top = top[np.lexsort((self._ids[top], -scores[top]))]
+            ids[:count] = self._ids[top]
+            top_scores[:count] = scores[top]
+        self._neighbour_ids[position] = ids
+        self._neighbour_scores[position] = top_scores
+
+    def _scores_against(self, position: int):
+        scores = np.round(
+            self._vectors[: self._size] @ self._vectors[position], SCORE_DECIMALS
+        )
+        scores[position] = -np.inf
+        return scores
+
+    def _recompute(self, position: int):
+        self._store_top(position, self._scores_against(position))
+
+    def _rows_listing(self, film_id: int):
+        return np.nonzero((self._neighbour_ids[: self._size] == film_id).any(axis=1))[0]
+
+    def _lists(self, position: int, film_id: int) -> bool:
+        return bool((self._neighbour_ids[position] == film_id).any())
+
+    def _insert_neighbour(self, position: int, film_id: int, score: float):
+        ids = self._neighbour_ids[position]
+        scores = self._neighbour_scores[position]
+        # Lists are ordered by score, then film ID, as in _store_top.
+        slot = int(
+            np.count_nonzero(
+                (scores > score) | ((scores == score) & (ids >= 0) & (ids < film_id))
+            )
+        )
+        ids[slot + 1 :] = ids[slot:-1].copy()
+        scores[slot + 1 :] = scores[slot:-1].copy()
+        ids[slot] = film_id
+        scores[slot] = score
+
+
+index: SimilarityIndex | None = None
+"""
+The process-wide similarity index, built on startup when enabled.
+"""
+
+
+async def load_similarity(db: AsyncSession, k: int) -> SimilarityIndex:
+    """
+    Build the similarity index from the films table.
+    """
+    global index
+    index = SimilarityIndex(k)
+    index.build(await get_film_rows(db))
+    return index
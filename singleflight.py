@@ -0,0 +1,77 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+groups: dict[str, "SingleFlight"] = {}
+"""
+All single-flight groups by name, for metrics reporting.
+"""
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key into one execution.
+    While a call for a key is in flight, further calls for that key wait for
+    its result instead of running their own. The shared result is handed to
+    every caller, so it must be treated as read-only.
+    Attributes:
+        name (str): Group name used in metrics.
+        calls (int): Total calls made through the group.
+        executions (int): Calls that actually ran the wrapped function.
+        coalesced (int): Calls that reused an in-flight result.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+        groups[name] = self
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]):
+        """
+        Run ``fn`` unless a call for ``key`` is already in flight, then share
+        its result or exception with every caller.
+        """
+        self.calls += 1
+        while key in self._inflight:
+            future = self._inflight[key]
+            try:
+                result = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The leading call was cancelled; try again, possibly as leader.
+                continue
+            self.coalesced += 1
+            return result
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        self.executions += 1
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            # Mark the exception retrieved in case nobody else was waiting.
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._inflight[key]
+
+    def stats(self) -> dict:
+        """
+        Return the group's counters.
+        """
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._inflight),
+        }
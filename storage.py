@@ -0,0 +1,28 @@
+from functools import lru_cache
+
+from fastapi import HTTPException
+
+from settings import get_settings
+
+
+@lru_cache
+def get_s3_client():
+    """
+    Return the shared S3 client, creating it on first use.
+    boto3 is imported here rather than at module level because importing it
+    and building a client dominate cold-start time, and most processes
+    (tests, workers that never serve avatars) never touch S3.
+    Use as a FastAPI dependency so tests can override it.
+    """
+    settings = get_settings()
+    if not settings.AWS_BUCKET_NAME:
+        raise HTTPException(status_code=503, detail="File storage is not configured")
+
+    import boto3
+
+    return boto3.client(
+        "s3",
+        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+        region_name=settings.AWS_REGION,
+    )
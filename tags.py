@@ -0,0 +1,291 @@
+import asyncio
+import heapq
+import logging
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections.abc import Iterator
+from itertools import islice
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from crud import genre_tags, get_film_rows, get_film_tag_pairs
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_tag(name: str) -> str:
+    """
+    Normalize a tag name: trimmed and lowercase.
+    """
+    return name.strip().lower()
+
+
+class TagIndex:
+    """
+    In-memory inverted index from tags to films.
+    Every tag keeps a sorted array of the IDs of its films, like the genre
+    arrays of ``catalog.CatalogSnapshot``, so memory grows with the number
+    of taggings rather than with the highest film ID. Queries walk the
+    rarest "all of" array (or the merged "any of" arrays) from the page
+    start, test the other tags with bisect, and stop once the page is full.
+    Attributes:
+        loaded (bool): Whether the index has been filled from the database.
+    """
+
+    def __init__(self):
+        self.loaded = False
+        self.clear()
+
+    def clear(self):
+        """
+        Drop all films and tags.
+        """
+        self._films = array("q")
+        self._postings: dict[str, array] = {}
+        self._film_tags: dict[int, set[str]] = {}
+        self._genres: dict[int, str] = {}
+
+    def load(
+        self,
+        film_ids: list[int],
+        pairs: list[tuple[int, str]],
+        genres: dict[int, str] | None = None,
+    ):
+        """
+        Replace the index contents with the given films and (film, tag) pairs.
+        ``genres`` maps film IDs to genres, so a later genre change can
+        replace the tags derived from the old genre.
+        """
+        film_tags: dict[int, set[str]] = {}
+        for film_id, tag in pairs:
+            film_tags.setdefault(film_id, set()).add(tag)
+        postings: dict[str, list[int]] = {}
+        for film_id in sorted(film_tags):
+            for tag in film_tags[film_id]:
+                postings.setdefault(tag, []).append(film_id)
+        self._films = array("q", sorted(set(film_ids)))
+        self._postings = {tag: array("q", ids) for tag, ids in postings.items()}
+        self._film_tags = film_tags
+        self._genres = dict(genres or {})
+        self.loaded = True
+
+    def set_film_tags(self, film_id: int, tags: list[str]):
+        """
+        Replace the tags of one film.
+        """
+        self._add_film(film_id)
+        old = self._film_tags.pop(film_id, set())
+        new = set(tags)
+        for tag in old - new:
+            posting = self._postings[tag]
+            del posting[bisect_left(posting, film_id)]
+            if not posting:
+                del self._postings[tag]
+        for tag in new - old:
+            insort(self._postings.setdefault(tag, array("q")), film_id)
+        if new:
+            self._film_tags[film_id] = new
+
+    def tags_of(self, film_id: int) -> list[str]:
+        """
+        Return the sorted tags of one film.
+        """
+        return sorted(self._film_tags.get(film_id, ()))
+
+    def apply(self, action: str, film):
+        """
+        Film change listener: track created and deleted films, and tag
+        created films and films whose genre changed with the components of
+        their genre, as ``crud.create_film`` and ``crud.update_film`` do.
+        """
+        if action == "delete":
+            self.set_film_tags(film.id, [])
+            if _contains(self._films, film.id):
+                del self._films[bisect_left(self._films, film.id)]
+            self._genres.pop(film.id, None)
+            return
+        self._add_film(film.id)
+        old_genre = self._genres.get(film.id)
+        self._genres[film.id] = film.genre
+        if film.genre != old_genre:
+            names = set(self._film_tags.get(film.id, ()))
+            if old_genre is not None:
+                names -= set(genre_tags(old_genre))
+            names |= set(genre_tags(film.genre))
+            self.set_film_tags(film.id, sorted(names))
+
+    def query(
+        self,
+        all_of: list[str] | None = None,
+        any_of: list[str] | None = None,
+        none_of: list[str] | None = None,
+        after_id: int | None = None,
+        limit: int | None = None,
+    ) -> list[int]:
+        """
+        Return the sorted IDs of the films having every tag in ``all_of``, at
+        least one tag in ``any_of`` and no tag in ``none_of``, starting after
+        ``after_id`` and stopping after ``limit`` IDs. Empty lists are
+        ignored, so no filters match every film.
+        """
+        matches = self._matches(all_of, any_of, none_of, after_id)
+        return list(matches if limit is None else islice(matches, limit))
+
+    def count(
+        self,
+        all_of: list[str] | None = None,
+        any_of: list[str] | None = None,
+        none_of: list[str] | None = None,
+    ) -> int:
+        """
+        Count the films matching ``query`` filters without listing them.
+        A single tag or no filters at all is answered from an array length.
+        """
+        if not any_of and not none_of:
+            if not all_of:
+                return len(self._films)
+            if len(set(all_of)) == 1:
+                return self._tag_size(all_of[0])
+        return sum(1 for _ in self._matches(all_of, any_of, none_of))
+
+    def facets(self, film_ids: list[int]) -> dict[str, int]:
+        """
+        Count the given films per tag, omitting empty tags.
+        """
+        counts: dict[str, int] = {}
+        for film_id in film_ids:
+            for tag in self._film_tags.get(film_id, ()):
+                counts[tag] = counts.get(tag, 0) + 1
+        return dict(sorted(counts.items(), key=lambda item: (-item[1], item[0])))
+
+    def _matches(
+        self,
+        all_of: list[str] | None,
+        any_of: list[str] | None,
+        none_of: list[str] | None,
+        after_id: int | None = None,
+    ) -> Iterator[int]:
+        required = sorted(set(all_of or ()), key=self._tag_size)
+        if any(tag not in self._postings for tag in required):
+            return
+        optional = [
+            self._postings[tag] for tag in any_of or () if tag in self._postings
+        ]
+        if any_of and not optional:
+            return
+        excluded = [
+            self._postings[tag] for tag in none_of or () if tag in self._postings
+        ]
+
+        if required:
+            # Walk the rarest tag and test the others, so empty results stop early.
+            candidates = _tail(self._postings[required[0]], after_id)
+            required = [self._postings[tag] for tag in required[1:]]
+        elif optional:
+            candidates = _unique(
+                heapq.merge(*(_tail(posting, after_id) for posting in optional))
+            )
+            optional = []
+        else:
+            candidates = _tail(self._films, after_id)
+
+        for film_id in candidates:
+            if (
+                all(_contains(posting, film_id) for posting in required)
+                and (
+                    not optional
+                    or any(_contains(posting, film_id) for posting in optional)
+                )
+                and not any(_contains(posting, film_id) for posting in excluded)
+            ):
+                yield film_id
+
+    def _add_film(self, film_id: int):
+        if not _contains(self._films, film_id):
+            insort(self._films, film_id)
+
+    def _tag_size(self, tag: str) -> int:
+        return len(self._postings.get(tag, ()))
+
+
+def _contains(ids: array, film_id: int) -> bool:
+    position = bisect_left(ids, film_id)
+    return position < len(ids) and ids[position] == film_id
+
+
+def _tail(ids: array, after_id: int | None) -> Iterator[int]:
+    start = 0 if after_id is None else bisect_right(ids, after_id)
+    return (ids[position] for position in range(start, len(ids)))
+
+
+def _unique(ids: Iterator[int]) -> Iterator[int]:
+    previous = None
+    for film_id in ids:
+        if film_id != previous:
+            yield film_id
+            previous = film_id
+
+
+index = TagIndex()
+"""
+The process-wide tag index.
+"""
+
+_load_lock = asyncio.Lock()
+_refresh_task: asyncio.Task | None = None
+
+
+async def load_tags(db: AsyncSession):
+    """
+    Fill the tag index from the database.
+    """
+    rows = await get_film_rows(db, fields=("id", "genre"))
+    index.load(
+        [row["id"] for row in rows],
+        await get_film_tag_pairs(db),
+        {row["id"]: row["genre"] for row in rows},
+    )
+
+
+async def ensure_loaded(db: AsyncSession):
+    """
+    Load the tag index on first use.
+    """
+    if index.loaded:
+        return
+    async with _load_lock:
+        if not index.loaded:
+            await load_tags(db)
+
+
+async def _refresh(session_factory, interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with session_factory() as db:
+                await load_tags(db)
+        except Exception:
+            logger.exception("Tag index refresh failed")
+
+
+def start_refresh(session_factory, interval: float):
+    """
+    Reload the index every ``interval`` seconds in a background task, so
+    tag changes made by other worker processes become visible.
+    """
+    global _refresh_task
+    _refresh_task = asyncio.create_task(_refresh(session_factory, interval))
+
+
+async def stop_refresh():
+    """
+    Cancel the background reload task.
+    """
+    global _refresh_task
+    if _refresh_task is not None:
+        _refresh_task.cancel()
+        try:
+            await _refresh_task
+        except asyncio.CancelledError:
+            pass
+        _refresh_task = None
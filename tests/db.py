@@ -0,0 +1,51 @@
+import os
+from contextlib import asynccontextmanager
+
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import NullPool, StaticPool
+
+from database import enable_sqlite_foreign_keys
+from models import Base
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+"""
+Database the tests run against. In-memory SQLite by default; set it to an
+empty PostgreSQL database, e.g.
+``postgresql+asyncpg://postgres@localhost/cinema_test``, to run the suite
+on Postgres.
+"""
+
+
+def create_test_engine() -> AsyncEngine:
+    """
+    Create an engine for the test database.
+    In-memory SQLite keeps a single shared connection, so every session
+    sees the same database, and enforces foreign keys as PostgreSQL does.
+    """
+    if TEST_DATABASE_URL.startswith("sqlite"):
+        engine = create_async_engine(
+            TEST_DATABASE_URL,
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+        enable_sqlite_foreign_keys(engine)
+        return engine
+    return create_async_engine(TEST_DATABASE_URL, poolclass=NullPool)
+
+
+@asynccontextmanager
+async def database_engine(metadata=Base.metadata):
+    """
+    Yield a test engine with fresh tables, dropping them afterwards so a
+    persistent database is left empty for the next test.
+    """
+    engine = create_test_engine()
+    async with engine.begin() as conn:
+        await conn.run_sync(metadata.drop_all)
+        await conn.run_sync(metadata.create_all)
+    try:
+        yield engine
+    finally:
+        async with engine.begin() as conn:
+            await conn.run_sync(metadata.drop_all)
+        await engine.dispose()
@@ -3,20 +3,26 @@ import asyncio
 import pytest
 import uuid
 
+from datetime import datetime, timedelta
+
 from httpx import AsyncClient, ASGITransport
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
 from main import app
-from models import Base
 from schemas import UserCreate
-from crud import create_user
-from security import create_activation_token
+from crud import create_user, rotate_session_token
+from security import (
+    create_activation_token,
+    decode_token,
+    issue_session_tokens,
+    revoked_sessions,
+)
 from database import get_db
+from tests.db import database_engine
+from utils import build_pwd_context, get_pwd_context
 
 if sys.platform.startswith("win"):
     asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
 
-TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
 transport = ASGITransport(app=app)
 BASE_URL = "http://test"
 
@@ -34,30 +40,20 @@ def event_loop():
 @pytest.fixture
 async def async_session() -> AsyncSession:
     """
-    Set up an in-memory async database session with overridden FastAPI dependency.
+    Set up an async test database session with overridden FastAPI dependency.
     """
-    engine = create_async_engine(
-        TEST_DATABASE_URL,
-        connect_args={"check_same_thread": False},
-        poolclass=StaticPool,
-        echo=False,
-    )
+    async with database_engine() as engine:
+        async_session_factory = async_sessionmaker(engine, expire_on_commit=False)
 
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+        async with async_session_factory() as session:
 
-    async_session_factory = async_sessionmaker(engine, expire_on_commit=False)
+            async def override_get_db():
+                yield session
 
-    async with async_session_factory() as session:
+            app.dependency_overrides[get_db] = override_get_db
 
-        async def override_get_db():
             yield session
 
-        app.dependency_overrides[get_db] = override_get_db
-
-        yield session
-
-    await engine.dispose()
     app.dependency_overrides.clear()
 
 
@@ -119,3 +115,214 @@ async def test_upload_file_success(async_session: AsyncSession):
 
     assert response.status_code == 200
     assert "filename" in response.json()
+
+
+async def _create_active_user(session: AsyncSession, password: str):
+    """
+    Create an activated user with a random email and return it.
+    """
+    email = f"user_{uuid.uuid4().hex[:6]}@example.com"
+    user = await create_user(
+        session, UserCreate(email=email, password=password, role="user")
+    )
+    user.is_active = True
+    await session.commit()
+    return user
+
+
+@pytest.mark.anyio
+async def test_refresh_token_rotates(async_session: AsyncSession):
+    """
+    Test that a refresh token yields a new token pair and cannot be reused.
+    """
+    user = await _create_active_user(async_session, "12345")
+
+    async with AsyncClient(transport=transport, base_url=BASE_URL) as client:
+        login = await client.post(
+            "/login", params={"email": user.email, "password": "12345"}
+        )
+        refresh_token = login.json()["refresh_token"]
+
+        response = await client.post(
+            "/token/refresh", json={"refresh_token": refresh_token}
+        )
+        reused = await client.post(
+            "/token/refresh", json={"refresh_token": refresh_token}
+        )
+
+    assert login.status_code == 200
+    assert response.status_code == 200
+    assert response.json()["refresh_token"] != refresh_token
+    assert reused.status_code == 401
+
+
+@pytest.mark.anyio
+async def test_refresh_token_reuse_revokes_session(async_session: AsyncSession):
+    """
+    Test that reusing a rotated refresh token revokes the whole session,
+    including the refresh token issued by the rotation.
+    """
+    user = await _create_active_user(async_session, "12345")
+
+    async with AsyncClient(transport=transport, base_url=BASE_URL) as client:
+        login = await client.post(
+            "/login", params={"email": user.email, "password": "12345"}
+        )
+        stolen = login.json()["refresh_token"]
+        rotated = await client.post("/token/refresh", json={"refresh_token": stolen})
+        reused = await client.post("/token/refresh", json={"refresh_token": stolen})
+        current = await client.post(
+            "/token/refresh", json={"refresh_token": rotated.json()["refresh_token"]}
+        )
+
+    revoked = decode_token(stolen)["sid"] in revoked_sessions
+    revoked_sessions.clear()
+
+    assert rotated.status_code == 200
+    assert reused.status_code == 401
+    assert current.status_code == 401
+    assert revoked
+
+
+@pytest.mark.anyio
+async def test_concurrent_refresh_rotates_once(async_session: AsyncSession):
+    """
+    Test that only one of two refreshes racing with the same token succeeds.
+    """
+    user = await _create_active_user(async_session, "12345")
+    tokens = await issue_session_tokens(async_session, user.id, user.email)
+    session_id = decode_token(tokens["refresh_token"])["sid"]
+    old_token_id = decode_token(tokens["refresh_token"])["jti"]
+    expires_at = datetime.utcnow() + timedelta(days=1)
+
+    first = await rotate_session_token(
+        async_session, session_id, old_token_id, "first", expires_at
+    )
+    second = await rotate_session_token(
+        async_session, session_id, old_token_id, "second", expires_at
+    )
+
+    assert first
+    assert not second
+
+
+@pytest.mark.anyio
+async def test_logout_revokes_session(async_session: AsyncSession):
+    """
+    Test that logging out revokes the session and its refresh token.
+    """
+    user = await _create_active_user(async_session, "12345")
+
+    async with AsyncClient(transport=transport, base_url=BASE_URL) as client:
+        login = await client.post(
+            "/login", params={"email": user.email, "password": "12345"}
+        )
+        refresh_token = login.json()["refresh_token"]
+        access_payload = decode_token(login.json()["access_token"])
+
+        response = await client.post("/logout", json={"refresh_token": refresh_token})
+        refresh = await client.post(
+            "/token/refresh", json={"refresh_token": refresh_token}
+        )
+
+    revoked = access_payload["sid"] in revoked_sessions
+    revoked_sessions.clear()
+
+    assert response.status_code == 200
+    assert revoked
+    assert refresh.status_code == 401
+
+
+@pytest.mark.anyio
+async def test_login_access_token_authenticates(async_session: AsyncSession):
+    """
+    Test that the access token returned by login is accepted by protected routes.
+    """
+    user = await _create_active_user(async_session, "12345")
+
+    async with AsyncClient(transport=transport, base_url=BASE_URL) as client:
+        login = await client.post(
+            "/login", params={"email": user.email, "password": "12345"}
+        )
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+        response = await client.get("/me", headers=headers)
+
+    assert response.status_code == 200
+    assert response.json()["email"] == user.email
+
+
+@pytest.mark.anyio
+async def test_batch_activate_users(async_session: AsyncSession):
+    """
+    Test that an admin can activate several users in one request.
+    """
+    admin = await _create_active_user(async_session, "admin-pass")
+    admin.role = "admin"
+    await async_session.commit()
+    emails = [f"bulk_{uuid.uuid4().hex[:6]}@example.com" for _ in range(3)]
+    for email in emails:
+        await create_user(
+            async_session, UserCreate(email=email, password="12345", role="user")
+        )
+
+    async with AsyncClient(transport=transport, base_url=BASE_URL) as client:
+        login = await client.post(
+            "/login", params={"email": admin.email, "password": "admin-pass"}
+        )
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+        response = await client.post(
+            "/admin/users/activate",
+            json={"emails": emails + ["missing@example.com"]},
+            headers=headers,
+        )
+
+    assert response.status_code == 200
+    assert response.json() == {"requested": 4, "activated": 3}
+
+
+@pytest.mark.anyio
+async def test_login_rehashes_outdated_password(async_session: AsyncSession):
+    """
+    Test that logging in replaces a hash weaker than the configured policy.
+    """
+    user = await _create_active_user(async_session, "12345")
+    weak_hash = build_pwd_context(["bcrypt"], bcrypt_rounds=4).hash("12345")
+    user.hashed_password = weak_hash
+    await async_session.commit()
+
+    async with AsyncClient(transport=transport, base_url=BASE_URL) as client:
+        response = await client.post(
+            "/login", params={"email": user.email, "password": "12345"}
+        )
+
+    await async_session.refresh(user)
+    assert response.status_code == 200
+    assert user.hashed_password != weak_hash
+    assert not get_pwd_context().needs_update(user.hashed_password)
+
+
+def test_app_import_is_lazy():
+    """
+    Test that importing the app neither imports boto3 nor needs AWS, SMTP
+    or SECRET_KEY settings.
+    """
+    import os
+    import subprocess
+
+    env = {
+        key: value
+        for key, value in os.environ.items()
+        if not key.startswith(("AWS_", "EMAIL_", "SECRET_KEY"))
+    }
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, main; print('boto3' in sys.modules)",
+        ],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "False"
@@ -0,0 +1,67 @@
+from types import SimpleNamespace
+
+from catalog import CatalogSnapshot
+
+
+def build_snapshot():
+    """
+    Build a snapshot with a few films across two genres.
+    """
+    snapshot = CatalogSnapshot()
+    snapshot.load(
+        [
+            {"id": 3, "title": "C", "genre": "Drama", "price": 7.0},
+            {"id": 1, "title": "A", "genre": "Action", "price": 9.0},
+            {"id": 2, "title": "B", "genre": "Drama", "price": 5.0},
+            {"id": 4, "title": "D", "genre": "Action", "price": 5.0},
+        ]
+    )
+    return snapshot
+
+
+def ids(rows):
+    """
+    Return the IDs of a list of film rows.
+    """
+    return [row["id"] for row in rows]
+
+
+def test_query_filters_and_sorts():
+    """
+    Test genre filters, price ranges and price ordering.
+    """
+    snapshot = build_snapshot()
+
+    assert ids(snapshot.query()) == [1, 2, 3, 4]
+    assert ids(snapshot.query(genre="Drama")) == [2, 3]
+    assert ids(snapshot.query(min_price=5.0, max_price=7.0)) == [2, 3, 4]
+    assert ids(snapshot.query(sort="price")) == [2, 4, 3, 1]
+    assert ids(snapshot.query(sort="-price")) == [1, 3, 4, 2]
+    assert ids(snapshot.query(genre="Action", max_price=6.0)) == [4]
+    assert snapshot.query(genre="Horror") == []
+    assert snapshot.get(3) == {"id": 3, "title": "C", "genre": "Drama", "price": 7.0}
+    assert snapshot.get(99) is None
+
+
+def test_incremental_updates():
+    """
+    Test that applying film changes keeps every index consistent.
+    """
+    snapshot = build_snapshot()
+
+    snapshot.apply(
+        "update", SimpleNamespace(id=2, title="B2", genre="Action", price=10.0)
+    )
+    snapshot.apply(
+        "create", SimpleNamespace(id=5, title="E", genre="Comedy", price=1.0)
+    )
+    snapshot.apply("delete", SimpleNamespace(id=3))
+    snapshot.apply(
+        "update", SimpleNamespace(id=1, title="A", genre="Action", price=5.0)
+    )
+
+    assert len(snapshot) == 4
+    assert ids(snapshot.query(genre="Drama")) == []
+    assert ids(snapshot.query(genre="Action")) == [1, 2, 4]
+    assert ids(snapshot.query(sort="price")) == [5, 1, 4, 2]
+    assert snapshot.get(2)["title"] == "B2"
@@ -0,0 +1,147 @@
+import asyncio
+import json
+import pytest
+
+from types import SimpleNamespace
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from changes import ChangeFeed, ChangeFeedGap, OutboxTail, format_sse
+from crud import create_film, delete_film, update_film
+from models import OutboxEvent
+from schemas import FilmCreate
+from tests.db import database_engine
+
+
+def film(film_id):
+    """
+    Build a minimal film-like object.
+    """
+    return SimpleNamespace(
+        id=film_id, title=f"Film {film_id}", genre="Drama", price=1.5
+    )
+
+
+def test_events_are_sequenced_and_resumable():
+    """
+    Test that events get increasing sequence numbers and can be read from a position.
+    """
+    feed = ChangeFeed()
+    feed.publish("create", film(1))
+    feed.publish("update", film(1))
+    feed.publish("delete", film(1))
+
+    assert [event["seq"] for event in feed.since(0)] == [1, 2, 3]
+    assert [event["action"] for event in feed.since(1)] == ["update", "delete"]
+    assert feed.since(3) == []
+    assert feed.since(2)[0]["film"] is None
+
+
+def test_discarded_positions_raise_gap():
+    """
+    Test that resuming from an evicted or future position signals a resync.
+    """
+    feed = ChangeFeed(capacity=2)
+    for film_id in range(1, 5):
+        feed.publish("create", film(film_id))
+
+    assert [event["seq"] for event in feed.since(2)] == [3, 4]
+    with pytest.raises(ChangeFeedGap):
+        feed.since(1)
+    with pytest.raises(ChangeFeedGap):
+        feed.since(10)
+
+
+@pytest.mark.asyncio
+async def test_wait_returns_when_an_event_is_published():
+    """
+    Test that a waiting reader wakes up on publish and times out otherwise.
+    """
+    feed = ChangeFeed()
+    waiter = asyncio.create_task(feed.wait(0, timeout=5))
+    await asyncio.sleep(0)
+    feed.publish("create", film(7))
+
+    events = await waiter
+
+    assert [event["film_id"] for event in events] == [7]
+    assert await feed.wait(1, timeout=0.01) == []
+
+
+def test_format_sse():
+    """
+    Test the Server-Sent Events encoding of a change.
+    """
+    feed = ChangeFeed()
+    feed.publish("update", film(3))
+
+    message = format_sse(feed.since(0)[0])
+
+    lines = message.split("\n")
+    assert lines[0] == "id: 1"
+    assert lines[1] == "event: film.update"
+    assert json.loads(lines[2].removeprefix("data: "))["film_id"] == 3
+    assert message.endswith("\n\n")
+
+
+@pytest.mark.asyncio
+async def test_outbox_tail_shares_positions_across_workers():
+    """
+    Test that two workers following the outbox number the same film changes
+    alike, pass them to their listeners, and wait at a missing event ID.
+    """
+    async with database_engine() as engine:
+        factory = async_sessionmaker(engine, expire_on_commit=False)
+        async with factory() as db:
+            film = await create_film(
+                db, FilmCreate(title="Old", genre="Drama", price=2.0)
+            )
+        first_worker, second_worker = ChangeFeed(), ChangeFeed()
+        applied = []
+        first = OutboxTail(factory, first_worker, [], gap_timeout=60)
+        second = OutboxTail(
+            factory,
+            second_worker,
+            [lambda action, film: applied.append((action, film.id, film.title))],
+            gap_timeout=60,
+        )
+        await first.load()
+        await second.load()
+
+        async with factory() as db:
+            await update_film(
+                db, film.id, FilmCreate(title="New", genre="Drama", price=3.5)
+            )
+            db.add(OutboxEvent(event_type="user.created", payload="{}"))
+            await db.commit()
+            await delete_film(db, film.id)
+        assert await first.poll_once() == 2
+        assert await second.poll_once() == 2
+
+        # An ID that is not visible yet holds back the events after it.
+        async with factory() as db:
+            db.add(
+                OutboxEvent(
+                    id=second_worker.last_seq + 2,
+                    event_type="film.deleted",
+                    payload=json.dumps({"id": 99}),
+                )
+            )
+            await db.commit()
+        assert await second.poll_once() == 0
+        second.gap_timeout = 0
+        assert await second.poll_once() == 1
+
+    assert [event["seq"] for event in first_worker.since(0)] == [1, 2, 4]
+    assert [(event["seq"], event["film"]) for event in second_worker.since(0)[:3]] == [
+        (event["seq"], event["film"]) for event in first_worker.since(0)
+    ]
+    assert [event["action"] for event in first_worker.since(1)] == [
+        "update",
+        "delete",
+    ]
+    assert applied == [
+        ("update", film.id, "New"),
+        ("delete", film.id, None),
+        ("delete", 99, None),
+    ]
+    assert first_worker.since(1)[0]["film"]["price"] == 3.5
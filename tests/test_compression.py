@@ -0,0 +1,112 @@
+import gzip
+import pytest
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from httpx import AsyncClient, ASGITransport
+
+from compression import CompressionMiddleware, choose_encoding
+
+BASE_URL = "http://test"
+LARGE_BODY = "film " * 1000
+
+
+def build_app(**options):
+    """
+    Build a small app wrapped in the compression middleware.
+    """
+    app = FastAPI()
+
+    @app.get("/movies/")
+    async def catalog():
+        return PlainTextResponse(LARGE_BODY)
+
+    @app.get("/small")
+    async def small():
+        return PlainTextResponse("tiny")
+
+    @app.get("/stream")
+    async def stream():
+        return StreamingResponse(iter([b"data: 1\n\n"]), media_type="text/event-stream")
+
+    middleware = CompressionMiddleware(app, cache_paths=("/movies",), **options)
+    return middleware
+
+
+def test_choose_encoding_respects_quality_and_preference():
+    """
+    Test that the client's q-values win and ties follow server preference.
+    """
+    preferred = ["zstd", "br", "gzip"]
+
+    assert choose_encoding("gzip, br", preferred) == "br"
+    assert choose_encoding("br;q=0.5, gzip", preferred) == "gzip"
+    assert choose_encoding("identity", preferred) is None
+    assert choose_encoding("*;q=0.1", preferred) == "zstd"
+    assert choose_encoding("gzip;q=0", preferred) is None
+
+
+@pytest.mark.asyncio
+async def test_large_body_is_compressed_and_small_body_is_not():
+    """
+    Test the minimum size threshold.
+    """
+    app = build_app(encodings=["gzip"], minimum_size=100)
+    headers = {"Accept-Encoding": "gzip"}
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url=BASE_URL) as ac:
+        large = await ac.get("/movies/", headers=headers)
+        small = await ac.get("/small", headers=headers)
+
+    assert large.headers["content-encoding"] == "gzip"
+    assert large.text == LARGE_BODY
+    assert "accept-encoding" in large.headers["vary"].lower()
+    assert "content-encoding" not in small.headers
+
+
+@pytest.mark.asyncio
+async def test_catalog_responses_are_compressed_once():
+    """
+    Test that repeated catalog responses reuse the cached compressed bytes.
+    """
+    app = build_app(encodings=["gzip"])
+    headers = {"Accept-Encoding": "gzip"}
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url=BASE_URL) as ac:
+        first = await ac.get("/movies/", headers=headers)
+        second = await ac.get("/movies/", headers=headers)
+
+    assert first.headers["etag"] == second.headers["etag"]
+    assert (app.cache_misses, app.cache_hits) == (1, 1)
+    assert gzip.decompress(next(iter(app.cache.values()))).decode() == LARGE_BODY
+
+
+@pytest.mark.asyncio
+async def test_matching_etag_returns_not_modified():
+    """
+    Test that If-None-Match with the current ETag yields an empty 304.
+    """
+    app = build_app()
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url=BASE_URL) as ac:
+        first = await ac.get("/movies/")
+        second = await ac.get(
+            "/movies/", headers={"If-None-Match": first.headers["etag"]}
+        )
+
+    assert second.status_code == 304
+    assert second.content == b""
+
+
+@pytest.mark.asyncio
+async def test_event_streams_are_not_buffered():
+    """
+    Test that server-sent event streams pass through uncompressed.
+    """
+    app = build_app(minimum_size=1)
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url=BASE_URL) as ac:
+        response = await ac.get("/stream", headers={"Accept-Encoding": "gzip"})
+
+    assert "content-encoding" not in response.headers
+    assert response.text == "data: 1\n\n"
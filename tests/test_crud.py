@@ -2,19 +2,19 @@ import pytest
 import pytest_asyncio
 import bcrypt
 
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 from sqlalchemy import (
     Column,
     Integer,
     String,
-    Float,
     ForeignKey,
     DateTime,
     func,
     Boolean,
 )
 from datetime import datetime, timedelta
+from decimal import Decimal
 from pydantic import BaseModel
 
 from crud import (
@@ -27,7 +27,13 @@ from crud import (
     get_user_by_email,
     save_reset_token,
     get_user_by_reset_token,
+    bulk_create_users,
+    list_users,
+    reprice_films,
 )
+from schemas import UserImport
+from models import FilmTag, OutboxEvent, Tag, WatchEvent
+from tests.db import create_test_engine
 
 Base = declarative_base()
 
@@ -35,14 +41,14 @@ Base = declarative_base()
 class Film(Base):
     """
     SQLAlchemy model for the 'films' table.
-    Attributes: id, title, genre, price.
+    Attributes: id, title, genre, price_cents.
     """
 
     __tablename__ = "films"
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String)
     genre = Column(String)
-    price = Column(Float)
+    price_cents = Column(Integer)
 
 
 class User(Base):
@@ -116,22 +122,29 @@ def hash_password(password: str) -> str:
 @pytest_asyncio.fixture(scope="function")
 async def async_session():
     """
-    Creates a new in-memory SQLite async session for each test.
+    Creates a new async session on the test database for each test.
     Sets up and tears down database tables around tests.
     """
-    engine = create_async_engine(
-        "sqlite+aiosqlite:///:memory:", echo=False, future=True
-    )
+    engine = create_test_engine()
     async_session_maker = async_sessionmaker(engine, expire_on_commit=False)
 
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(OutboxEvent.__table__.create)
+        await conn.run_sync(Tag.__table__.create)
+        await conn.run_sync(FilmTag.__table__.create)
+        await conn.run_sync(WatchEvent.__table__.create)
 
     async with async_session_maker() as session:
         yield session
 
     async with engine.begin() as conn:
+        await conn.run_sync(WatchEvent.__table__.drop)
+        await conn.run_sync(FilmTag.__table__.drop)
+        await conn.run_sync(Tag.__table__.drop)
+        await conn.run_sync(OutboxEvent.__table__.drop)
         await conn.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
 
 
 @pytest.mark.asyncio
@@ -241,3 +254,91 @@ async def test_expired_reset_token(async_session: AsyncSession):
 
     result = await get_user_by_reset_token(async_session, "old-token")
     assert result is None
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_users(async_session: AsyncSession):
+    """
+    Test bulk user creation reports created, existing, duplicate and invalid rows,
+    and stores pre-hashed bcrypt values verbatim.
+    """
+    await create_user(
+        async_session,
+        UserCreate(email="existing@example.com", password="pass", role="user"),
+    )
+    prehashed = bcrypt.hashpw(b"legacy", bcrypt.gensalt(rounds=4)).decode()
+    rows = [
+        UserImport(email="new@example.com", password="newpass"),
+        UserImport(email="legacy@example.com", hashed_password=prehashed),
+        UserImport(email="existing@example.com", password="pass"),
+        UserImport(email="new@example.com", password="again"),
+        UserImport(email="bad@example.com", hashed_password="not-a-hash"),
+    ]
+
+    results = await bulk_create_users(async_session, rows)
+
+    assert [result["status"] for result in results] == [
+        "created",
+        "created",
+        "exists",
+        "duplicate",
+        "invalid",
+    ]
+    legacy = await get_user_by_email(async_session, "legacy@example.com")
+    assert legacy.hashed_password == prehashed
+    new = await get_user_by_email(async_session, "new@example.com")
+    assert bcrypt.checkpw(b"newpass", new.hashed_password.encode())
+
+
+@pytest.mark.asyncio
+async def test_list_users_keyset_pagination(async_session: AsyncSession):
+    """
+    Test paging through users by ID with role and email prefix filters,
+    and that password hashes are not part of the rows.
+    """
+    for index in range(5):
+        async_session.add(
+            User(
+                email=f"page{index}@example.com",
+                hashed_password="hash",
+                role="admin" if index % 2 else "user",
+            )
+        )
+    async_session.add(User(email="other@example.com", hashed_password="hash"))
+    await async_session.commit()
+
+    first = await list_users(async_session, limit=2, email_prefix="page")
+    second = await list_users(
+        async_session, after_id=first[-1]["id"], limit=2, email_prefix="page"
+    )
+    admins = await list_users(async_session, role="admin")
+
+    assert [row["email"] for row in first + second] == [
+        f"page{index}@example.com" for index in range(4)
+    ]
+    assert "hashed_password" not in first[0]
+    assert [row["email"] for row in admins] == [
+        "page1@example.com",
+        "page3@example.com",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_reprice_films(async_session: AsyncSession):
+    """
+    Test percentage and absolute repricing in cents with half-up rounding.
+    """
+    drama = await create_film(
+        async_session, FilmCreate(title="A", genre="Drama", price=9.99)
+    )
+    action = await create_film(
+        async_session, FilmCreate(title="B", genre="Action", price=0.5)
+    )
+
+    assert await reprice_films(async_session, percent=Decimal("-15"), genre="Drama")
+    assert await reprice_films(async_session, amount=Decimal("-1"), ids=[action.id])
+
+    films = {film.id: film for film in await get_films(async_session)}
+    # 999 * 0.85 = 849.15 cents -> 849
+    assert films[drama.id].price_cents == 849
+    assert films[action.id].price_cents == 0
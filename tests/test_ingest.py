@@ -0,0 +1,245 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import uuid
+from datetime import datetime
+
+import pytest
+
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from main import app
+from models import Film, User, WatchEvent
+from database import get_db
+from tests.db import database_engine
+from security import create_access_token
+from crud import delete_film
+from ingest import BufferFull, WatchEventBuffer
+import ingest
+
+transport = ASGITransport(app=app)
+BASE_URL = "http://test"
+
+
+@pytest.fixture
+def anyio_backend():
+    """
+    Run the async tests in this module on asyncio only.
+    """
+    return "asyncio"
+
+
+@pytest.fixture
+async def session_factory():
+    """
+    Create a test database with a user and ten films, and return a
+    session factory for it.
+    """
+    async with database_engine() as engine:
+        factory = async_sessionmaker(engine, expire_on_commit=False)
+        async with factory() as db:
+            db.add(User(email="viewer@example.com", hashed_password="x"))
+            db.add_all(
+                [Film(title=f"Film {i}", genre="Drama", price=1.0) for i in range(10)]
+            )
+            await db.commit()
+        yield factory
+
+
+def _events(count: int) -> list[dict]:
+    return [
+        {
+            "user_id": 1,
+            "film_id": index + 1,
+            "position_seconds": index * 10,
+            "watched_at": datetime(2026, 1, 1, 12, 0, index),
+        }
+        for index in range(count)
+    ]
+
+
+async def _count(session_factory) -> int:
+    async with session_factory() as db:
+        return await db.scalar(select(func.count(WatchEvent.id)))
+
+
+@pytest.mark.anyio
+async def test_buffer_flushes_in_batches(session_factory):
+    """
+    Test that queued events are inserted in batches of at most batch_size.
+    """
+    buffer = WatchEventBuffer(session_factory, batch_size=3, flush_interval=0.05)
+    buffer.start()
+    assert await buffer.offer(_events(7)) == (7, 0)
+    for _ in range(100):
+        if buffer.flushed == 7:
+            break
+        await asyncio.sleep(0.01)
+    await buffer.stop()
+
+    assert await _count(session_factory) == 7
+    assert buffer.batches == 3
+
+
+@pytest.mark.anyio
+async def test_flush_drops_events_for_missing_films(session_factory):
+    """
+    Test that events violating a foreign key are dropped, not the whole batch.
+    """
+    buffer = WatchEventBuffer(session_factory)
+    events = _events(3)
+    events[1]["film_id"] = 999
+
+    await buffer.flush(events)
+
+    assert await _count(session_factory) == 2
+    assert (buffer.flushed, buffer.dropped) == (2, 1)
+
+
+@pytest.mark.anyio
+async def test_failing_batch_is_dropped_after_max_attempts(session_factory):
+    """
+    Test that a batch the database keeps rejecting is dropped after
+    max_attempts inserts, so the events after it are still written.
+    """
+    buffer = WatchEventBuffer(
+        session_factory, batch_size=1, flush_interval=0.01, max_attempts=3
+    )
+    bad = _events(1)
+    bad[0]["position_seconds"] = 2**63
+    buffer.start()
+    await buffer.offer(bad + _events(2))
+    for _ in range(200):
+        if buffer.flushed == 2:
+            break
+        await asyncio.sleep(0.01)
+    await buffer.stop()
+
+    assert await _count(session_factory) == 2
+    assert (buffer.flushed, buffer.failed) == (2, 1)
+
+
+@pytest.mark.anyio
+async def test_watched_film_can_be_deleted(session_factory):
+    """
+    Test that deleting a film removes its watch events instead of failing on
+    the foreign key.
+    """
+    await WatchEventBuffer(session_factory).flush(_events(2))
+
+    async with session_factory() as db:
+        assert await delete_film(db, 1) is not None
+
+    assert await _count(session_factory) == 1
+
+
+@pytest.mark.anyio
+async def test_full_buffer_spills_and_replays(session_factory, tmp_path):
+    """
+    Test that overflow goes to the spill file and is inserted on replay.
+    """
+    buffer = WatchEventBuffer(
+        session_factory, capacity=2, spill_path=str(tmp_path / "watch")
+    )
+    assert await buffer.offer(_events(5)) == (2, 3)
+    assert len(list(tmp_path.iterdir())) == 1
+
+    assert await buffer.replay_spill() == 3
+    await buffer.stop()
+
+    assert await _count(session_factory) == 5
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.anyio
+async def test_replay_reclaims_files_of_dead_replayers(session_factory, tmp_path):
+    """
+    Test that a spill file claimed by a process that died while replaying it
+    is claimed and replayed again, while a live process's claim is left.
+    """
+    dead = subprocess.Popen([sys.executable, "-c", ""])
+    dead.wait()
+    spill_path = str(tmp_path / "watch")
+    ingest._append_synced(
+        f"{spill_path}.{dead.pid}.jsonl.{dead.pid}.replaying",
+        "".join(json.dumps(event, default=str) + "\n" for event in _events(2)),
+    )
+    live = tmp_path / f"watch.{dead.pid}.jsonl.{os.getppid()}.replaying"
+    live.write_text("")
+    buffer = WatchEventBuffer(session_factory, spill_path=spill_path)
+
+    assert await buffer.replay_spill() == 2
+    assert await _count(session_factory) == 2
+    assert list(tmp_path.iterdir()) == [live]
+
+
+@pytest.mark.anyio
+async def test_full_buffer_without_spill_rejects_whole_batch(session_factory):
+    """
+    Test that a batch that does not fit is rejected without queueing any of it.
+    """
+    buffer = WatchEventBuffer(session_factory, capacity=4)
+    await buffer.offer(_events(3))
+
+    with pytest.raises(BufferFull):
+        await buffer.offer(_events(2))
+    assert buffer.queue.qsize() == 3
+
+
+@pytest.mark.anyio
+async def test_watch_events_endpoint(session_factory, monkeypatch):
+    """
+    Test that the endpoint buffers events for the current user.
+    """
+    async with session_factory() as session:
+        email = f"viewer_{uuid.uuid4().hex[:6]}@example.com"
+        user = User(email=email, hashed_password="x", is_active=True)
+        session.add(user)
+        await session.commit()
+
+        async def override_get_db():
+            yield session
+
+        app.dependency_overrides[get_db] = override_get_db
+        buffer = WatchEventBuffer(session_factory)
+        monkeypatch.setattr(ingest, "buffer", buffer)
+        headers = {"Authorization": f"Bearer {create_access_token({'sub': email})}"}
+        try:
+            async with AsyncClient(transport=transport, base_url=BASE_URL) as client:
+                response = await client.post(
+                    "/watch/events",
+                    json={
+                        "events": [
+                            {"film_id": 1, "position_seconds": 30},
+                            {
+                                "film_id": 2,
+                                "position_seconds": 5,
+                                "watched_at": "2026-01-01T12:00:00+02:00",
+                            },
+                        ]
+                    },
+                    headers=headers,
+                )
+                out_of_range = await client.post(
+                    "/watch/events",
+                    json={"events": [{"film_id": 2**63, "position_seconds": 0}]},
+                    headers=headers,
+                )
+        finally:
+            app.dependency_overrides.clear()
+        await buffer.stop()
+
+        rows = (
+            (await session.execute(select(WatchEvent).order_by(WatchEvent.id)))
+            .scalars()
+            .all()
+        )
+
+    assert response.status_code == 202
+    assert response.json() == {"accepted": 2, "spilled": 0}
+    assert out_of_range.status_code == 422
+    assert {row.user_id for row in rows} == {user.id}
+    assert rows[1].watched_at == datetime(2026, 1, 1, 10, 0, 0)
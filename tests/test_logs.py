@@ -0,0 +1,69 @@
+import io
+import json
+import logging
+import queue
+
+from logs import DebugSampler, LogPipeline, NonBlockingQueueHandler, parse_levels
+
+
+def test_pipeline_writes_json_lines():
+    """
+    Test that records are written as JSON by the listener thread, with extra
+    fields, the exception and per-logger levels applied.
+    """
+    stream = io.StringIO()
+    pipeline = LogPipeline(levels={"test.quiet": "WARNING"}, stream=stream)
+    pipeline.start()
+    try:
+        logger = logging.getLogger("test.logs")
+        logger.info("served %s", "/movies", extra={"http_status": 200})
+        logging.getLogger("test.quiet").info("hidden")
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logger.exception("failed")
+    finally:
+        pipeline.stop()
+
+    entries = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [entry["message"] for entry in entries] == ["served /movies", "failed"]
+    assert entries[0]["logger"] == "test.logs"
+    assert entries[0]["level"] == "INFO"
+    assert entries[0]["http_status"] == 200
+    assert "ValueError: boom" in entries[1]["exception"]
+    assert logging.getLogger("test.quiet").level == logging.NOTSET
+
+
+def test_full_queue_drops_records():
+    """
+    Test that logging to a full queue drops the record instead of blocking.
+    """
+    handler = NonBlockingQueueHandler(queue.Queue(1))
+    logger = logging.getLogger("test.full")
+    logger.addHandler(handler)
+    logger.propagate = False
+    try:
+        logger.warning("first")
+        logger.warning("second")
+    finally:
+        logger.removeHandler(handler)
+        logger.propagate = True
+
+    assert handler.queue.qsize() == 1
+    assert handler.dropped == 1
+
+
+def test_debug_sampling_and_levels():
+    """
+    Test that sampling only drops DEBUG records and that levels are parsed.
+    """
+    sampler = DebugSampler(0.0)
+    debug = logging.LogRecord("test", logging.DEBUG, "", 0, "", None, None)
+    info = logging.LogRecord("test", logging.INFO, "", 0, "", None, None)
+
+    assert not sampler.filter(debug)
+    assert sampler.filter(info)
+    assert parse_levels(" sqlalchemy.engine=info, tags=DEBUG,") == {
+        "sqlalchemy.engine": "INFO",
+        "tags": "DEBUG",
+    }
@@ -0,0 +1,21 @@
+from decimal import ROUND_CEILING, Decimal
+
+from money import from_cents, to_cents
+
+
+def test_to_cents_is_exact_for_float_input():
+    """
+    Test that float prices convert to the cents they were written as.
+    """
+    assert to_cents(9.99) == 999
+    assert to_cents(0.29) == 29
+    assert to_cents(Decimal("1.005")) == 101
+    assert to_cents("2.001", rounding=ROUND_CEILING) == 201
+
+
+def test_sums_in_cents_do_not_drift():
+    """
+    Test that summing many prices in cents gives the exact total.
+    """
+    total = sum(to_cents(0.1) for _ in range(1000))
+    assert from_cents(total) == Decimal("100.00")
@@ -0,0 +1,183 @@
+import pytest
+
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+from main import app
+from models import Film
+from database import get_db
+from tests.db import database_engine
+from settings import get_settings
+from schemas import film_projection
+from catalog import CatalogSnapshot
+from crud import get_film_rows
+import catalog
+import changes
+import crud
+from changes import ChangeFeed
+
+transport = ASGITransport(app=app)
+BASE_URL = "http://test"
+
+
+@pytest.fixture
+def anyio_backend():
+    """
+    Run the async tests in this module on asyncio only.
+    """
+    return "asyncio"
+
+
+@pytest.fixture
+async def async_session() -> AsyncSession:
+    """
+    Set up an async test database session with overridden FastAPI dependency.
+    """
+    async with database_engine() as engine:
+        async_session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+        async with async_session_factory() as session:
+
+            async def override_get_db():
+                yield session
+
+            app.dependency_overrides[get_db] = override_get_db
+
+            yield session
+
+    app.dependency_overrides.clear()
+
+
+async def _add_films(session: AsyncSession, count: int):
+    """
+    Insert ``count`` films and return them.
+    """
+    films = [
+        Film(title=f"Film {i}", genre="Drama" if i % 2 else "Action", price=i + 0.5)
+        for i in range(count)
+    ]
+    session.add_all(films)
+    await session.commit()
+    return films
+
+
+@pytest.mark.anyio
+async def test_list_films_fast_json_matches_default(
+    async_session: AsyncSession, monkeypatch
+):
+    """
+    Test that the FAST_JSON list path returns the same payload as the default path.
+    """
+    await _add_films(async_session, 3)
+
+    async with AsyncClient(transport=transport, base_url=BASE_URL) as client:
+        default = await client.get("/movies/")
+        monkeypatch.setattr(get_settings(), "FAST_JSON", True)
+        fast = await client.get("/movies/")
+
+    assert default.status_code == fast.status_code == 200
+    assert fast.json() == default.json()
+    assert len(fast.json()) == 3
+
+
+@pytest.mark.anyio
+async def test_read_films_batch_preserves_order(async_session: AsyncSession):
+    """
+    Test that a batch lookup returns films in request order and reports missing IDs.
+    """
+    films = await _add_films(async_session, 3)
+    ids = [films[2].id, 999, films[0].id, films[2].id]
+
+    async with AsyncClient(transport=transport, base_url=BASE_URL) as client:
+        response = await client.get("/movies/batch", params={"ids": ids})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert [film["id"] for film in data["films"]] == [films[2].id, films[0].id]
+    assert data["missing"] == [999]
+
+
+@pytest.mark.anyio
+async def test_read_films_batch_limits_ids(async_session: AsyncSession):
+    """
+    Test that a batch lookup rejects requests over the ID limit and IDs
+    outside the integer column range.
+    """
+    async with AsyncClient(transport=transport, base_url=BASE_URL) as client:
+        response = await client.get(
+            "/movies/batch", params={"ids": list(range(1, 502))}
+        )
+        out_of_range = await client.get("/movies/batch", params={"ids": [1, 2**63]})
+
+    assert response.status_code == 422
+    assert out_of_range.status_code == 422
+
+
+@pytest.mark.anyio
+async def test_list_films_sparse_fields(async_session: AsyncSession):
+    """
+    Test that ``fields`` trims each film to the requested fields plus the ID.
+    """
+    await _add_films(async_session, 2)
+
+    async with AsyncClient(transport=transport, base_url=BASE_URL) as client:
+        response = await client.get("/movies/", params={"fields": "title"})
+        invalid = await client.get("/movies/", params={"fields": "title,secret"})
+
+    assert response.status_code == 200
+    assert [set(film) for film in response.json()] == [{"id", "title"}] * 2
+    assert invalid.status_code == 400
+
+
+def test_film_projection_is_cached():
+    """
+    Test that projected film schemas are built once per field set.
+    """
+    assert film_projection(("title", "id")) is film_projection(("title", "id"))
+
+
+@pytest.mark.anyio
+async def test_list_films_filters_match_catalog_snapshot(
+    async_session: AsyncSession, monkeypatch
+):
+    """
+    Test that filtered lists are the same from SQLite and from the catalog snapshot.
+    """
+    await _add_films(async_session, 6)
+    params = {"genre": "Drama", "min_price": 2, "sort": "-price"}
+
+    async with AsyncClient(transport=transport, base_url=BASE_URL) as client:
+        from_db = await client.get("/movies/", params=params)
+        snapshot = CatalogSnapshot()
+        snapshot.load(await get_film_rows(async_session))
+        monkeypatch.setattr(catalog, "snapshot", snapshot)
+        from_snapshot = await client.get("/movies/", params=params)
+
+    assert [film["id"] for film in from_db.json()] == [6, 4]
+    assert from_snapshot.json() == from_db.json()
+
+
+@pytest.mark.anyio
+async def test_film_changes_long_poll(async_session: AsyncSession, monkeypatch):
+    """
+    Test that film writes reach the change feed through the outbox and
+    resume by sequence.
+    """
+    feed = ChangeFeed()
+    tail = changes.OutboxTail(async_sessionmaker(async_session.bind), feed, [])
+    await tail.load()
+    monkeypatch.setattr(changes, "feed", feed)
+    monkeypatch.setattr(crud, "film_listeners", [])
+
+    async with AsyncClient(transport=transport, base_url=BASE_URL) as client:
+        created = await client.post(
+            "/movies/", json={"title": "New", "genre": "Drama", "price": 3.0}
+        )
+        await tail.poll_once()
+        first = await client.get("/movies/changes", params={"since": 0})
+        empty = await client.get("/movies/changes", params={"since": 1, "timeout": 0})
+        expired = await client.get("/movies/changes", params={"since": 5})
+
+    assert first.json()["last_seq"] == 1
+    assert first.json()["events"][0]["film_id"] == created.json()["id"]
+    assert empty.json() == {"events": [], "last_seq": 1}
+    assert expired.status_code == 410
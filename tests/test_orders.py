@@ -0,0 +1,207 @@
+import uuid
+
+import pytest
+
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+from main import app
+from models import Film, OrderItem, User
+from database import get_db
+from tests.db import database_engine
+from security import create_access_token
+from ownership import OwnershipCache
+import ownership
+
+transport = ASGITransport(app=app)
+BASE_URL = "http://test"
+
+
+@pytest.fixture
+def anyio_backend():
+    """
+    Run the async tests in this module on asyncio only.
+    """
+    return "asyncio"
+
+
+@pytest.fixture
+async def async_session() -> AsyncSession:
+    """
+    Set up an async test database session with overridden FastAPI dependency.
+    """
+    async with database_engine() as engine:
+        async_session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+        async with async_session_factory() as session:
+
+            async def override_get_db():
+                yield session
+
+            app.dependency_overrides[get_db] = override_get_db
+
+            yield session
+
+    app.dependency_overrides.clear()
+    ownership.cache.clear()
+
+
+async def _buyer(session: AsyncSession):
+    """
+    Create an active user and return auth headers for them.
+    """
+    email = f"buyer_{uuid.uuid4().hex[:6]}@example.com"
+    session.add(User(email=email, hashed_password="x", is_active=True))
+    await session.commit()
+    token = create_access_token({"sub": email})
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def _add_films(session: AsyncSession, count: int):
+    """
+    Insert ``count`` films and return their IDs.
+    """
+    films = [
+        Film(title=f"Film {i}", genre="Drama", price=i + 1.5) for i in range(count)
+    ]
+    session.add_all(films)
+    await session.commit()
+    return [film.id for film in films]
+
+
+@pytest.mark.anyio
+async def test_checkout_creates_order_and_grants_ownership(
+    async_session: AsyncSession,
+):
+    """
+    Test that checkout records the order, its items and film ownership.
+    """
+    headers = await _buyer(async_session)
+    film_ids = await _add_films(async_session, 3)
+
+    async with AsyncClient(transport=transport, base_url=BASE_URL) as client:
+        response = await client.post(
+            "/orders/checkout", json={"film_ids": film_ids[:2]}, headers=headers
+        )
+        order = await client.get(f"/orders/{response.json()['id']}", headers=headers)
+        owned = await client.get(f"/users/me/films/{film_ids[0]}", headers=headers)
+        not_owned = await client.get(f"/users/me/films/{film_ids[2]}", headers=headers)
+
+    assert response.status_code == 201
+    body = response.json()
+    assert body["total"] == 4.0
+    assert [item["film_id"] for item in body["items"]] == film_ids[:2]
+    assert order.json() == body
+    assert owned.json() == {"film_id": film_ids[0], "owned": True}
+    assert not_owned.json() == {"film_id": film_ids[2], "owned": False}
+
+
+@pytest.mark.anyio
+async def test_checkout_retry_with_idempotency_key_is_free(
+    async_session: AsyncSession,
+):
+    """
+    Test that repeating a checkout with the same key returns the first order.
+    """
+    headers = await _buyer(async_session)
+    film_ids = await _add_films(async_session, 2)
+    retry_headers = {**headers, "Idempotency-Key": "attempt-1"}
+
+    async with AsyncClient(transport=transport, base_url=BASE_URL) as client:
+        first = await client.post(
+            "/orders/checkout", json={"film_ids": film_ids}, headers=retry_headers
+        )
+        second = await client.post(
+            "/orders/checkout", json={"film_ids": film_ids}, headers=retry_headers
+        )
+        again = await client.post(
+            "/orders/checkout", json={"film_ids": film_ids}, headers=headers
+        )
+
+    item_count = await async_session.scalar(select(func.count(OrderItem.id)))
+    assert first.status_code == 201
+    assert second.status_code == 200
+    assert second.json() == first.json()
+    assert again.status_code == 409
+    assert item_count == 2
+
+
+@pytest.mark.anyio
+async def test_checkout_unknown_film(async_session: AsyncSession):
+    """
+    Test that checkout fails without side effects when a film does not exist.
+    """
+    headers = await _buyer(async_session)
+    film_ids = await _add_films(async_session, 1)
+
+    async with AsyncClient(transport=transport, base_url=BASE_URL) as client:
+        response = await client.post(
+            "/orders/checkout", json={"film_ids": [film_ids[0], 999]}, headers=headers
+        )
+        owned = await client.get(f"/users/me/films/{film_ids[0]}", headers=headers)
+
+    assert response.status_code == 404
+    assert response.json()["detail"]["ids"] == [999]
+    assert owned.json()["owned"] is False
+
+
+@pytest.mark.anyio
+async def test_ownership_cache_confirms_misses(async_session: AsyncSession):
+    """
+    Test that a cache miss is confirmed against the database and then cached.
+    """
+    headers = await _buyer(async_session)
+    film_ids = await _add_films(async_session, 2)
+    cache = OwnershipCache()
+    user_id = await async_session.scalar(select(User.id))
+
+    assert await cache.owns(async_session, user_id, film_ids[0]) is False
+
+    async with AsyncClient(transport=transport, base_url=BASE_URL) as client:
+        await client.post(
+            "/orders/checkout", json={"film_ids": film_ids[:1]}, headers=headers
+        )
+
+    # Bought through another cache, as if in another worker.
+    assert await cache.owns(async_session, user_id, film_ids[0]) is True
+    hits = cache.hits
+    assert await cache.owns(async_session, user_id, film_ids[0]) is True
+    assert cache.hits == hits + 1
+    assert await cache.owns(async_session, user_id, -1) is False
+    assert await cache.owns(async_session, user_id, 2**31 - 1) is False
+
+    async with AsyncClient(transport=transport, base_url=BASE_URL) as client:
+        negative = await client.get("/users/me/films/-1", headers=headers)
+        too_large = await client.get(f"/users/me/films/{2**63}", headers=headers)
+        checkout = await client.post(
+            "/orders/checkout", json={"film_ids": [2**63]}, headers=headers
+        )
+
+    assert negative.status_code == 422
+    assert too_large.status_code == 422
+    assert checkout.status_code == 422
+
+
+@pytest.mark.anyio
+async def test_delete_purchased_film_conflicts(async_session: AsyncSession):
+    """
+    Test that a purchased film cannot be deleted, as foreign keys are enforced.
+    """
+    headers = await _buyer(async_session)
+    film_ids = await _add_films(async_session, 1)
+    email = f"admin_{uuid.uuid4().hex[:6]}@example.com"
+    async_session.add(
+        User(email=email, hashed_password="x", role="admin", is_active=True)
+    )
+    await async_session.commit()
+    admin_headers = {"Authorization": f"Bearer {create_access_token({'sub': email})}"}
+
+    async with AsyncClient(transport=transport, base_url=BASE_URL) as client:
+        await client.post(
+            "/orders/checkout", json={"film_ids": film_ids}, headers=headers
+        )
+        response = await client.delete(f"/movies/{film_ids[0]}", headers=admin_headers)
+        film = await client.get(f"/movies/{film_ids[0]}")
+
+    assert response.status_code == 409
+    assert film.status_code == 200
@@ -0,0 +1,124 @@
+import json
+import pytest
+import pytest_asyncio
+
+from datetime import datetime
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+import outbox
+from crud import create_film, update_film
+from models import OutboxEvent
+from outbox import InProcessSink, JsonlFileSink, OutboxRelay
+from schemas import FilmCreate, FilmUpdate
+from tests.db import database_engine
+
+
+@pytest_asyncio.fixture
+async def session_factory():
+    """
+    Create a test database with the application schema.
+    """
+    async with database_engine() as engine:
+        yield async_sessionmaker(engine, expire_on_commit=False)
+
+
+class FailingSink:
+    """
+    Sink that always rejects the batch.
+    """
+
+    async def send(self, events):
+        raise RuntimeError("sink unavailable")
+
+
+@pytest.mark.asyncio
+async def test_mutations_write_outbox_events(session_factory):
+    """
+    Test that film writes record outbox events in the same transaction.
+    """
+    async with session_factory() as db:
+        film = await create_film(
+            db, FilmCreate(title="Dune", genre="Sci-Fi", price=4.0)
+        )
+        await update_film(
+            db, film.id, FilmUpdate(title="Dune", genre="Sci-Fi", price=5.0)
+        )
+        events = (await db.execute(select(OutboxEvent))).scalars().all()
+
+    assert [event.event_type for event in events] == ["film.created", "film.updated"]
+    assert json.loads(events[1].payload)["price"] == 5.0
+    assert all(event.aggregate_id == film.id for event in events)
+
+
+@pytest.mark.asyncio
+async def test_relay_delivers_batches_and_marks_processed(
+    session_factory, tmp_path, monkeypatch
+):
+    """
+    Test that the relay sends pending events to every sink exactly once.
+    """
+    received = []
+    monkeypatch.setattr(outbox, "subscribers", [received.extend])
+    path = tmp_path / "events.jsonl"
+    relay = OutboxRelay(
+        session_factory, [InProcessSink(), JsonlFileSink(str(path))], batch_size=2
+    )
+    async with session_factory() as db:
+        for index in range(3):
+            await create_film(
+                db, FilmCreate(title=f"Film {index}", genre="Drama", price=1.0)
+            )
+
+    assert await relay.drain_once() == 2
+    assert await relay.drain_once() == 1
+    assert await relay.drain_once() == 0
+    assert [event["type"] for event in received] == ["film.created"] * 3
+    assert len(path.read_text().splitlines()) == 3
+
+
+@pytest.mark.asyncio
+async def test_failed_delivery_is_retried(session_factory):
+    """
+    Test that events stay pending when a sink fails.
+    """
+    async with session_factory() as db:
+        await create_film(db, FilmCreate(title="Film", genre="Drama", price=1.0))
+
+    with pytest.raises(RuntimeError):
+        await OutboxRelay(session_factory, [FailingSink()]).drain_once()
+
+    assert await OutboxRelay(session_factory, [InProcessSink()]).drain_once() == 1
+
+
+@pytest.mark.asyncio
+async def test_relays_claim_disjoint_batches(session_factory):
+    """
+    Test that relays in several workers never deliver the same event, and
+    that a crashed relay's batch is delivered after its lease ends.
+    """
+    async with session_factory() as db:
+        for index in range(5):
+            await create_film(
+                db, FilmCreate(title=f"Film {index}", genre="Drama", price=1.0)
+            )
+
+    first, second = OutboxRelay(session_factory, [], batch_size=2), OutboxRelay(
+        session_factory, [], batch_size=2
+    )
+    crashed = await first._claim()
+    assert [row.id for row in crashed] == [1, 2]
+    assert await second.drain_once() == 2
+    assert await second.drain_once() == 1
+    assert await second.drain_once() == 0
+
+    async with session_factory() as db:
+        await db.execute(update(OutboxEvent).values(claimed_until=datetime(2000, 1, 1)))
+        await db.commit()
+    assert await second.drain_once() == 2
+    async with session_factory() as db:
+        pending = await db.scalar(
+            select(func.count()).where(OutboxEvent.processed_at.is_(None))
+        )
+    assert pending == 0
@@ -0,0 +1,187 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from main import app
+from models import Film, FilmStats
+from database import get_db
+from tests.db import database_engine
+from popularity import PopularityCounters
+import popularity
+
+transport = ASGITransport(app=app)
+BASE_URL = "http://test"
+
+
+@pytest.fixture
+def anyio_backend():
+    """
+    Run the async tests in this module on asyncio only.
+    """
+    return "asyncio"
+
+
+@pytest.fixture
+async def session_factory():
+    """
+    Create a test database with three films and return a session factory.
+    """
+    async with database_engine() as engine:
+        factory = async_sessionmaker(engine, expire_on_commit=False)
+        async with factory() as db:
+            db.add_all(
+                [Film(title=f"Film {i}", genre="Drama", price=1.0) for i in range(3)]
+            )
+            await db.commit()
+        yield factory
+
+
+@pytest.mark.anyio
+async def test_flush_accumulates_counts_and_ranks(session_factory):
+    """
+    Test that flushes add deltas to film_stats and rank films by score.
+    """
+    counters = PopularityCounters(session_factory)
+    for _ in range(5):
+        counters.record_view(1)
+    counters.record_view(2)
+    assert await counters.flush() == 2
+
+    counters.record_purchase([2])
+    counters.record_view(1)
+    assert await counters.flush() == 2
+    assert await counters.flush() == 0
+
+    async with session_factory() as db:
+        stats = {
+            row.film_id: row for row in (await db.scalars(select(FilmStats))).all()
+        }
+    assert (stats[1].view_count, stats[1].purchase_count) == (6, 0)
+    assert (stats[2].view_count, stats[2].purchase_count) == (1, 1)
+    # A purchase outweighs several views.
+    assert [film_id for film_id, _ in counters.trending(10)] == [2, 1]
+
+    reloaded = PopularityCounters(session_factory)
+    await reloaded.refresh()
+    assert reloaded.trending(1)[0][0] == 2
+
+
+@pytest.mark.anyio
+async def test_flush_drops_counts_for_deleted_films(session_factory):
+    """
+    Test that hits on a deleted film are dropped instead of failing every
+    later flush, and that deleting a film discards its unflushed hits.
+    """
+    counters = PopularityCounters(session_factory)
+    counters.record_view(1)
+    counters.record_view(999)
+
+    assert await counters.flush() == 1
+    assert counters.dropped == 1
+    assert not counters._views
+
+    counters.record_purchase([2])
+    counters.apply("delete", Film(id=2))
+    assert not counters._purchases
+
+
+def test_score_halves_per_half_life():
+    """
+    Test that a hit one half-life later weighs twice as much.
+    """
+    counters = PopularityCounters(None, half_life=timedelta(hours=6))
+    now = datetime(2026, 6, 1)
+    assert counters.growth(now + timedelta(hours=6)) == pytest.approx(
+        2 * counters.growth(now)
+    )
+
+
+def _freeze(monkeypatch, now: datetime):
+    class FrozenDatetime(datetime):
+        @classmethod
+        def utcnow(cls):
+            return now
+
+    monkeypatch.setattr(popularity, "datetime", FrozenDatetime)
+
+
+def test_growth_stays_finite_far_from_epoch():
+    """
+    Test that the hit factor stays bounded decades after the score epoch.
+    """
+    counters = PopularityCounters(None, half_life=timedelta(hours=6))
+    for at in (datetime(2026, 1, 1), datetime(2028, 10, 25), datetime(2100, 1, 1)):
+        assert 1.0 <= counters.growth(at) < 2.0**popularity.EPOCH_HALF_LIVES
+
+
+@pytest.mark.anyio
+async def test_flush_rescales_scores_in_a_new_epoch(session_factory, monkeypatch):
+    """
+    Test that scores written in an earlier epoch are scaled into the current
+    one, so old hits keep their decayed weight relative to new ones.
+    """
+    half_life = timedelta(hours=6)
+    start = datetime(2026, 1, 1) + half_life * 62
+    _freeze(monkeypatch, start)
+    counters = PopularityCounters(session_factory, half_life=half_life)
+    for _ in range(8):
+        counters.record_view(1)
+    await counters.flush()
+
+    # Two half-lives later, in the next epoch, the eight views weigh two.
+    now = start + half_life * 2
+    _freeze(monkeypatch, now)
+    counters.record_view(2)
+    await counters.flush()
+
+    async with session_factory() as db:
+        epochs = dict(
+            (await db.execute(select(FilmStats.film_id, FilmStats.epoch))).all()
+        )
+    assert epochs == {1: 1, 2: 1}
+    trending = counters.trending(10)
+    assert [film_id for film_id, _ in trending] == [1, 2]
+    assert trending[0][1] == pytest.approx(2.0)
+    assert trending[1][1] == pytest.approx(1.0)
+
+    # Decades later, flushing and ranking still work.
+    _freeze(monkeypatch, datetime(2100, 1, 1))
+    counters.record_view(2)
+    await counters.flush()
+    assert counters.trending(1)[0] == (2, pytest.approx(1.0))
+
+
+@pytest.mark.anyio
+async def test_trending_endpoint(session_factory, monkeypatch):
+    """
+    Test that the trending endpoint returns film details in score order.
+    """
+    counters = PopularityCounters(session_factory)
+    counters.record_view(3)
+    counters.record_view(3)
+    counters.record_view(1)
+    await counters.flush()
+    monkeypatch.setattr(popularity, "counters", counters)
+
+    async with session_factory() as session:
+
+        async def override_get_db():
+            yield session
+
+        app.dependency_overrides[get_db] = override_get_db
+        try:
+            async with AsyncClient(transport=transport, base_url=BASE_URL) as client:
+                response = await client.get("/movies/trending", params={"limit": 5})
+                await client.get("/movies/2")
+        finally:
+            app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [film["id"] for film in body] == [3, 1]
+    assert body[0]["title"] == "Film 2"
+    assert body[0]["score"] == pytest.approx(2.0)
+    assert counters._views == {2: 1}
@@ -0,0 +1,148 @@
+import cProfile
+import uuid
+
+import pytest
+
+from fastapi import FastAPI
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from main import app
+from models import User
+from database import get_db
+from security import create_access_token
+from tests.db import database_engine
+from profiling import ProfileStore, ProfilingMiddleware
+import profiling
+
+BASE_URL = "http://test"
+
+
+@pytest.fixture
+def anyio_backend():
+    """
+    Run the async tests in this module on asyncio only.
+    """
+    return "asyncio"
+
+
+def _profiler() -> cProfile.Profile:
+    profiler = cProfile.Profile()
+    profiler.enable()
+    sum(range(1000))
+    profiler.disable()
+    return profiler
+
+
+def _echo_app() -> FastAPI:
+    echo = FastAPI()
+
+    @echo.get("/echo")
+    async def read_echo():
+        return {"ok": True}
+
+    return echo
+
+
+def test_store_keeps_newest_profiles(tmp_path):
+    """
+    Test that the store lists profiles newest first and prunes the oldest.
+    """
+    store = ProfileStore(str(tmp_path), capacity=2)
+    ids = [f"{index}-1" for index in range(1, 4)]
+    for profile_id in ids:
+        store.save(profile_id, _profiler(), {"path": "/movies/"})
+
+    assert [entry["id"] for entry in store.entries()] == ["3-1", "2-1"]
+    assert store.path("1-1") is None
+    assert store.path("../../etc/passwd") is None
+    assert "cumulative" in store.summary("3-1")
+
+
+@pytest.mark.anyio
+async def test_middleware_profiles_on_header_token(tmp_path):
+    """
+    Test that only requests with the right token are profiled.
+    """
+    store = ProfileStore(str(tmp_path))
+    wrapped = ProfilingMiddleware(_echo_app(), store, token="secret")
+
+    async with AsyncClient(
+        transport=ASGITransport(app=wrapped), base_url=BASE_URL
+    ) as client:
+        plain = await client.get("/echo")
+        wrong = await client.get("/echo", headers={"X-Profile": "guess"})
+        profiled = await client.get("/echo", headers={"X-Profile": "secret"})
+
+    assert "x-profile-id" not in plain.headers
+    assert "x-profile-id" not in wrong.headers
+    entries = store.entries()
+    assert [entry["id"] for entry in entries] == [profiled.headers["x-profile-id"]]
+    assert entries[0]["path"] == "/echo"
+    assert entries[0]["status"] == 200
+    assert entries[0]["trigger"] == "header"
+
+
+@pytest.mark.anyio
+async def test_middleware_samples_slow_requests_only(tmp_path):
+    """
+    Test that sampled profiles faster than the threshold are discarded.
+    """
+    store = ProfileStore(str(tmp_path))
+    wrapped = ProfilingMiddleware(
+        _echo_app(), store, sample_rate=1.0, min_duration_ms=60_000
+    )
+
+    async with AsyncClient(
+        transport=ASGITransport(app=wrapped), base_url=BASE_URL
+    ) as client:
+        response = await client.get("/echo")
+
+    assert response.status_code == 200
+    assert store.entries() == []
+
+
+@pytest.mark.anyio
+async def test_admin_profile_endpoints(tmp_path, monkeypatch):
+    """
+    Test listing and downloading profiles as an admin.
+    """
+    store = ProfileStore(str(tmp_path))
+    store.save("5-1", _profiler(), {"path": "/login"})
+    monkeypatch.setattr(profiling, "store", store)
+
+    async with database_engine() as engine:
+        factory = async_sessionmaker(engine, expire_on_commit=False)
+        async with factory() as session:
+            email = f"admin_{uuid.uuid4().hex[:6]}@example.com"
+            session.add(
+                User(email=email, hashed_password="x", role="admin", is_active=True)
+            )
+            await session.commit()
+
+            async def override_get_db():
+                yield session
+
+            app.dependency_overrides[get_db] = override_get_db
+            token = create_access_token({"sub": email})
+            headers = {"Authorization": f"Bearer {token}"}
+            try:
+                async with AsyncClient(
+                    transport=ASGITransport(app=app), base_url=BASE_URL
+                ) as client:
+                    listing = await client.get("/admin/profiles", headers=headers)
+                    raw = await client.get("/admin/profiles/5-1", headers=headers)
+                    text = await client.get(
+                        "/admin/profiles/5-1",
+                        params={"format": "text"},
+                        headers=headers,
+                    )
+                    missing = await client.get("/admin/profiles/6-1", headers=headers)
+                    anonymous = await client.get("/admin/profiles")
+            finally:
+                app.dependency_overrides.clear()
+
+    assert listing.json() == [{"id": "5-1", "path": "/login"}]
+    assert raw.content == (tmp_path / "5-1.prof").read_bytes()
+    assert "function calls" in text.text
+    assert missing.status_code == 404
+    assert anonymous.status_code == 401
@@ -0,0 +1,131 @@
+import random
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from main import app
+from models import Film
+from database import get_db
+from tests.db import database_engine
+from similarity import SimilarityIndex, price_bucket, title_tokens
+import similarity
+
+transport = ASGITransport(app=app)
+BASE_URL = "http://test"
+
+FILMS = [
+    {"id": 1, "title": "Star Wars", "genre": "Sci-Fi", "price": 9.99},
+    {"id": 2, "title": "Star Trek", "genre": "Sci-Fi", "price": 8.99},
+    {"id": 3, "title": "The Notebook", "genre": "Romance", "price": 4.99},
+    {"id": 4, "title": "Alien", "genre": "Sci-Fi", "price": 9.49},
+    {"id": 5, "title": "Love Actually", "genre": "Romance", "price": 3.99},
+]
+
+
+@pytest.fixture
+def anyio_backend():
+    """
+    Run the async tests in this module on asyncio only.
+    """
+    return "asyncio"
+
+
+def test_features():
+    """
+    Test title tokenization and logarithmic price buckets.
+    """
+    assert title_tokens("The Lord of the Rings: Part 2") == ["lord", "rings", "part"]
+    assert [price_bucket(p) for p in (0, 0.99, 1.5, 9.99, 10_000)] == [0, 0, 1, 3, 9]
+
+
+def test_similar_ranks_by_genre_title_and_price():
+    """
+    Test that films sharing genre and title words rank first.
+    """
+    index = SimilarityIndex(k=3)
+    index.build(FILMS)
+
+    ranked = index.similar(1, 3)
+    assert [film_id for film_id, _ in ranked] == [2, 4, 3]
+    assert ranked[0][1] > ranked[1][1]
+    assert index.similar(99, 3) is None
+
+
+def test_incremental_updates_match_rebuild():
+    """
+    Test that applying creates, updates and deletes gives the same
+    neighbours as building from scratch.
+    """
+    rng = random.Random(7)
+    words = "star war love night dark city king ghost moon return".split()
+    genres = ["Drama", "Action", "Comedy", "Horror"]
+
+    def film(film_id):
+        return SimpleNamespace(
+            id=film_id,
+            title=" ".join(rng.sample(words, 2)),
+            genre=rng.choice(genres),
+            price=rng.choice([0.99, 4.99, 9.99, 19.99]),
+        )
+
+    current = {film_id: film(film_id) for film_id in range(1, 60)}
+    index = SimilarityIndex(k=5)
+    index.build([vars(f) for f in current.values()])
+    for _ in range(80):
+        roll = rng.random()
+        if roll < 0.3:
+            new = film(max(current) + 1)
+            current[new.id] = new
+            index.apply("create", new)
+        elif roll < 0.7:
+            changed = film(rng.choice(list(current)))
+            current[changed.id] = changed
+            index.apply("update", changed)
+        else:
+            removed = current.pop(rng.choice(list(current)))
+            index.apply("delete", removed)
+
+    rebuilt = SimilarityIndex(k=5)
+    rebuilt.build([vars(f) for f in current.values()])
+    for film_id in current:
+        assert index.similar(film_id, 5) == rebuilt.similar(film_id, 5)
+
+
+@pytest.mark.anyio
+async def test_similar_endpoint(monkeypatch):
+    """
+    Test that the endpoint returns neighbour details from the index.
+    """
+    async with database_engine() as engine:
+        factory = async_sessionmaker(engine, expire_on_commit=False)
+        async with factory() as session:
+            session.add_all([Film(**row) for row in FILMS])
+            await session.commit()
+            monkeypatch.setattr(similarity, "index", None)
+            await similarity.load_similarity(session, k=3)
+
+            async def override_get_db():
+                yield session
+
+            app.dependency_overrides[get_db] = override_get_db
+            try:
+                async with AsyncClient(
+                    transport=transport, base_url=BASE_URL
+                ) as client:
+                    response = await client.get(
+                        "/movies/1/similar", params={"limit": 2}
+                    )
+                    missing = await client.get("/movies/42/similar")
+            finally:
+                app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert [(film["id"], film["title"]) for film in response.json()] == [
+        (2, "Star Trek"),
+        (4, "Alien"),
+    ]
+    assert missing.status_code == 404
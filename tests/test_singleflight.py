@@ -0,0 +1,93 @@
+import asyncio
+import pytest
+
+from singleflight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_are_coalesced():
+    """
+    Test that concurrent calls for one key run the function once and share its result.
+    """
+    flight = SingleFlight("test-coalesce")
+    executions = 0
+
+    async def load():
+        nonlocal executions
+        executions += 1
+        await asyncio.sleep(0.01)
+        return {"id": 1}
+
+    results = await asyncio.gather(*(flight.do("film:1", load) for _ in range(10)))
+
+    assert executions == 1
+    assert all(result is results[0] for result in results)
+    assert flight.stats() == {
+        "calls": 10,
+        "executions": 1,
+        "coalesced": 9,
+        "in_flight": 0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_different_keys_run_separately():
+    """
+    Test that calls for different keys are not coalesced.
+    """
+    flight = SingleFlight("test-keys")
+
+    async def load(value):
+        await asyncio.sleep(0.01)
+        return value
+
+    results = await asyncio.gather(
+        flight.do("a", lambda: load("a")), flight.do("b", lambda: load("b"))
+    )
+
+    assert results == ["a", "b"]
+    assert flight.executions == 2
+
+
+@pytest.mark.asyncio
+async def test_exception_is_shared_with_waiters():
+    """
+    Test that an error in the leading call is raised to every waiter.
+    """
+    flight = SingleFlight("test-errors")
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    results = await asyncio.gather(
+        *(flight.do("key", fail) for _ in range(3)), return_exceptions=True
+    )
+
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flight.executions == 1
+
+
+@pytest.mark.asyncio
+async def test_waiter_retries_when_leader_is_cancelled():
+    """
+    Test that cancelling the leading call makes a waiter run the function itself.
+    """
+    flight = SingleFlight("test-cancel")
+    started = asyncio.Event()
+
+    async def slow():
+        started.set()
+        await asyncio.sleep(10)
+
+    async def fast():
+        return "ok"
+
+    leader = asyncio.create_task(flight.do("key", slow))
+    await started.wait()
+    waiter = asyncio.create_task(flight.do("key", fast))
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    assert await waiter == "ok"
+    assert flight.executions == 2
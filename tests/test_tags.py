@@ -0,0 +1,184 @@
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+from main import app
+from models import Film, User
+from database import get_db
+from tests.db import database_engine
+from security import create_access_token
+from tags import TagIndex
+import crud
+import tags
+
+transport = ASGITransport(app=app)
+BASE_URL = "http://test"
+
+
+@pytest.fixture
+def anyio_backend():
+    """
+    Run the async tests in this module on asyncio only.
+    """
+    return "asyncio"
+
+
+@pytest.fixture
+async def async_session(monkeypatch) -> AsyncSession:
+    """
+    Set up an async test database session with overridden FastAPI
+    dependency and an empty tag index.
+    """
+    async with database_engine() as engine:
+        async_session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        monkeypatch.setattr(tags, "index", TagIndex())
+
+        async with async_session_factory() as session:
+
+            async def override_get_db():
+                yield session
+
+            app.dependency_overrides[get_db] = override_get_db
+
+            yield session
+
+    app.dependency_overrides.clear()
+
+
+def test_query_and_facets():
+    """
+    Test AND, OR and NOT queries, facet counts and incremental changes.
+    """
+    index = TagIndex()
+    index.load(
+        [1, 2, 3, 4, 5],
+        [
+            (1, "action"),
+            (1, "comedy"),
+            (2, "action"),
+            (2, "horror"),
+            (3, "comedy"),
+            (4, "action"),
+            (4, "comedy"),
+        ],
+    )
+
+    assert index.query(all_of=["action", "comedy"]) == [1, 4]
+    assert index.query(all_of=["action"], none_of=["horror"]) == [1, 4]
+    assert index.query(any_of=["horror", "comedy"]) == [1, 2, 3, 4]
+    assert index.query(none_of=["action"]) == [3, 5]
+    assert index.query(all_of=["unknown"]) == []
+    assert index.query(none_of=["comedy"], after_id=2) == [5]
+    assert index.query(after_id=1, limit=2) == [2, 3]
+    assert index.query(any_of=["horror", "comedy"], after_id=1, limit=2) == [2, 3]
+    assert index.count(all_of=["action"]) == 3
+    assert index.count(all_of=["action"], none_of=["horror"]) == 2
+    assert index.facets(index.query(all_of=["action"])) == {
+        "action": 3,
+        "comedy": 2,
+        "horror": 1,
+    }
+
+    index.set_film_tags(5, ["action", "comedy"])
+    index.apply("delete", SimpleNamespace(id=1))
+    assert index.query(all_of=["action", "comedy"]) == [4, 5]
+    assert index.query() == [2, 3, 4, 5]
+    assert index.tags_of(5) == ["action", "comedy"]
+
+
+@pytest.mark.anyio
+async def test_tag_endpoints(async_session: AsyncSession):
+    """
+    Test tagging films as an admin, then querying and faceting by tags.
+    """
+    films = [Film(title=f"Film {i}", genre="Drama", price=1) for i in range(4)]
+    email = f"admin_{uuid.uuid4().hex[:6]}@example.com"
+    async_session.add_all(films)
+    async_session.add(
+        User(email=email, hashed_password="x", role="admin", is_active=True)
+    )
+    await async_session.commit()
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': email})}"}
+    ids = [film.id for film in films]
+    film_tags = [["Action", "comedy"], ["action"], ["Comedy "], ["action", "comedy"]]
+
+    async with AsyncClient(transport=transport, base_url=BASE_URL) as client:
+        for film_id, names in zip(ids, film_tags):
+            response = await client.put(
+                f"/movies/{film_id}/tags", json={"tags": names}, headers=headers
+            )
+            assert response.status_code == 200
+        missing = await client.put(
+            "/movies/999/tags", json={"tags": ["action"]}, headers=headers
+        )
+        first = await client.get(
+            "/movies/tagged", params={"all": ["action", "comedy"], "limit": 1}
+        )
+        second = await client.get(
+            "/movies/tagged",
+            params={
+                "all": ["action", "comedy"],
+                "after_id": first.json()["next_after_id"],
+            },
+        )
+        excluded = await client.get(
+            "/movies/tagged", params={"any": "comedy", "none": "ACTION"}
+        )
+        facets = await client.get("/movies/tags/facets", params={"all": "action"})
+
+    assert response.json() == {"film_id": ids[3], "tags": ["action", "comedy"]}
+    assert missing.status_code == 404
+    assert [film["id"] for film in first.json()["items"]] == [ids[0]]
+    assert first.json()["total"] == 2
+    assert [film["id"] for film in second.json()["items"]] == [ids[3]]
+    assert second.json()["next_after_id"] is None
+    assert [film["id"] for film in excluded.json()["items"]] == [ids[2]]
+    assert facets.json() == {"total": 3, "tags": {"action": 3, "comedy": 2}}
+
+
+@pytest.mark.anyio
+async def test_films_are_tagged_by_genre(async_session: AsyncSession, monkeypatch):
+    """
+    Test that a film created through the API is tagged with its genre
+    components, and that a genre change replaces those tags in the index
+    while keeping tags set by an admin.
+    """
+    email = f"admin_{uuid.uuid4().hex[:6]}@example.com"
+    async_session.add(
+        User(email=email, hashed_password="x", role="admin", is_active=True)
+    )
+    await async_session.commit()
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': email})}"}
+    monkeypatch.setattr(crud, "film_listeners", [tags.index.apply])
+
+    async with AsyncClient(transport=transport, base_url=BASE_URL) as client:
+        created = await client.post(
+            "/movies/",
+            json={"title": "Buddy Cops", "genre": "Action/Comedy", "price": 5},
+        )
+        film_id = created.json()["id"]
+        both = await client.get("/movies/tagged", params={"all": ["action", "comedy"]})
+        await client.put(
+            f"/movies/{film_id}/tags",
+            json={"tags": ["action", "comedy", "classic"]},
+            headers=headers,
+        )
+        await client.put(
+            f"/movies/{film_id}",
+            json={"title": "Buddy Cops", "genre": "Comedy, Crime", "price": 5},
+        )
+        action = await client.get("/movies/tagged", params={"all": "action"})
+        crime = await client.get(
+            "/movies/tagged", params={"all": ["classic", "comedy", "crime"]}
+        )
+
+    tags.index.loaded = False
+    await tags.ensure_loaded(async_session)
+
+    assert [film["id"] for film in both.json()["items"]] == [film_id]
+    assert action.json()["total"] == 0
+    assert [film["id"] for film in crime.json()["items"]] == [film_id]
+    assert tags.index.tags_of(film_id) == ["classic", "comedy", "crime"]
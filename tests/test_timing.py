@@ -0,0 +1,117 @@
+import logging
+import uuid
+
+import pytest
+
+from fastapi import FastAPI
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from main import app
+from models import User
+from database import get_db, time_queries
+from security import create_access_token
+from tests.db import database_engine
+from timing import TimingMiddleware, phase, record, server_timing_header
+
+BASE_URL = "http://test"
+
+
+@pytest.fixture
+def anyio_backend():
+    """
+    Run the async tests in this module on asyncio only.
+    """
+    return "asyncio"
+
+
+def _phases(header: str) -> dict[str, str]:
+    return {entry.split(";")[0]: entry for entry in header.split(", ") if ";" in entry}
+
+
+def test_server_timing_header_format():
+    """
+    Test that phases are formatted with durations, counts and a total.
+    """
+    header = server_timing_header({"db": [1.234, 3], "auth": [0.5, 1]}, 4.81)
+
+    assert header == (
+        'db;dur=1.2;desc="Database queries (3)", '
+        'auth;dur=0.5;desc="Token check and user lookup", '
+        "total;dur=4.8"
+    )
+
+
+@pytest.mark.anyio
+async def test_middleware_sums_phases():
+    """
+    Test that repeated phases add up and that timing outside a request is
+    ignored.
+    """
+    record("db", 1.0)
+    with phase("hash"):
+        pass
+
+    echo = FastAPI()
+
+    @echo.get("/echo")
+    async def read_echo():
+        record("db", 1.0)
+        record("db", 2.0)
+        with phase("hash"):
+            pass
+        return {"ok": True}
+
+    async with AsyncClient(
+        transport=ASGITransport(app=TimingMiddleware(echo)), base_url=BASE_URL
+    ) as client:
+        response = await client.get("/echo")
+
+    phases = _phases(response.headers["server-timing"])
+    assert phases["db"] == 'db;dur=3.0;desc="Database queries (2)"'
+    assert phases["hash"].startswith("hash;dur=")
+    assert phases["total"].startswith("total;dur=")
+
+
+@pytest.mark.anyio
+async def test_authenticated_request_reports_phases(caplog):
+    """
+    Test that an authenticated request reports auth, db and serialization
+    time in the header and the access log.
+    """
+    async with database_engine() as engine:
+        time_queries(engine)
+        factory = async_sessionmaker(engine, expire_on_commit=False)
+        async with factory() as session:
+            email = f"user_{uuid.uuid4().hex[:6]}@example.com"
+            session.add(
+                User(email=email, hashed_password="x", role="user", is_active=True)
+            )
+            await session.commit()
+
+            async def override_get_db():
+                yield session
+
+            app.dependency_overrides[get_db] = override_get_db
+            token = create_access_token({"sub": email})
+            try:
+                with caplog.at_level(logging.INFO, logger="online_cinema.access"):
+                    async with AsyncClient(
+                        transport=ASGITransport(app=app), base_url=BASE_URL
+                    ) as client:
+                        response = await client.get(
+                            "/me", headers={"Authorization": f"Bearer {token}"}
+                        )
+            finally:
+                app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert {"auth", "db", "serialize", "total"} <= set(
+        _phases(response.headers["server-timing"])
+    )
+    (access,) = [
+        record for record in caplog.records if record.name == "online_cinema.access"
+    ]
+    assert access.http_method == "GET"
+    assert access.http_path == "/me"
+    assert access.http_status == 200
+    assert {"auth", "db", "serialize"} <= set(access.timings_ms)
@@ -0,0 +1,74 @@
+from utils import build_pwd_context
+
+
+def test_build_pwd_context_uses_first_scheme():
+    """
+    Test that new hashes use the first configured scheme and cost.
+    """
+    context = build_pwd_context(
+        ["argon2", "bcrypt"],
+        bcrypt_rounds=4,
+        argon2_time_cost=1,
+        argon2_memory_cost=1024,
+        argon2_parallelism=1,
+    )
+
+    hashed = context.hash("secret")
+
+    assert context.identify(hashed) == "argon2"
+    assert "t=1" in hashed and "m=1024" in hashed
+
+
+def test_outdated_hash_is_rehashed():
+    """
+    Test that hashes below the configured cost or in a deprecated scheme
+    verify successfully and come back with a replacement hash.
+    """
+    old_hash = build_pwd_context(["bcrypt"], bcrypt_rounds=4).hash("secret")
+    context = build_pwd_context(
+        ["argon2", "bcrypt"],
+        bcrypt_rounds=5,
+        argon2_time_cost=1,
+        argon2_memory_cost=1024,
+        argon2_parallelism=1,
+    )
+
+    valid, new_hash = context.verify_and_update("secret", old_hash)
+
+    assert valid
+    assert context.identify(new_hash) == "argon2"
+    assert not context.needs_update(new_hash)
+
+
+def test_current_hash_is_not_rehashed():
+    """
+    Test that a hash matching the current policy is left alone.
+    """
+    context = build_pwd_context(["bcrypt"], bcrypt_rounds=4)
+
+    valid, new_hash = context.verify_and_update("secret", context.hash("secret"))
+
+    assert valid
+    assert new_hash is None
+
+
+def test_costlier_hash_is_rehashed():
+    """
+    Test that hashes above the configured cost are rehashed, so lowering the
+    cost takes effect for existing passwords.
+    """
+    strong_bcrypt = build_pwd_context(["bcrypt"], bcrypt_rounds=5).hash("secret")
+    strong_argon2 = build_pwd_context(
+        ["argon2"], argon2_time_cost=2, argon2_memory_cost=1024, argon2_parallelism=1
+    ).hash("secret")
+    context = build_pwd_context(
+        ["argon2", "bcrypt"],
+        bcrypt_rounds=4,
+        argon2_time_cost=1,
+        argon2_memory_cost=1024,
+        argon2_parallelism=1,
+    )
+
+    assert context.needs_update(strong_bcrypt)
+    assert context.needs_update(strong_argon2)
+    assert not context.needs_update(context.hash("secret"))
@@ -0,0 +1,130 @@
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from starlette.datastructures import MutableHeaders
+
+access_logger = logging.getLogger("online_cinema.access")
+
+PHASE_DESCRIPTIONS = {
+    "auth": "Token check and user lookup",
+    "db": "Database queries",
+    "hash": "Password hashing",
+    "serialize": "JSON encoding",
+}
+
+_timings: ContextVar[dict[str, list] | None] = ContextVar("timings", default=None)
+"""
+Per-request totals as {phase: [milliseconds, count]}, or None outside a
+timed request. The dict is shared with tasks and threads that copy the
+context, so their timings add up in the same request.
+"""
+
+
+def record(phase: str, duration_ms: float):
+    """
+    Add the duration of one phase occurrence to the current request.
+    Does nothing outside a timed request.
+    param phase: Phase name, e.g. "db".
+    param duration_ms: Duration in milliseconds.
+    """
+    timings = _timings.get()
+    if timings is None:
+        return
+    total = timings.setdefault(phase, [0.0, 0])
+    total[0] += duration_ms
+    total[1] += 1
+
+
+@contextmanager
+def phase(name: str):
+    """
+    Time the enclosed block as one occurrence of a phase.
+    param name: Phase name, e.g. "auth".
+    """
+    if _timings.get() is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, (time.perf_counter() - start) * 1000)
+
+
+def server_timing_header(timings: dict[str, list], total_ms: float) -> str:
+    """
+    Format phase totals as a ``Server-Timing`` header value.
+    param timings: Phase totals as {phase: [milliseconds, count]}.
+    param total_ms: Time until the response headers were sent.
+    return: e.g. ``db;dur=1.2;desc="Database queries (3)", total;dur=4.8``.
+    """
+    entries = []
+    for name, (duration_ms, count) in timings.items():
+        description = PHASE_DESCRIPTIONS.get(name, name)
+        if count > 1:
+            description = f"{description} ({count})"
+        entries.append(f'{name};dur={duration_ms:.1f};desc="{description}"')
+    entries.append(f"total;dur={total_ms:.1f}")
+    return ", ".join(entries)
+
+
+class TimingMiddleware:
+    """
+    ASGI middleware that collects phase timings for each HTTP request.
+    Phases reported through ``record`` and ``phase`` while the request runs
+    are summed per name, sent in a ``Server-Timing`` header (visible in the
+    browser devtools) when ``header`` is set, and logged with the request
+    as structured fields of an ``online_cinema.access`` record. Phases may
+    overlap: the database queries made while authenticating count towards
+    both ``auth`` and ``db``.
+    """
+
+    def __init__(self, app, header: bool = True):
+        self.app = app
+        self.header = header
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings: dict[str, list] = {}
+        token = _timings.set(timings)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.header:
+                    total_ms = (time.perf_counter() - start) * 1000
+                    MutableHeaders(scope=message).append(
+                        "Server-Timing", server_timing_header(timings, total_ms)
+                    )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _timings.reset(token)
+            duration_ms = (time.perf_counter() - start) * 1000
+            access_logger.info(
+                '"%s %s" %d %.1fms',
+                scope["method"],
+                scope["path"],
+                status,
+                duration_ms,
+                extra={
+                    "http_method": scope["method"],
+                    "http_path": scope["path"],
+                    "http_status": status,
+                    "duration_ms": round(duration_ms, 3),
+                    "timings_ms": {
+                        name: round(duration, 3)
+                        for name, (duration, _) in timings.items()
+                    },
+                },
+            )
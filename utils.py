@@ -1,15 +1,77 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
 from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from settings import get_settings
+import timing
+
+
+def build_pwd_context(
+    schemes: list[str] | None = None,
+    bcrypt_rounds: int | None = None,
+    argon2_time_cost: int | None = None,
+    argon2_memory_cost: int | None = None,
+    argon2_parallelism: int | None = None,
+) -> CryptContext:
+    """
+    Build the password hashing context from explicit values or settings.
+    The first scheme hashes new passwords; hashes in any other scheme, or with
+    a cost other than configured, are reported by ``needs_update``, so
+    lowering the cost also migrates existing hashes.
+    param schemes: Enabled passlib scheme names, e.g. ["argon2", "bcrypt"].
+    return: A configured CryptContext.
+    """
+    settings = get_settings()
+    if schemes is None:
+        schemes = [
+            scheme.strip()
+            for scheme in settings.PASSWORD_SCHEMES.split(",")
+            if scheme.strip()
+        ]
+    options = {}
+    if "bcrypt" in schemes:
+        rounds = bcrypt_rounds or settings.BCRYPT_ROUNDS
+        options["bcrypt__default_rounds"] = rounds
+        options["bcrypt__min_rounds"] = rounds
+        options["bcrypt__max_rounds"] = rounds
+    if "argon2" in schemes:
+        time_cost = argon2_time_cost or settings.ARGON2_TIME_COST
+        options["argon2__type"] = "ID"
+        options["argon2__default_rounds"] = time_cost
+        options["argon2__min_rounds"] = time_cost
+        options["argon2__max_rounds"] = time_cost
+        options["argon2__memory_cost"] = (
+            argon2_memory_cost or settings.ARGON2_MEMORY_COST
+        )
+        options["argon2__parallelism"] = (
+            argon2_parallelism or settings.ARGON2_PARALLELISM
+        )
+    return CryptContext(schemes=schemes, deprecated="auto", **options)
+
+
+@lru_cache
+def get_pwd_context() -> CryptContext:
+    """
+    Return the single password hashing context used by the whole application,
+    building it on first use.
+    """
+    return build_pwd_context()
+
+
+_hash_pool: ProcessPoolExecutor | None = None
 
 
 def hash_password(password: str) -> str:
     """
-    Hash a plain text password using bcrypt.
+    Hash a plain text password using the default configured scheme.
     param password: The plain password to hash.
     return: Hashed password as a string.
     """
-    return pwd_context.hash(password)
+    with timing.phase("hash"):
+        return get_pwd_context().hash(password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -19,4 +81,78 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     param hashed_password: The stored hashed password.
     return: True if the password matches, False otherwise.
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    with timing.phase("hash"):
+        return get_pwd_context().verify(plain_password, hashed_password)
+
+
+def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, str | None]:
+    """
+    Verify a password and rehash it if the stored hash is outdated.
+    param plain_password: The input password to check.
+    param hashed_password: The stored hashed password.
+    return: (True if the password matches, new hash to store or None).
+    """
+    with timing.phase("hash"):
+        return get_pwd_context().verify_and_update(plain_password, hashed_password)
+
+
+def is_password_hash(value: str) -> bool:
+    """
+    Check whether a value is a hash produced by one of the supported schemes.
+    param value: The string to inspect.
+    return: True if the value can be stored verbatim as a password hash.
+    """
+    return get_pwd_context().identify(value) is not None
+
+
+def _hash_many(passwords: list[str]) -> list[str]:
+    """
+    Hash a chunk of passwords inside a worker process.
+    """
+    context = get_pwd_context()
+    return [context.hash(password) for password in passwords]
+
+
+def get_hash_pool() -> ProcessPoolExecutor:
+    """
+    Return the process pool used for bulk hashing, creating it on first use.
+    """
+    global _hash_pool
+    if _hash_pool is None:
+        _hash_pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1)
+    return _hash_pool
+
+
+def shutdown_hash_pool():
+    """
+    Stop the bulk hashing worker processes, if they were started.
+    """
+    global _hash_pool
+    if _hash_pool is not None:
+        _hash_pool.shutdown(cancel_futures=True)
+        _hash_pool = None
+
+
+async def hash_passwords(passwords: list[str]) -> list[str]:
+    """
+    Hash many passwords in parallel across a process pool.
+    param passwords: The plain passwords to hash.
+    return: Hashed passwords in the same order as the input.
+    """
+    if not passwords:
+        return []
+    workers = os.cpu_count() or 1
+    chunk_size = max(1, -(-len(passwords) // (workers * 4)))
+    chunks = [
+        passwords[start : start + chunk_size]
+        for start in range(0, len(passwords), chunk_size)
+    ]
+    loop = asyncio.get_running_loop()
+    pool = get_hash_pool()
+    with timing.phase("hash"):
+        results = await asyncio.gather(
+            *(loop.run_in_executor(pool, _hash_many, chunk) for chunk in chunks)
+        )
+    return [hashed for chunk in results for hashed in chunk]